@@ -0,0 +1,35 @@
+"""
+VertexRabbit command line.
+
+    python -m app web --port 8000     # webhook receiver + API
+    python -m app worker              # review worker (see app/worker.py)
+"""
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="vertexrabbit", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    web = commands.add_parser("web", help="Run the webhook receiver and API")
+    web.add_argument("--host", default="0.0.0.0")
+    web.add_argument("--port", type=int, default=8000)
+    web.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+
+    worker = commands.add_parser("worker", help="Run a review worker")
+    worker.add_argument("--concurrency", type=int, default=0, help="Jobs run at once (default: JOB_WORKERS)")
+    worker.add_argument("--grace", type=float, default=30, help="Seconds running jobs get to finish on shutdown")
+    worker.add_argument("--log-level", default="info")
+
+    args = parser.parse_args()
+    if args.command == "web":
+        import uvicorn
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        from app.worker import main as worker_main
+        worker_main(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from app.core.config import settings
+from app.core.db import connect
+from app.core.metrics import REVIEW_CACHE_HIT_RATIO
+
+logger = logging.getLogger("review_cache")
+
+
+def hunk_key(hunk, model: str, prompt_hash: str) -> str:
+    """
+    Content address of a hunk review: the hunk body with line numbers and trailing
+    whitespace stripped, plus the model and system prompt that produced the review.
+    The path is deliberately excluded so renamed/moved code still hits.
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode())
+    digest.update(b"\0")
+    digest.update(prompt_hash.encode())
+    for line in hunk.lines:
+        digest.update(b"\0")
+        digest.update(line.rstrip().encode())
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    Persistent cache of per-hunk AI findings.
+    Issues are stored with line offsets relative to the hunk start so they can be
+    remapped when the same hunk shows up at a different position.
+    Entries expire after `ttl` seconds; beyond `max_entries` the least recently used are evicted.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS review_cache (
+            key TEXT PRIMARY KEY,
+            issues TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_review_cache_last_used ON review_cache (last_used);
+    """
+
+    def __init__(self, path: str, ttl: int = 7 * 86400, max_entries: int = 50000):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, key: str):
+        """Returns the cached issues (with `offset` instead of `line`) or None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT issues FROM review_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE review_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row["issues"])
+
+    def put(self, key: str, issues: list):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO review_cache (key, issues, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(issues), now, now)
+            )
+            self.writes += 1
+            # Amortize eviction instead of counting rows on every write
+            if self.writes % 100 == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM review_cache WHERE created_at <= ?", (now - self.ttl,))
+        self.conn.execute(
+            "DELETE FROM review_cache WHERE key IN ("
+            "  SELECT key FROM review_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global Cache Instance (None when disabled)
+review_cache = ReviewCache(
+    settings.REVIEW_CACHE_DB_PATH,
+    ttl=settings.REVIEW_CACHE_TTL,
+    max_entries=settings.REVIEW_CACHE_MAX_ENTRIES
+) if settings.REVIEW_CACHE_ENABLED else None
+
+if review_cache is not None:
+    REVIEW_CACHE_HIT_RATIO.set_function(lambda: review_cache.stats()["hit_ratio"])
@@ -0,0 +1,289 @@
+import os
+import re
+import ast
+import json
+import keyword
+import builtins
+import logging
+import asyncio
+import threading
+import subprocess
+from collections import Counter
+
+from app.core.config import settings
+from app.core.db import connect
+from app.diff.chunker import estimate_tokens
+
+logger = logging.getLogger("context")
+
+PY_EXTENSIONS = (".py", ".pyi")
+JS_EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+MAX_FILE_BYTES = 512 * 1024
+MAX_SNIPPET_LINES = 60
+MAX_DEFINITIONS_PER_NAME = 2
+
+# function foo(, class Foo, export const foo = (...) =>, const foo = async function
+JS_DEFINITION = re.compile(
+    r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?"
+    r"(?:function\*?[ \t]+(\w+)|class[ \t]+(\w+)|(?:const|let|var)[ \t]+(\w+)[ \t]*=[ \t]*"
+    r"(?:async[ \t]*)?(?:function\b|\([^)]*\)[ \t]*=>|\w+[ \t]*=>))",
+    re.MULTILINE
+)
+# Calls and constructor uses in changed code: foo(, obj.foo(, new Foo(
+REFERENCE = re.compile(r"\b([A-Za-z_]\w*)\s*\(")
+IGNORED = set(keyword.kwlist) | set(dir(builtins)) | {
+    "self", "cls", "super", "function", "return", "if", "for", "while", "switch", "catch",
+    "new", "typeof", "require", "console", "print", "len", "str", "int", "dict", "list",
+}
+
+
+def python_symbols(source: str) -> list:
+    """(name, kind, start line, end line) of every function and class, nested ones included"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    symbols = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            symbols.append((node.name, kind, start, node.end_lineno or node.lineno))
+    return symbols
+
+
+def js_symbols(source: str) -> list:
+    """Regex approximation for JS/TS: a definition runs until its braces balance"""
+    lines = source.splitlines()
+    symbols = []
+    for match in JS_DEFINITION.finditer(source):
+        name = next(g for g in match.groups() if g)
+        start = source.count("\n", 0, match.start()) + 1
+        depth = 0
+        end = start
+        opened = False
+        for number in range(start, min(len(lines), start + 400) + 1):
+            text = lines[number - 1]
+            depth += text.count("{") - text.count("}")
+            opened = opened or "{" in text
+            end = number
+            if opened and depth <= 0:
+                break
+        symbols.append((name, "class" if match.group(2) else "function", start, end))
+    return symbols
+
+
+def extract_symbols(path: str, source: str) -> list:
+    if path.endswith(PY_EXTENSIONS):
+        return python_symbols(source)
+    if path.endswith(JS_EXTENSIONS):
+        return js_symbols(source)
+    return []
+
+
+class SymbolStore:
+    """Parsed symbols keyed by git blob SHA, so unchanged files are never parsed twice"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS symbols (
+            blob TEXT PRIMARY KEY,
+            symbols TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+
+    def get_many(self, blobs: list) -> dict:
+        found = {}
+        with self.lock:
+            for i in range(0, len(blobs), 500):
+                batch = blobs[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT blob, symbols FROM symbols WHERE blob IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((r["blob"], [tuple(s) for s in json.loads(r["symbols"])]) for r in rows)
+        return found
+
+    def put_many(self, items: dict):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO symbols (blob, symbols) VALUES (?, ?)",
+                [(blob, json.dumps(symbols)) for blob, symbols in items.items()]
+            )
+
+
+class SymbolSnapshot:
+    """
+    Definitions of one worktree. Never modified once built, so a review keeps consistent
+    line ranges while other reviews of the same repo update the index from their heads.
+    """
+
+    def __init__(self, files: dict, names: dict):
+        self.files = files  # path -> (blob, symbols)
+        self.names = names  # name -> [(path, kind, start, end)]
+
+    def lookup(self, name: str) -> list:
+        return self.names.get(name, [])
+
+
+class SymbolIndex:
+    """
+    Definitions of one repository, updated incrementally from each checkout: only files
+    whose blob changed since the last update are re-read, and parsing is skipped for
+    blobs any earlier review already parsed. Every update publishes a new snapshot.
+    """
+
+    def __init__(self):
+        self.current = SymbolSnapshot({}, {})
+        self.lock = threading.Lock()
+
+    def update(self, root: str, store: SymbolStore) -> tuple:
+        """Syncs with the worktree at `root`; returns (its SymbolSnapshot, files parsed)"""
+        listing = subprocess.run(
+            ["git", "ls-files", "-s", "-z", "--", *[f"*{ext}" for ext in PY_EXTENSIONS + JS_EXTENSIONS]],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+
+        current = {}  # path -> blob SHA
+        for line in listing.split("\0"):
+            meta, _, path = line.partition("\t")
+            parts = meta.split()
+            if len(parts) == 3:
+                current[path] = parts[1]
+
+        with self.lock:
+            previous = self.current
+            changed = {p: b for p, b in current.items() if previous.files.get(p, (None,))[0] != b}
+            if not changed and len(previous.files) == len(current):
+                return previous, 0
+
+            known = store.get_many(sorted(set(changed.values())))
+            parsed = {}
+            files = {}
+            for path, blob in current.items():
+                if path not in changed:
+                    files[path] = previous.files[path]
+                    continue
+                if blob not in known and blob not in parsed:
+                    parsed[blob] = self._parse(root, path)
+                files[path] = (blob, known.get(blob, parsed.get(blob, [])))
+            if parsed:
+                store.put_many(parsed)
+
+            names = {}
+            for path, (_, symbols) in files.items():
+                for name, kind, start, end in symbols:
+                    names.setdefault(name, []).append((path, kind, start, end))
+            self.current = SymbolSnapshot(files, names)
+            return self.current, len(parsed)
+
+    @staticmethod
+    def _parse(root: str, path: str) -> list:
+        full = os.path.join(root, path)
+        try:
+            if os.path.getsize(full) > MAX_FILE_BYTES:
+                return []
+            with open(full, encoding="utf-8", errors="replace") as f:
+                return extract_symbols(path, f.read())
+        except OSError:
+            return []
+
+
+class ReviewContext:
+    """Renders the definitions a diff chunk refers to, within a token budget"""
+
+    def __init__(self, root: str, symbols: SymbolSnapshot, budget: int):
+        self.root = root
+        self.symbols = symbols  # Taken from this same worktree, so line ranges match the source
+        self.budget = budget
+        self.sources = {}
+
+    def _lines(self, path: str) -> list:
+        if path not in self.sources:
+            try:
+                with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as f:
+                    self.sources[path] = f.read().splitlines()
+            except OSError:
+                self.sources[path] = []
+        return self.sources[path]
+
+    def render(self, files: list) -> str:
+        """files: FileDiffs of one chunk. Returns a prompt section, or "" if nothing fits."""
+        if self.budget <= 0:
+            return ""
+
+        references = Counter()
+        visible = {}  # path -> [(start, end)] new-file ranges already shown by the diff
+        for file in files:
+            for hunk in file.hunks:
+                visible.setdefault(file.path, []).append((hunk.new_start, hunk.new_start + hunk.new_count - 1))
+                for _, marker, content in hunk.new_lines():
+                    for name in REFERENCE.findall(content):
+                        if name not in IGNORED:
+                            # Names on added lines matter most
+                            references[name] += 2 if marker == "+" else 1
+
+        def shown(path, start, end):
+            return any(start <= e and s <= end for s, e in visible.get(path, ()))
+
+        paths = {f.path for f in files}
+        dirs = {os.path.dirname(p) for p in paths}
+        sections = []
+        used = 0
+        seen = set()
+        for name, _ in references.most_common():
+            definitions = sorted(
+                self.symbols.lookup(name),
+                key=lambda d: (d[0] not in paths, os.path.dirname(d[0]) not in dirs, d[0])
+            )
+            for path, kind, start, end in definitions[:MAX_DEFINITIONS_PER_NAME]:
+                # Skip what the diff already shows and methods of a class that is already included
+                if shown(path, start, end) or any(p == path and s <= start and end <= e for p, s, e in seen):
+                    continue
+                lines = self._lines(path)[start - 1:min(end, start + MAX_SNIPPET_LINES - 1)]
+                if not lines:
+                    continue
+                if end - start + 1 > MAX_SNIPPET_LINES:
+                    lines.append("...")
+                section = f"### {path} (lines {start}-{end}, {kind} `{name}`)\n```\n" + "\n".join(lines) + "\n```"
+                cost = estimate_tokens(section)
+                if used + cost > self.budget:
+                    continue
+                sections.append(section)
+                seen.add((path, start, end))
+                used += cost
+
+        if not sections:
+            return ""
+        return ("## Referenced definitions\n"
+                "For context only. They are not part of the change; do not comment on them.\n\n"
+                + "\n\n".join(sections))
+
+
+_store = None
+_indexes = {}  # repo_full_name -> SymbolIndex
+_indexes_lock = threading.Lock()
+
+
+def _index_for(repo_full_name: str) -> SymbolIndex:
+    with _indexes_lock:
+        if repo_full_name not in _indexes:
+            _indexes[repo_full_name] = SymbolIndex()
+        return _indexes[repo_full_name]
+
+
+async def build_context(repo_full_name: str, root: str):
+    """Updates the repo's symbol index from a checkout; returns a ReviewContext or None"""
+    global _store
+    if not root or settings.REVIEW_CONTEXT_TOKENS <= 0:
+        return None
+    if _store is None:
+        _store = SymbolStore(settings.SYMBOLS_DB_PATH)
+
+    snapshot, parsed = await asyncio.to_thread(_index_for(repo_full_name).update, root, _store)
+    logger.info(f"Symbol index for {repo_full_name}: {len(snapshot.files)} files, "
+                f"{len(snapshot.names)} names ({parsed} parsed)")
+    return ReviewContext(root, snapshot, settings.REVIEW_CONTEXT_TOKENS)
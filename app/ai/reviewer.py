@@ -1,7 +1,10 @@
 
+import re
 import json
+import time
+import hashlib
 import logging
-from openai import OpenAI
+from dataclasses import replace
 from app.core.config import settings
 
 # Setup logger
@@ -42,10 +45,34 @@ Example:
 If the code looks good, return an empty array: []
 """
 
+# The diff goes in verbatim (JSON-escaping it only inflates the token count),
+# followed by the definitions it references when a checkout is available
+INLINE_USER_PROMPT = "Review this diff:\n\n{diff}"
+# Completion budget of one chunk review
+REVIEW_MAX_TOKENS = 2000
+
+# Triage: a small, fast model picks the hunks worth a review by the main model
+TRIAGE_SYSTEM_PROMPT = """You triage code changes before an expensive code review.
+A hunk needs review if it could plausibly introduce a bug, a security problem or a behavior change.
+Hunks that only touch formatting, comments, docs, log messages, renames or version numbers do not.
+When unsure, include the hunk.
+Reply with ONLY a JSON array of the numbers of the hunks that need review, e.g. [1, 4]. Reply [] if none do."""
+TRIAGE_USER_PROMPT = "Hunks:\n\n{hunks}"
+TRIAGE_ANSWER = re.compile(r"\[[\d,\s]*\]")
+
 
 from openai import AsyncOpenAI
 import asyncio
-from app.core.limiter import global_limiter
+from openai import RateLimitError
+from app.core.limiter import limiters, parse_duration
+from app.diff.parser import parse_diff
+from app.diff.chunker import chunk_diff, split_file, estimate_tokens
+from app.ai.cache import review_cache, hunk_key
+from app.ai.router import ProviderRouter, ReviewFailed
+from app.ai.stream_parser import iter_issues
+from app.core import tracing
+from app.core.policy import DEFAULT_POLICY
+from app.core.metrics import LLM_TTFT_SECONDS, LLM_TOKENS_PER_SECOND, LLM_REQUESTS
 
 class VertexReviewer:
     """Multi-provider AI Code Reviewer supporting FeatherLabs, OpenRouter, Groq, and A4F"""
@@ -81,37 +108,98 @@ class VertexReviewer:
         self.model = config["model"](settings)
         
         logger.info(f"✨ Using AI Provider: {self.provider.upper()} | Model: {self.model}")
-        
-        self.client = AsyncOpenAI(
-            base_url=self.base_url,
-            api_key=self.api_key,
-            default_headers={
-                "User-Agent": "VertexRabbit/1.0",
-                "Accept": "application/json",
-            }
-        )
+
         self.system_prompt = """You are a senior software engineer reviewing code. Find ALL issues."""
+        # Cached reviews are invalidated whenever the inline prompt changes
+        self.prompt_hash = hashlib.sha256((INLINE_SYSTEM_PROMPT + INLINE_USER_PROMPT).encode()).hexdigest()[:16]
+
+        # Fallback providers: every other provider with an API key, unless listed explicitly
+        self.models = {self.provider: self.model}
+        fallbacks = settings.AI_FALLBACK_PROVIDER_LIST
+        if fallbacks is None:
+            fallbacks = [p for p in self.PROVIDERS if self.PROVIDERS[p]["api_key"](settings)]
+        for name in fallbacks:
+            if name in self.models or name not in self.PROVIDERS:
+                continue
+            self.models[name] = self.PROVIDERS[name]["model"](settings)
+        if len(self.models) > 1:
+            logger.info(f"Fallback providers: {', '.join(p for p in self.models if p != self.provider)}")
+
+        # Small, fast model for `fast` policy routes and hunk triage; kept out of the main rotation
+        self.fast_provider = None
+        fast = settings.AI_FAST_PROVIDER
+        if fast in self.PROVIDERS and self.PROVIDERS[fast]["api_key"](settings):
+            self.fast_provider = fast
+            self.models.setdefault(fast, self.PROVIDERS[fast]["model"](settings))
+            logger.info(f"Fast provider: {fast} | Model: {self.models[fast]}")
+        elif fast:
+            logger.warning(f"AI_FAST_PROVIDER '{fast}' is unknown or has no API key; fast tier disabled")
+        self.main_providers = [p for p in self.models if p != self.fast_provider] or list(self.models)
+
+        # API clients are built on first use, so providers that never get a request cost nothing
+        self.clients = {}
+
+        self.router = ProviderRouter(
+            list(self.models),
+            hedge=settings.AI_HEDGE_ENABLED,
+            hedge_min_delay=settings.AI_HEDGE_MIN_DELAY
+        )
+
+    def _client(self, provider: str) -> AsyncOpenAI:
+        if provider not in self.clients:
+            config = self.PROVIDERS[provider]
+            self.clients[provider] = AsyncOpenAI(
+                base_url=config["base_url"](settings),
+                api_key=config["api_key"](settings),
+                default_headers={
+                    "User-Agent": "VertexRabbit/1.0",
+                    "Accept": "application/json",
+                }
+            )
+        return self.clients[provider]
+
+    async def _create_stream(self, messages: list, max_tokens: int, timeout: int, provider: str = None):
+        """
+        Starts a streaming completion behind the provider's RPM/TPM budget and feeds the
+        provider's rate-limit headers (or a 429's Retry-After) back into the limiter.
+        """
+        provider = provider or self.provider
+        model = self.models[provider]
+        limiter = limiters.get(provider, model)
+
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        await limiter.acquire(prompt_tokens + max_tokens)
+
+        try:
+            raw = await self._client(provider).chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.2,
+                timeout=timeout,
+                stream=True
+            )
+        except RateLimitError as e:
+            await limiter.penalize(parse_duration(e.response.headers.get("retry-after", "")) or 30)
+            raise
+
+        await limiter.observe_headers(raw.headers)
+        return raw.parse()
 
     async def review_diff(self, diff_content: str) -> str:
         """
         Sends the diff to AI and returns the review.
         """
         try:
-            safe_content = json.dumps(diff_content)[1:-1]
             logger.info(f"Sending diff ({len(diff_content)} chars) to {self.model}")
 
-            await global_limiter.acquire()
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_stream(
                 messages=[
                     {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"Review this Code Diff:\n\n{safe_content}"}
+                    {"role": "user", "content": f"Review this Code Diff:\n\n{diff_content}"}
                 ],
                 max_tokens=8000,
-                temperature=0.2,
-                timeout=120,
-                stream=True
+                timeout=120
             )
             
             full_response = ""
@@ -125,51 +213,316 @@ class VertexReviewer:
             logger.error(f"AI Review Failed: {e}")
             return f"Error analyzing code: {str(e)}"
 
-    async def review_diff_structured(self, diff_content: str) -> list:
+    async def review_diff_structured(self, diff_content: str, context=None) -> list:
         """
         Returns structured list of issues for inline comments.
         Each item: {"path": str, "line": int, "severity": str, "body": str}
+
+        Large diffs are split into per-file/per-hunk chunks that are reviewed concurrently.
+        Raises ReviewFailed (carrying the issues that were found) if any chunk could not be
+        reviewed by any provider, so callers never mistake a failure for a clean review.
+        context: optional ReviewContext adding referenced definitions to each chunk's prompt.
         """
+        issues = []
         try:
-            safe_content = json.dumps(diff_content)[1:-1]
-            logger.info(f"Sending diff for structured review ({len(diff_content)} chars)")
+            async for issue in self.stream_issues(diff_content, context):
+                issues.append(issue)
+        except ReviewFailed as e:
+            raise ReviewFailed(str(e), issues)
 
-            await global_limiter.acquire()
+        logger.info(f"Found {len(issues)} issues")
+        return issues
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": INLINE_SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Review this diff:\n\n{safe_content}"}
-                ],
-                max_tokens=2000,
-                temperature=0.2,
-                timeout=60,
-                stream=True
-            )
-            
-            raw = ""
+    async def stream_issues(self, diff_content: str, context=None, policy=None, report: dict = None,
+                            checkpoint=None):
+        """
+        Async generator over the (deduplicated) issues of a diff: cached findings first,
+        then each chunk's findings as soon as its review finishes, so consumers can start
+        validating and batching comments while other chunks are still generating.
+        Raises ReviewFailed at the end if any chunk could not be reviewed.
+
+        policy: ReviewPolicy (.vertexrabbit.yml) deciding excluded paths, the model tier of
+        each file, triage and the per-PR token budget.
+        report: optional dict that receives counts of triaged-out hunks and chunks dropped
+        by the token budget.
+        checkpoint: optional callable run before each chunk starts and after each one
+        finishes; whatever it raises (e.g. JobCancelled for a superseded job) stops the
+        review and cancels the chunks still in flight.
+        """
+        policy = policy or DEFAULT_POLICY
+        report = report if report is not None else {}
+        files = [f for f in parse_diff(diff_content) if not policy.excluded(f.path)]
+
+        # Without a fast provider every file goes to the main model
+        tiers = {"strong": [], "default": [], "fast": []}
+        for file in files:
+            tier = policy.tier(file.path)
+            tiers["default" if tier == "fast" and not self.fast_provider else tier].append(file)
+
+        cached_issues = []
+        pending = {}
+        for tier, tier_files in tiers.items():
+            model = self.models[self.fast_provider] if tier == "fast" and self.fast_provider else self.model
+            found, pending[tier] = self._lookup_cache(tier_files, model)
+            cached_issues += found
+
+        if policy.triage and self.fast_provider and pending["default"]:
+            pending["default"], report["triaged_out"] = await self._triage(pending["default"])
+
+        # Most critical tier first, so the token budget runs out on the least important code
+        chunks = [(c, tier) for tier in ("strong", "default", "fast")
+                  for c in chunk_diff(pending[tier], settings.REVIEW_CHUNK_TOKENS)]
+        if policy.max_tokens:
+            extra = settings.REVIEW_CONTEXT_TOKENS if context else 0
+            spent = 0
+            for n, (chunk, _) in enumerate(chunks):
+                spent += chunk.tokens + extra + REVIEW_MAX_TOKENS
+                if spent > policy.max_tokens:
+                    report["over_budget"] = len(chunks) - n
+                    logger.warning(f"Token budget of {policy.max_tokens} reached; "
+                                   f"{len(chunks) - n} of {len(chunks)} chunk(s) not reviewed")
+                    chunks = chunks[:n]
+                    break
+
+        logger.info(f"Reviewing diff ({len(diff_content)} chars) in {len(chunks)} chunk(s)")
+        semaphore = asyncio.Semaphore(settings.REVIEW_MAX_CONCURRENCY)
+
+        async def review(chunk, tier):
+            async with semaphore:
+                if checkpoint:
+                    checkpoint()
+                try:
+                    extra = context.render(chunk.files) if context else ""
+                    return chunk, await self._review_chunk(chunk.text, extra, tier)
+                except Exception as e:
+                    return chunk, e
+
+        seen = set()
+
+        def fresh(found):
+            for issue in found:
+                key = (issue.get("path"), issue.get("line"), str(issue.get("body", "")).strip().lower())
+                if key not in seen:
+                    seen.add(key)
+                    yield issue
+
+        for issue in fresh(cached_issues):
+            yield issue
+
+        tasks = [asyncio.create_task(review(c, tier)) for c, tier in chunks]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                chunk, result = await next_done
+                if checkpoint:
+                    checkpoint()
+                if isinstance(result, Exception):
+                    logger.error(f"Chunk review failed ({', '.join(f.path for f in chunk.files)}): {result}")
+                    failed += 1
+                    # Objects parsed before the stream broke are still worth posting (never cached)
+                    for issue in fresh(getattr(result, "issues", [])):
+                        yield issue
+                    continue
+                provider, chunk_issues = result
+                self._store_cache(chunk, chunk_issues, self.models[provider])
+                for issue in fresh(chunk_issues):
+                    yield issue
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if failed:
+            raise ReviewFailed(f"{failed} of {len(chunks)} diff chunk(s) could not be reviewed")
+
+    async def _triage(self, files: list) -> tuple:
+        """
+        Asks the fast provider which hunks need the main model. Returns (FileDiffs keeping
+        only those hunks, number of hunks dropped). Any failure keeps every hunk.
+        """
+        hunks = [(file, hunk) for file in files for hunk in file.hunks]
+        keep = set()
+        batch = []
+        batch_tokens = 0
+
+        async def ask(batch):
+            listing = "\n\n".join(f"### Hunk {n} ({file.path})\n{hunk.text}" for n, (file, hunk) in batch)
+            try:
+                answer = await self._complete(
+                    self.fast_provider, TRIAGE_SYSTEM_PROMPT, TRIAGE_USER_PROMPT.format(hunks=listing), 200
+                )
+                match = TRIAGE_ANSWER.search(answer)
+                if match is None:
+                    raise ValueError(f"unexpected triage answer: {answer[:100]!r}")
+                return {int(n) for n in json.loads(match.group(0))}
+            except Exception as e:
+                logger.warning(f"Triage failed, reviewing all {len(batch)} hunk(s): {e}")
+                return {n for n, _ in batch}
+
+        requests = []
+        for n, (file, hunk) in enumerate(hunks, 1):
+            cost = estimate_tokens(hunk.text)
+            if batch and batch_tokens + cost > settings.REVIEW_CHUNK_TOKENS:
+                requests.append(ask(batch))
+                batch, batch_tokens = [], 0
+            batch.append((n, (file, hunk)))
+            batch_tokens += cost
+        if batch:
+            requests.append(ask(batch))
+        for flagged in await asyncio.gather(*requests):
+            keep |= flagged
+
+        kept = []
+        for file in files:
+            file_hunks = [h for n, (f, h) in enumerate(hunks, 1) if f is file and n in keep]
+            if file_hunks:
+                kept.append(replace(file, hunks=file_hunks))
+        dropped = len(hunks) - sum(len(f.hunks) for f in kept)
+        logger.info(f"Triage: {len(hunks) - dropped} of {len(hunks)} hunk(s) need the main model")
+        return kept, dropped
+
+    async def _complete(self, provider: str, system: str, prompt: str, max_tokens: int) -> str:
+        """Plain (non-JSON-streamed) completion on one provider"""
+        response = await self._create_stream(
+            messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            timeout=30,
+            provider=provider
+        )
+        text = []
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                text.append(chunk.choices[0].delta.content)
+        return "".join(text)
+
+    def _lookup_cache(self, files: list, model: str = None):
+        """
+        Splits files into reviewable hunks and resolves the ones already in the review cache.
+        Returns (cached issues remapped to current line numbers, FileDiffs still needing review).
+        """
+        model = model or self.model
+        if review_cache is None:
+            return [], files
+
+        issues = []
+        pending = []
+        hits = 0
+        for file in files:
+            if file.binary or file.deleted:
+                continue
+            for piece in split_file(file, settings.REVIEW_CHUNK_TOKENS):
+                misses = []
+                for hunk in piece.hunks:
+                    cached = review_cache.get(hunk_key(hunk, model, self.prompt_hash))
+                    if cached is None:
+                        misses.append(hunk)
+                        continue
+                    hits += 1
+                    for item in cached:
+                        issue = {k: v for k, v in item.items() if k != "offset"}
+                        issue["path"] = file.path
+                        issue["line"] = hunk.new_start + item["offset"]
+                        issues.append(issue)
+                if misses:
+                    pending.append(replace(piece, hunks=misses))
+
+        if hits:
+            logger.info(f"Review cache: {hits} hunk(s) reused with {len(issues)} issue(s), {review_cache.stats()}")
+        return issues, pending
+
+    def _store_cache(self, chunk, issues: list, model: str):
+        """Files each issue under the hunk containing its line (clean hunks are cached as [])"""
+        if review_cache is None:
+            return
+
+        for file in chunk.files:
+            for hunk in file.hunks:
+                end = hunk.new_start + max(hunk.new_count, 1)
+                entries = []
+                for issue in issues:
+                    line = issue.get("line")
+                    if issue.get("path") == file.path and isinstance(line, int) and hunk.new_start <= line < end:
+                        entry = {k: v for k, v in issue.items() if k not in ("path", "line")}
+                        entry["offset"] = line - hunk.new_start
+                        entries.append(entry)
+                review_cache.put(hunk_key(hunk, model, self.prompt_hash), entries)
+
+    async def _review_chunk(self, chunk_text: str, context_text: str = "", tier: str = "default") -> tuple:
+        """
+        Reviews one diff chunk on the healthiest provider, failing over (and optionally
+        hedging) across providers. Returns (provider, issues); raises ReviewFailed.
+        tier "fast" starts on the fast provider; other tiers use the main providers.
+        """
+        prompt = INLINE_USER_PROMPT.format(diff=chunk_text)
+        if context_text:
+            prompt += "\n\n" + context_text
+
+        async def attempt(provider, on_first_token):
+            return provider, await self._review_chunk_with(provider, prompt, on_first_token)
+
+        if tier == "fast" and self.fast_provider:
+            return await self.router.call(attempt, prefer=self.fast_provider)
+        return await self.router.call(attempt, providers=self.main_providers)
+
+    async def _review_chunk_with(self, provider: str, prompt: str, on_first_token) -> list:
+        """Reviews one diff chunk on one provider. Raises on API or parse errors."""
+        model = self.models[provider]
+        with tracing.span("llm.review_chunk", provider=provider, model=model) as call:
+            try:
+                issues = await self._stream_chunk(provider, model, prompt, on_first_token, call)
+            except asyncio.CancelledError:
+                LLM_REQUESTS.inc(provider=provider, model=model, outcome="cancelled")
+                raise
+            except Exception:
+                LLM_REQUESTS.inc(provider=provider, model=model, outcome="error")
+                raise
+            LLM_REQUESTS.inc(provider=provider, model=model, outcome="ok")
+            call.set(issues=len(issues))
+            return issues
+
+    async def _stream_chunk(self, provider: str, model: str, prompt: str, on_first_token, call) -> list:
+        started = time.monotonic()
+        response = await self._create_stream(
+            messages=[
+                {"role": "system", "content": INLINE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=REVIEW_MAX_TOKENS,
+            timeout=60,
+            provider=provider
+        )
+
+        first_token_at = None
+        completion_chars = 0
+
+        async def deltas():
+            nonlocal first_token_at, completion_chars
             async for chunk in response:
                 if chunk.choices and chunk.choices[0].delta.content:
-                    raw += chunk.choices[0].delta.content
-            
-            raw = raw.strip()
-            
-            import re
-            json_match = re.search(r'\[.*\]', raw, re.DOTALL)
-            if json_match:
-                clean = json_match.group(0)
-            else:
-                clean = raw.replace("```json", "").replace("```", "").strip()
-            
-            issues = json.loads(clean)
-            logger.info(f"Found {len(issues)} issues")
-            return issues
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                        LLM_TTFT_SECONDS.observe(first_token_at - started, provider=provider, model=model)
+                        call.set(ttft=round(first_token_at - started, 3))
+                    on_first_token()
+                    completion_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI JSON response: {e}")
-            return []
+        # Each issue is decoded as soon as its object closes; a bad object only loses itself.
+        # Truncated or non-JSON output raises ReviewFailed: the router fails over and the
+        # chunk is never cached as clean
+        issues = []
+        try:
+            async for issue in iter_issues(deltas()):
+                issues.append(issue)
+        except ReviewFailed as e:
+            raise ReviewFailed(f"{provider}: {e}", e.issues) from e
         except Exception as e:
-            logger.error(f"Structured AI Review Failed: {e}")
-            return []
+            if not issues:
+                raise
+            raise ReviewFailed(f"{provider} stream broke after {len(issues)} issue(s): {e}", issues) from e
 
+        if first_token_at is not None:
+            generating = time.monotonic() - first_token_at
+            if generating > 0:
+                # Same ~4 characters per token estimate as the chunker
+                LLM_TOKENS_PER_SECOND.observe(completion_chars / 4 / generating, provider=provider, model=model)
+        return issues
@@ -0,0 +1,173 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+from openai import RateLimitError
+
+logger = logging.getLogger("provider_router")
+
+
+class ReviewFailed(Exception):
+    """Every provider failed. `issues` holds whatever was found before giving up."""
+
+    def __init__(self, message: str, issues: list = None):
+        super().__init__(message)
+        self.issues = issues or []
+
+
+class ProviderHealth:
+    """Rolling latency and error statistics for one provider"""
+
+    def __init__(self, window: int = 100, alpha: float = 0.2):
+        self.ttft = deque(maxlen=window)  # Recent time-to-first-token samples (seconds)
+        self.alpha = alpha
+        self.latency = None  # EWMA of time-to-first-token
+        self.error_rate = 0.0  # EWMA of failures (0..1)
+        self.cooldown_until = 0.0
+
+    def record_first_token(self, seconds: float):
+        self.ttft.append(seconds)
+        self.latency = seconds if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * seconds
+
+    def record_success(self):
+        self.error_rate *= (1 - self.alpha)
+
+    def record_failure(self, cooldown: float = 0):
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        if cooldown:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+    def percentile(self, q: float):
+        if not self.ttft:
+            return None
+        samples = sorted(self.ttft)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def score(self) -> float:
+        """Lower is better; providers cooling down after a 429 sort last"""
+        if self.cooldown_until > time.monotonic():
+            return float("inf")
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1 + 4 * self.error_rate)
+
+    def snapshot(self) -> dict:
+        return {
+            "latency_ewma": round(self.latency, 3) if self.latency is not None else None,
+            "ttft_p95": round(self.percentile(0.95), 3) if self.ttft else None,
+            "error_rate": round(self.error_rate, 3),
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class ProviderRouter:
+    """
+    Picks the healthiest provider for each request and fails over on errors or 429s.
+
+    With hedging enabled, if the chosen provider has not streamed its first token by its
+    own p95 time-to-first-token (never sooner than hedge_min_delay), a backup request is
+    fired at the next provider and whichever finishes first wins.
+    """
+
+    def __init__(self, providers: list, hedge: bool = False, hedge_percentile: float = 0.95,
+                 hedge_min_delay: float = 2.0, rate_limit_cooldown: float = 30):
+        self.providers = list(providers)  # In preference order (ties keep this order)
+        self.health = {p: ProviderHealth() for p in self.providers}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.rate_limit_cooldown = rate_limit_cooldown
+
+    def ranked(self, providers: list = None, prefer: str = None) -> list:
+        """providers: candidates (default: all); prefer: tried first whatever its score"""
+        ranked = sorted(providers or self.providers, key=lambda p: self.health[p].score())
+        if prefer in ranked:
+            ranked.remove(prefer)
+            ranked.insert(0, prefer)
+        return ranked
+
+    def hedge_delay(self, provider: str) -> float:
+        p95 = self.health[provider].percentile(self.hedge_percentile)
+        return max(self.hedge_min_delay, p95 or 0)
+
+    async def _attempt(self, provider: str, attempt, first_token: asyncio.Event):
+        health = self.health[provider]
+        started = time.monotonic()
+
+        def on_first_token():
+            if not first_token.is_set():
+                first_token.set()
+                health.record_first_token(time.monotonic() - started)
+
+        try:
+            result = await attempt(provider, on_first_token)
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the provider's fault
+            raise
+        except RateLimitError:
+            health.record_failure(cooldown=self.rate_limit_cooldown)
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success()
+        return result
+
+    async def call(self, attempt, providers: list = None, prefer: str = None):
+        """
+        attempt: async callable (provider, on_first_token) -> result. It must call
+        on_first_token() when the first streamed content arrives.
+        providers / prefer: see ranked().
+        """
+        remaining = self.ranked(providers, prefer)
+        running = {}  # task -> (provider, first_token event, launched at)
+        errors = []
+        partial = []  # Most issues any failed attempt managed to stream before breaking
+
+        def launch():
+            provider = remaining.pop(0)
+            first_token = asyncio.Event()
+            task = asyncio.create_task(self._attempt(provider, attempt, first_token))
+            running[task] = (provider, first_token, time.monotonic())
+
+        launch()
+        hedged = False
+        try:
+            while running:
+                timeout = None
+                if self.hedge and not hedged and remaining and len(running) == 1:
+                    provider, first_token, launched = next(iter(running.values()))
+                    if not first_token.is_set():
+                        timeout = max(0.0, launched + self.hedge_delay(provider) - time.monotonic())
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    provider, first_token, _ = next(iter(running.values()))
+                    if not first_token.is_set():
+                        logger.warning(f"{provider} has no first token after {self.hedge_delay(provider):.1f}s, "
+                                       f"hedging with {remaining[0]}")
+                        hedged = True
+                        launch()
+                    continue
+
+                for task in done:
+                    provider, _, _ = running.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    errors.append(f"{provider}: {error}")
+                    logger.warning(f"Provider {provider} failed: {error}")
+                    if len(getattr(error, "issues", [])) > len(partial):
+                        partial = error.issues
+
+                if not running and remaining:
+                    launch()
+
+            raise ReviewFailed("All providers failed: " + "; ".join(errors), partial)
+        finally:
+            for task in running:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {p: self.health[p].snapshot() for p in self.providers}
@@ -0,0 +1,108 @@
+import json
+import logging
+
+from app.ai.router import ReviewFailed
+
+logger = logging.getLogger("stream_parser")
+
+
+class IssueStreamParser:
+    """
+    Incremental parser for the model's issue array.
+
+    Text is fed in as it streams; every top-level JSON object is decoded the moment its
+    closing brace arrives. Anything outside objects (the surrounding `[`, commas, markdown
+    fences, chatter) is ignored, and an object that fails to decode is skipped on its own,
+    so a truncated or malformed tail never costs the objects before it.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.opened = False  # Saw a top-level `[` or `{`: the reply is JSON at all
+        self.in_array = False  # Inside the top-level array (a missing `]` means truncation)
+        self.in_string = False
+        self.escape = False
+        self.parts = []  # Fragments of the object currently being captured
+        self.skipped = 0
+
+    def feed(self, text: str) -> list:
+        """Consumes the next piece of text and returns the objects completed by it"""
+        completed = []
+        start = 0 if self.depth else None
+
+        for i, char in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Quotes only matter inside an object; prose around the array is skipped
+                self.in_string = self.depth > 0
+            elif char == "{":
+                if self.depth == 0:
+                    start = i
+                    self.opened = True
+                self.depth += 1
+            elif self.depth == 0 and char == "[":
+                self.opened = self.in_array = True
+            elif self.depth == 0 and char == "]":
+                self.in_array = False
+            elif char == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.parts.append(text[start:i + 1])
+                    obj = self._decode("".join(self.parts))
+                    self.parts = []
+                    start = None
+                    if obj is not None:
+                        completed.append(obj)
+
+        if self.depth and start is not None:
+            self.parts.append(text[start:])
+        return completed
+
+    def close(self) -> bool:
+        """Ends the stream; returns False if it stopped in the middle of an object or the array"""
+        truncated = self.depth > 0 or self.in_array
+        if self.depth:
+            logger.warning("Model output ended inside an issue object; dropping the incomplete tail")
+            self.skipped += 1
+        self.depth = 0
+        self.in_array = False
+        self.in_string = self.escape = False
+        self.parts = []
+        return not truncated
+
+    def _decode(self, raw: str):
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed issue object ({e}): {raw[:200]}")
+            self.skipped += 1
+            return None
+        if not isinstance(obj, dict):
+            return None
+        return obj
+
+
+async def iter_issues(deltas):
+    """
+    Yields issue dicts from an async iterable of text deltas as soon as each one is
+    complete, before the model has finished generating the rest of the array.
+
+    Raises ReviewFailed (carrying the issues yielded so far) if the output was cut off or
+    was not JSON at all (e.g. a refusal), so neither passes for a clean review.
+    """
+    parser = IssueStreamParser()
+    issues = []
+    async for text in deltas:
+        for issue in parser.feed(text):
+            issues.append(issue)
+            yield issue
+    if not parser.close():
+        raise ReviewFailed(f"Model output was cut off after {len(issues)} issue(s)", issues)
+    if not parser.opened:
+        raise ReviewFailed("Model output contained no JSON array", issues)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, HTTPException
+from app.core.jobs import job_queue
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Reports status and progress of a background review job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
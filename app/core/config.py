@@ -27,6 +27,40 @@ class Settings(BaseSettings):
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     
     # A4F Config (Moved to top as default)
+
+    # Failover: comma-separated providers to fall back to (default: every provider with an API key)
+    AI_FALLBACK_PROVIDERS: str = os.getenv("AI_FALLBACK_PROVIDERS", "")
+    # Hedging: fire a backup request if no first token arrives within the provider's p95 TTFT
+    AI_HEDGE_ENABLED: bool = os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+    AI_HEDGE_MIN_DELAY: float = float(os.getenv("AI_HEDGE_MIN_DELAY", "2.0"))
+    # Small, fast model for `fast` routes and hunk triage in a repo's .vertexrabbit.yml (e.g. "groq").
+    # It then serves only those; leave empty to send everything to the main providers.
+    AI_FAST_PROVIDER: str = os.getenv("AI_FAST_PROVIDER", "")
+
+    @property
+    def AI_FALLBACK_PROVIDER_LIST(self):
+        """None means "every configured provider" """
+        if not self.AI_FALLBACK_PROVIDERS:
+            return None
+        return [p.strip() for p in self.AI_FALLBACK_PROVIDERS.split(",") if p.strip()]
+
+    # Rate Limits per provider (requests / tokens per minute; 0 disables a dimension)
+    A4F_RPM: int = int(os.getenv("A4F_RPM", "10"))
+    A4F_TPM: int = int(os.getenv("A4F_TPM", "0"))
+    OPENROUTER_RPM: int = int(os.getenv("OPENROUTER_RPM", "10"))
+    OPENROUTER_TPM: int = int(os.getenv("OPENROUTER_TPM", "0"))
+    GROQ_RPM: int = int(os.getenv("GROQ_RPM", "10"))
+    GROQ_TPM: int = int(os.getenv("GROQ_TPM", "0"))
+
+    # Where limiter state lives: "sqlite" (shared by every process using DATA_DIR),
+    # "memory" (per process) or "redis" (needs the redis package and REDIS_URL)
+    LIMITER_BACKEND: str = os.getenv("LIMITER_BACKEND", "sqlite")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    def provider_limits(self, provider: str) -> tuple:
+        """(requests per minute, tokens per minute) for a provider"""
+        prefix = provider.upper()
+        return getattr(self, f"{prefix}_RPM", 10), getattr(self, f"{prefix}_TPM", 0)
     
     # Legacy aliases for backward compatibility
     @property
@@ -45,6 +79,19 @@ class Settings(BaseSettings):
     GITHUB_APP_ID: str = os.getenv("GITHUB_APP_ID", "")
     GITHUB_PRIVATE_KEY_PATH: str = os.getenv("GITHUB_PRIVATE_KEY_PATH", "")
     GITHUB_WEBHOOK_SECRET: str = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+    # Redelivered webhooks (same X-GitHub-Delivery) within this many seconds are ignored
+    WEBHOOK_DELIVERY_TTL: int = int(os.getenv("WEBHOOK_DELIVERY_TTL", str(3 * 86400)))
+    GITHUB_API_URL: str = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    # Base URL repositories are cloned from (GitHub Enterprise, or file:// mirrors for benchmarks)
+    GITHUB_GIT_URL: str = os.getenv("GITHUB_GIT_URL", "https://github.com")
+    # Refresh installation tokens this many seconds before they expire
+    GITHUB_TOKEN_REFRESH_MARGIN: int = int(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN", "300"))
+    # Content-creating requests (comments, reviews, issues) are paced to stay clear of
+    # GitHub's secondary rate limits: per installation, per minute and spaced apart
+    GITHUB_WRITES_PER_MINUTE: int = int(os.getenv("GITHUB_WRITES_PER_MINUTE", "60"))
+    GITHUB_WRITE_INTERVAL: float = float(os.getenv("GITHUB_WRITE_INTERVAL", "1.0"))
+    # Retries after a rate-limited (403/429) response, honoring Retry-After
+    GITHUB_MAX_RETRIES: int = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
     
     @property
     def GITHUB_PRIVATE_KEY(self) -> str:
@@ -54,6 +101,106 @@ class Settings(BaseSettings):
                 return f.read()
         return ""
 
+    # AI Review
+    # Diffs are split into chunks of at most this many (estimated) prompt tokens
+    REVIEW_CHUNK_TOKENS: int = int(os.getenv("REVIEW_CHUNK_TOKENS", "6000"))
+    REVIEW_MAX_CONCURRENCY: int = int(os.getenv("REVIEW_MAX_CONCURRENCY", "4"))
+    # Per-hunk cache of AI findings (keyed by hunk content + model + prompt)
+    REVIEW_CACHE_ENABLED: bool = os.getenv("REVIEW_CACHE_ENABLED", "true").lower() == "true"
+    REVIEW_CACHE_TTL: int = int(os.getenv("REVIEW_CACHE_TTL", str(7 * 86400)))
+    REVIEW_CACHE_MAX_ENTRIES: int = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "50000"))
+    # Token budget per chunk for definitions referenced by the diff (0 disables context)
+    REVIEW_CONTEXT_TOKENS: int = int(os.getenv("REVIEW_CONTEXT_TOKENS", "1500"))
+    # Seconds the AI review waits for that context (checkout + symbol index) once the diff
+    # and policy are in, before going ahead without it; covers a cold mirror clone
+    REVIEW_CONTEXT_DEADLINE: float = float(os.getenv("REVIEW_CONTEXT_DEADLINE", "30"))
+
+    # Diff Ingestion (the PR diff is streamed and filtered file by file)
+    # Files never reviewed (gitignore-style globs; .gitattributes linguist-generated/vendored also apply).
+    # Build and vendor directories only at the repo root: src/build/ is usually real source
+    DIFF_EXCLUDE_GLOBS: str = os.getenv("DIFF_EXCLUDE_GLOBS", ",".join([
+        "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+        "Pipfile.lock", "uv.lock", "Cargo.lock", "go.sum", "composer.lock", "Gemfile.lock",
+        "/vendor/", "node_modules/", "/third_party/", "/dist/", "/build/",
+        "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.snap",
+    ]))
+    # Per-file and whole-diff caps on reviewed diff text (bytes; 0 disables)
+    DIFF_MAX_FILE_BYTES: int = int(os.getenv("DIFF_MAX_FILE_BYTES", str(256 * 1024)))
+    DIFF_MAX_TOTAL_BYTES: int = int(os.getenv("DIFF_MAX_TOTAL_BYTES", str(2 * 1024 * 1024)))
+
+    # Storage (job queue, caches)
+    DATA_DIR: str = os.getenv("DATA_DIR", ".vertexrabbit")
+
+    # Repository Mirrors (bare repo per GitHub repo, checked out via git worktree)
+    MIRROR_MAX_BYTES: int = int(os.getenv("MIRROR_MAX_BYTES", str(20 * 1024 ** 3)))
+    # 0 fetches full history
+    MIRROR_FETCH_DEPTH: int = int(os.getenv("MIRROR_FETCH_DEPTH", "1"))
+
+    # SAST Scanners (run concurrently; tools that are not installed are skipped)
+    # Options: bandit, semgrep, ruff, eslint, gitleaks
+    SAST_SCANNERS: str = os.getenv("SAST_SCANNERS", "bandit,semgrep,ruff,eslint,gitleaks")
+    SAST_TIMEOUT: int = int(os.getenv("SAST_TIMEOUT", "300"))
+    # Max scanner processes running at once (defaults to the number of CPUs)
+    SAST_CPU_SLOTS: int = int(os.getenv("SAST_CPU_SLOTS", str(os.cpu_count() or 2)))
+    # Local Semgrep rules file/dir; Semgrep is skipped when unset
+    SEMGREP_CONFIG: str = os.getenv("SEMGREP_CONFIG", "")
+
+    # Background Jobs
+    # Options: "sqlite" (persistent, default), "memory"
+    JOB_STORE: str = os.getenv("JOB_STORE", "sqlite")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_PENDING: int = int(os.getenv("JOB_MAX_PENDING", "100"))
+    # Run jobs inside the web process. Set to false for a stateless web tier and start
+    # `python -m app worker` processes (same DATA_DIR, JOB_STORE=sqlite) to run them.
+    JOB_RUN_IN_WEB: bool = os.getenv("JOB_RUN_IN_WEB", "true").lower() == "true"
+    # Workers lease jobs and heartbeat every third of the lease; a job whose worker dies
+    # is re-delivered once the lease expires, at most JOB_MAX_ATTEMPTS times
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # How often idle workers check the store for jobs queued by other processes
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    # Quiet window (seconds) after a `synchronize` push before the review starts.
+    # Further pushes to the same PR within the window replace the queued review.
+    REVIEW_QUIET_WINDOW: float = float(os.getenv("REVIEW_QUIET_WINDOW", "20"))
+    # Fingerprints of posted/ticketed findings are dropped when the PR closes, or after
+    # this many seconds without being seen (closed events that never arrived)
+    FINDINGS_TTL: int = int(os.getenv("FINDINGS_TTL", str(90 * 86400)))
+
+    # Observability: spans are exported as JSON lines to "console" (log) or "file" (TRACE_PATH)
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "")
+
+    @property
+    def SAST_SCANNER_LIST(self) -> list:
+        return [name.strip() for name in self.SAST_SCANNERS.split(",") if name.strip()]
+
+    @property
+    def DIFF_EXCLUDE_LIST(self) -> list:
+        return [glob.strip() for glob in self.DIFF_EXCLUDE_GLOBS.split(",") if glob.strip()]
+
+    @property
+    def JOB_DB_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "jobs.db")
+
+    @property
+    def REVIEW_CACHE_DB_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "review_cache.db")
+
+    @property
+    def STATE_DB_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "state.db")
+
+    @property
+    def LIMITER_DB_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "limiter.db")
+
+    @property
+    def SYMBOLS_DB_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "symbols.db")
+
+    @property
+    def TRACE_PATH(self) -> str:
+        return os.path.join(self.DATA_DIR, "traces.jsonl")
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,49 @@
+"""
+Process-wide service instances, built on first use.
+
+The GitHub client reads the App private key and the reviewer pulls in the OpenAI SDK;
+neither belongs on the import path of a web process that only verifies and queues
+webhooks. Request handlers get them through FastAPI's Depends(); the pipeline calls
+the same getters.
+"""
+import threading
+from importlib import import_module
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def _once(name: str, factory):
+    """Returns the named instance, calling factory() for it exactly once per process"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_github_client():
+    return _once("github_client", lambda: import_module("app.github.client").GitHubClient())
+
+
+def get_reviewer():
+    return _once("reviewer", lambda: import_module("app.ai.reviewer").VertexReviewer())
+
+
+def peek_reviewer():
+    """The reviewer if this process already built one, else None (never builds it)"""
+    return _instances.get("reviewer")
+
+
+def warm_up():
+    """Builds the clients a job will need (blocking; run it in a thread)"""
+    get_github_client()
+    get_reviewer()
+
+
+async def close():
+    """Releases whatever was built: the shared GitHub connection pool"""
+    if "github_client" in _instances:
+        await import_module("app.github.client").close_http_client()
@@ -0,0 +1,54 @@
+"""
+Stable fingerprints of review findings.
+
+A fingerprint covers repo + path + the normalized code on the finding's line + the
+scanner rule (or, for model findings, the normalized message). The line number itself
+is left out, so a finding that only moved because code above it changed keeps its
+fingerprint, while editing the flagged line makes it a new finding.
+"""
+import re
+import hashlib
+
+
+def normalize_code(line: str) -> str:
+    """Whitespace-insensitive form of a source line (re-indenting is not a new finding)"""
+    return re.sub(r"\s+", " ", line or "").strip()
+
+
+def normalize_message(body: str) -> str:
+    """Case-, whitespace- and number-insensitive form of a message ("line 12" == "line 14")"""
+    return re.sub(r"\d+", "#", re.sub(r"\s+", " ", str(body or "")).strip().lower())
+
+
+def fingerprint(repo: str, issue: dict, code: str = "") -> str:
+    rule = issue.get("rule") or normalize_message(issue.get("body"))
+    rule_hash = hashlib.sha256(rule.encode()).hexdigest()[:16]
+    key = "\n".join((repo, str(issue.get("path")), normalize_code(code), rule_hash))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def code_lines(files: list, issues: list) -> dict:
+    """(path, new line number) -> content, for the lines of the diff that issues point at"""
+    wanted = {}
+    for issue in issues:
+        if isinstance(issue.get("line"), int):
+            wanted.setdefault(issue.get("path"), set()).add(issue["line"])
+
+    lines = {}
+    for file in files:
+        targets = wanted.get(file.path)
+        if not targets:
+            continue
+        for hunk in file.hunks:
+            for number, _, content in hunk.new_lines():
+                if number in targets:
+                    lines[(file.path, number)] = content
+    return lines
+
+
+def stamp_fingerprints(repo: str, issues: list, files: list) -> list:
+    """Sets issue["fingerprint"] on every issue, using the PR diff for the code snippets"""
+    lines = code_lines(files, issues)
+    for issue in issues:
+        issue["fingerprint"] = fingerprint(repo, issue, lines.get((issue.get("path"), issue.get("line")), ""))
+    return issues
@@ -0,0 +1,641 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+
+from app.core.config import settings
+from app.core.db import connect
+from app.core import tracing
+from app.core.metrics import JOBS, QUEUE_DEPTH
+
+logger = logging.getLogger("jobs")
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    SUPERSEDED = "superseded"
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are pending and new work must be rejected"""
+
+
+class JobCancelled(Exception):
+    """Raised at a progress checkpoint once a newer job has superseded this one"""
+
+
+class LeaseLost(JobCancelled):
+    """Raised at a progress checkpoint once another worker has taken over the job"""
+
+
+@dataclass
+class Job:
+    kind: str
+    payload: dict
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    key: str = ""
+    version: str = ""
+    run_after: float = 0.0
+    status: str = JobStatus.QUEUED
+    stage: str = ""
+    result: dict = field(default_factory=dict)
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Set while a worker holds the job; an expired lease makes it claimable again
+    lease_owner: str = ""
+    lease_expires: float = 0.0
+    attempts: int = 0
+    cancel_requested: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobStore:
+    """
+    Persistence backend for jobs. Subclass to plug in a different storage engine.
+    """
+
+    def add(self, job: Job):
+        raise NotImplementedError
+
+    def get(self, job_id: str):
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def count(self, status: str) -> int:
+        raise NotImplementedError
+
+    def unfinished(self) -> list:
+        """Jobs that are queued or running, oldest first"""
+        raise NotImplementedError
+
+    def active(self, key: str) -> list:
+        """Queued or running jobs sharing a coalescing key"""
+        raise NotImplementedError
+
+    def supersede(self, key: str, keep_id: str) -> list:
+        """Marks every other queued job with this key as superseded and returns their IDs"""
+        raise NotImplementedError
+
+    def request_cancel(self, key: str, version: str) -> int:
+        """Flags running jobs with this key but another version; their workers cancel them"""
+        raise NotImplementedError
+
+    def claim(self, owner: str, kinds: list, lease: float, max_attempts: int):
+        """
+        Atomically leases the oldest runnable job of one of `kinds`: queued and due, or
+        running under an expired lease (its worker died). Jobs whose lease expired
+        `max_attempts` times are failed instead. Returns the Job or None.
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, owner: str, lease: float):
+        """Extends a lease; returns the job's cancel flag, or None if the lease was lost"""
+        raise NotImplementedError
+
+    def finish(self, job_id: str, owner: str, **fields) -> bool:
+        """update() that only applies while `owner` still holds the lease"""
+        raise NotImplementedError
+
+    def release(self, job_id: str, owner: str):
+        """Hands a leased job back to the queue right away (graceful shutdown)"""
+        self.finish(job_id, owner, status=JobStatus.QUEUED, stage="requeued", lease_owner="", lease_expires=0.0)
+
+
+class MemoryJobStore(JobStore):
+    """Non-persistent store, useful for local development"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.RLock()  # Workers call the store from threads
+
+    def add(self, job: Job):
+        self.jobs[job.id] = job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                for key, value in fields.items():
+                    setattr(job, key, value)
+                job.updated_at = time.time()
+
+    def count(self, status: str) -> int:
+        return sum(1 for j in self.jobs.values() if j.status == status)
+
+    def unfinished(self) -> list:
+        pending = [j for j in self.jobs.values() if j.status in (JobStatus.QUEUED, JobStatus.RUNNING)]
+        return sorted(pending, key=lambda j: j.created_at)
+
+    def active(self, key: str) -> list:
+        return [j for j in self.unfinished() if j.key == key]
+
+    def supersede(self, key: str, keep_id: str) -> list:
+        dropped = [j.id for j in self.active(key) if j.status == JobStatus.QUEUED and j.id != keep_id]
+        for job_id in dropped:
+            self.update(job_id, status=JobStatus.SUPERSEDED)
+        return dropped
+
+    def request_cancel(self, key: str, version: str) -> int:
+        running = [j for j in self.active(key) if j.status == JobStatus.RUNNING and j.version != version]
+        for job in running:
+            job.cancel_requested = True
+        return len(running)
+
+    def claim(self, owner: str, kinds: list, lease: float, max_attempts: int):
+        now = time.time()
+        with self.lock:
+            for job in self.unfinished():
+                if job.kind not in kinds:
+                    continue
+                expired = job.status == JobStatus.RUNNING and job.lease_expires < now
+                if expired and job.attempts >= max_attempts:
+                    self.update(job.id, status=JobStatus.FAILED, error=f"Abandoned after {job.attempts} attempts")
+                    continue
+                if expired or (job.status == JobStatus.QUEUED and job.run_after <= now):
+                    self.update(job.id, status=JobStatus.RUNNING, lease_owner=owner,
+                                lease_expires=now + lease, attempts=job.attempts + 1)
+                    return job
+        return None
+
+    def heartbeat(self, job_id: str, owner: str, lease: float):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.lease_owner != owner or job.status != JobStatus.RUNNING:
+                return None
+            job.lease_expires = time.time() + lease
+            return job.cancel_requested
+
+    def finish(self, job_id: str, owner: str, **fields) -> bool:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.lease_owner != owner:
+                return False
+            self.update(job_id, **fields)
+            return True
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Default store: jobs survive process restarts. Calls block (on the write lock when
+    several processes share the file), so JobQueue makes them from a thread.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT NOT NULL DEFAULT '',
+            result TEXT NOT NULL DEFAULT '{}',
+            error TEXT NOT NULL DEFAULT '',
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+    """
+
+    # Columns added after the first release: name -> definition
+    MIGRATIONS = {
+        "key": "TEXT NOT NULL DEFAULT ''",
+        "version": "TEXT NOT NULL DEFAULT ''",
+        "run_after": "REAL NOT NULL DEFAULT 0",
+        "lease_owner": "TEXT NOT NULL DEFAULT ''",
+        "lease_expires": "REAL NOT NULL DEFAULT 0",
+        "attempts": "INTEGER NOT NULL DEFAULT 0",
+        "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+    }
+
+    JSON_FIELDS = ("payload", "result")
+    # Claims and heartbeats give up on a busy database quickly and retry on the next
+    # poll / beat, rather than wait out connect()'s 30s while leases run down
+    LEASE_BUSY_TIMEOUT_MS = 2000
+
+    def __init__(self, path: str):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self._migrate()
+        self.lock = threading.Lock()
+
+    def _migrate(self):
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in self.MIGRATIONS.items():
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (key, status)")
+
+    @contextmanager
+    def _busy_timeout(self, ms: int):
+        """Lowers the busy timeout for the statements in the block (caller holds self.lock)"""
+        previous = self.conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        self.conn.execute(f"PRAGMA busy_timeout = {int(ms)}")
+        try:
+            yield
+        finally:
+            self.conn.execute(f"PRAGMA busy_timeout = {int(previous)}")
+
+    def _row_to_job(self, row) -> Job:
+        data = dict(row)
+        for key in self.JSON_FIELDS:
+            data[key] = json.loads(data[key])
+        data["cancel_requested"] = bool(data["cancel_requested"])
+        return Job(**data)
+
+    def add(self, job: Job):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, payload, key, version, run_after, status, stage, result, error, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, json.dumps(job.payload), job.key, job.version, job.run_after, job.status,
+                 job.stage, json.dumps(job.result), job.error, job.created_at, job.updated_at)
+            )
+
+    def get(self, job_id: str):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        self._update("id = ?", (job_id,), fields)
+
+    def _update(self, where: str, params: tuple, fields: dict) -> int:
+        fields["updated_at"] = time.time()
+        for key in self.JSON_FIELDS:
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.lock:
+            return self.conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE {where}", (*fields.values(), *params)
+            ).rowcount
+
+    def count(self, status: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def unfinished(self) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JobStatus.QUEUED, JobStatus.RUNNING)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def active(self, key: str) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at",
+                (key, JobStatus.QUEUED, JobStatus.RUNNING)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def supersede(self, key: str, keep_id: str) -> list:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status = ? AND id != ?",
+                    (key, JobStatus.QUEUED, keep_id)
+                ).fetchall()
+                dropped = [row["id"] for row in rows]
+                self.conn.executemany(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                    [(JobStatus.SUPERSEDED, time.time(), job_id) for job_id in dropped]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return dropped
+
+    def request_cancel(self, key: str, version: str) -> int:
+        return self._update("key = ? AND status = ? AND version != ?",
+                            (key, JobStatus.RUNNING, version), {"cancel_requested": 1})
+
+    def claim(self, owner: str, kinds: list, lease: float, max_attempts: int):
+        if not kinds:
+            return None
+        now = time.time()
+        placeholders = ",".join("?" * len(kinds))
+        with self.lock, self._busy_timeout(self.LEASE_BUSY_TIMEOUT_MS):
+            # IMMEDIATE takes the write lock up front, so two workers never lease the same job
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    f"UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ? "
+                    f"AND lease_expires < ? AND attempts >= ? AND kind IN ({placeholders})",
+                    (JobStatus.FAILED, f"Abandoned after {max_attempts} attempts", now,
+                     JobStatus.RUNNING, now, max_attempts, *kinds)
+                )
+                row = self.conn.execute(
+                    f"SELECT * FROM jobs WHERE kind IN ({placeholders}) AND ("
+                    f"(status = ? AND run_after <= ?) OR (status = ? AND lease_expires < ?)"
+                    f") ORDER BY created_at LIMIT 1",
+                    (*kinds, JobStatus.QUEUED, now, JobStatus.RUNNING, now)
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE id = ?",
+                        (JobStatus.RUNNING, owner, now + lease, now, row["id"])
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        job = self._row_to_job(row)
+        job.status, job.lease_owner, job.lease_expires = JobStatus.RUNNING, owner, now + lease
+        job.attempts += 1
+        return job
+
+    def heartbeat(self, job_id: str, owner: str, lease: float):
+        with self.lock, self._busy_timeout(self.LEASE_BUSY_TIMEOUT_MS):
+            self.conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (time.time() + lease, job_id, owner, JobStatus.RUNNING)
+            )
+            row = self.conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ? AND lease_owner = ? AND status = ?",
+                (job_id, owner, JobStatus.RUNNING)
+            ).fetchone()
+        return bool(row["cancel_requested"]) if row else None
+
+    def finish(self, job_id: str, owner: str, **fields) -> bool:
+        return self._update("id = ? AND lease_owner = ?", (job_id, owner), fields) > 0
+
+
+class JobContext:
+    """
+    Handed to job handlers so they can report progress.
+    progress() doubles as a cancellation checkpoint: once a newer job supersedes
+    this one (or another worker took it over), the next call raises JobCancelled.
+    """
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self.queue = queue
+        self.job = job
+        self.cancelled = False
+        self.lost = False
+        self.writer = None  # Task writing the latest stage to the store
+
+    def cancel(self):
+        self.cancelled = True
+
+    def lose(self):
+        self.lost = True
+
+    def check(self):
+        if self.lost:
+            raise LeaseLost(f"Lease on job {self.job.id} expired; another worker took it over")
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job.id} was superseded")
+
+    def progress(self, stage: str):
+        self.check()
+        self.job.stage = stage
+        # Written from a thread, latest stage only: a busy store must not stall the handler
+        if self.writer is None or self.writer.done():
+            self.writer = asyncio.create_task(self._write_stage())
+        logger.info(f"Job {self.job.id} → {stage}")
+
+    async def _write_stage(self):
+        written = None
+        while self.job.stage != written:
+            written = self.job.stage
+            try:
+                await asyncio.to_thread(self.queue.store.update, self.job.id, stage=written)
+            except Exception as e:
+                logger.warning(f"Could not record the stage of job {self.job.id}: {e}")
+                return
+
+    async def flush(self):
+        """Waits for the stage write in flight, so it cannot land after the final status"""
+        if self.writer:
+            await asyncio.gather(self.writer, return_exceptions=True)
+
+
+class JobQueue:
+    """
+    Async job queue with a bounded worker pool, backed by a store that several
+    processes on the same host (sharing a local DATA_DIR) can pull from.
+    Workers call the store from a thread, so waiting on its locks never blocks the loop.
+    - Jobs are persisted before being acknowledged.
+    - Workers lease jobs and heartbeat while running them; a job whose worker dies is
+      re-delivered once its lease expires, up to max_attempts times.
+    - Backpressure: enqueue() raises QueueFull once max_pending jobs are waiting.
+    - Coalescing: jobs sharing a key supersede each other; only the newest one runs.
+    With workers=0 the queue only accepts jobs (stateless web tier); `python -m app worker`
+    processes run them.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 4, max_pending: int = 100, lease: float = 60,
+                 poll_interval: float = 1.0, max_attempts: int = 3):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers = {}
+        self.wakeup = asyncio.Event()
+        self.tasks = []
+        self.running = {}  # job_id -> JobContext
+        self.stopping = False
+
+    def register(self, kind: str, handler):
+        """handler: async callable (job, ctx) -> dict result"""
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict, key: str = "", version: str = "", delay: float = 0) -> Job:
+        """
+        key: coalescing key (e.g. repo#pr). A new job drops queued jobs with the same key
+             and cancels running ones whose version differs.
+        version: identifies the work (e.g. head SHA); an active job with the same key and
+             version is returned instead of queueing a duplicate.
+        delay: quiet window in seconds before the job becomes runnable (debounce).
+        """
+        active = self.store.active(key) if key else []
+        for existing in active:
+            # A job already told to stop (e.g. push A, B, then A again) cannot stand in for the new one
+            if version and existing.version == version and not existing.cancel_requested:
+                logger.info(f"Coalesced into active job {existing.id} ({key} @ {version})")
+                return existing
+
+        # Queued jobs with the same key are superseded below, so replacing them does not grow the queue
+        replaced = sum(1 for existing in active if existing.status == JobStatus.QUEUED)
+        if self.store.count(JobStatus.QUEUED) - replaced >= self.max_pending:
+            raise QueueFull(f"{self.max_pending} jobs already pending")
+
+        job = Job(kind=kind, payload=payload, key=key, version=version, run_after=time.time() + delay)
+        self.store.add(job)
+
+        if key:
+            dropped = self.store.supersede(key, job.id)
+            if dropped:
+                logger.info(f"Dropped {len(dropped)} queued job(s) superseded by {job.id}")
+            # Workers in other processes see the flag on their next heartbeat
+            if self.store.request_cancel(key, version):
+                logger.info(f"Requested cancellation of running job(s) superseded by {job.id}")
+            for job_id, ctx in self.running.items():
+                if ctx.job.key == key and ctx.job.version != version:
+                    logger.info(f"Cancelling running job {job_id}, superseded by {job.id}")
+                    ctx.cancel()
+
+        self._notify(delay)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def _notify(self, delay: float = 0):
+        """Wakes local workers now (or when a delayed job becomes due) instead of at the next poll"""
+        if not self.tasks:
+            return
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.wakeup.set)
+        else:
+            self.wakeup.set()
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    async def start(self):
+        if not self.handlers:
+            logger.warning("No job handlers registered; not starting workers")
+            return
+        # Jobs left running by a crashed or restarted process are re-delivered when their lease expires
+        self.tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        if self.tasks:
+            logger.info(f"Started {self.workers} job workers ({self.owner})")
+
+    async def stop(self, grace: float = 0):
+        """Stops the workers; with a grace period, running jobs get that long to finish first"""
+        self.stopping = True
+        self.wakeup.set()
+        if grace and self.tasks:
+            await asyncio.wait(self.tasks, timeout=grace)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.stopping = False
+
+    async def _worker(self, n: int):
+        while not self.stopping:
+            # Cleared before claiming, so a wakeup arriving in between is not lost
+            self.wakeup.clear()
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim, self.owner, list(self.handlers), self.lease, self.max_attempts
+                )
+            except Exception as e:
+                logger.error(f"Worker {n} could not claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Worker {n} crashed on job {job.id}: {e}")
+
+    async def _heartbeat(self, ctx: JobContext):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                cancel = await asyncio.to_thread(self.store.heartbeat, ctx.job.id, self.owner, self.lease)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {ctx.job.id} failed: {e}")
+                continue
+            if cancel is None:
+                logger.warning(f"Lost the lease on job {ctx.job.id}")
+                ctx.lose()
+                return
+            if cancel:
+                ctx.cancel()
+
+    async def _finish(self, ctx: JobContext, **fields) -> bool:
+        await ctx.flush()
+        return await asyncio.to_thread(self.store.finish, ctx.job.id, self.owner, **fields)
+
+    async def _run(self, job: Job):
+        handler = self.handlers[job.kind]
+        if job.attempts > 1:
+            logger.info(f"Re-delivering job {job.id} (attempt {job.attempts})")
+
+        ctx = JobContext(self, job)
+        self.running[job.id] = ctx
+        heartbeat = asyncio.create_task(self._heartbeat(ctx))
+        status = JobStatus.DONE
+        try:
+            # The job ID is the trace ID, linking the webhook span to everything the job does
+            with tracing.span(f"job.{job.kind}", trace_id=job.id, kind=job.kind, attempt=job.attempts):
+                result = await handler(job, ctx)
+            if ctx.lost or not await self._finish(ctx, status=JobStatus.DONE, stage="done", result=result or {}):
+                status = None
+                logger.warning(f"Job {job.id} finished after losing its lease; result discarded")
+            else:
+                logger.info(f"Job {job.id} finished")
+        except LeaseLost as e:
+            # Another worker owns the job now; leave its record alone
+            logger.warning(str(e))
+            status = None
+        except JobCancelled as e:
+            logger.info(str(e))
+            status = JobStatus.SUPERSEDED
+            await self._finish(ctx, status=JobStatus.SUPERSEDED)
+        except asyncio.CancelledError:
+            # Shutdown: hand the job back so another worker (or the next start) picks it up
+            status = None
+            await ctx.flush()
+            await asyncio.to_thread(self.store.release, job.id, self.owner)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            status = JobStatus.FAILED
+            await self._finish(ctx, status=JobStatus.FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job.id, None)
+            if status:
+                JOBS.inc(kind=job.kind, status=status)
+
+
+def make_job_store() -> JobStore:
+    if settings.JOB_STORE == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(settings.JOB_DB_PATH)
+
+
+# Global Queue Instance
+job_queue = JobQueue(
+    make_job_store(),
+    workers=settings.JOB_WORKERS,
+    max_pending=settings.JOB_MAX_PENDING,
+    lease=settings.JOB_LEASE_SECONDS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
+QUEUE_DEPTH.set_function(lambda: job_queue.store.count(JobStatus.QUEUED))
@@ -1,61 +1,316 @@
-
+import re
 import time
 import asyncio
 import logging
+import threading
+
+from app.core.config import settings
+from app.core.db import connect
+from app.core.metrics import LIMITER_WAIT_SECONDS
 
 logger = logging.getLogger("limiter")
 
+
+class Budget:
+    """One dimension of a limit, e.g. 10 requests or 40k tokens per 60 seconds"""
+
+    def __init__(self, dim: str, capacity: float, period: float = 60):
+        self.dim = dim
+        self.capacity = capacity
+        self.rate = capacity / period  # refill per second
+
+
+def _reserve(state: dict, budgets: list, costs: dict, now: float) -> float:
+    """
+    Token bucket with reservations: the cost is deducted right away (tokens may go
+    negative) and the caller is told how long to wait for its reservation to mature.
+    Waiters therefore queue up in arrival order without anyone sleeping under a lock.
+
+    state: {dim: [tokens, updated], "blocked_until": float}, mutated in place.
+    """
+    wait = max(0.0, state.get("blocked_until", 0.0) - now)
+    for budget in budgets:
+        tokens, updated = state.get(budget.dim, (budget.capacity, now))
+        tokens = min(budget.capacity, tokens + (now - updated) * budget.rate)
+        # A single request larger than the whole budget would otherwise wait forever
+        tokens -= min(costs.get(budget.dim, 0), budget.capacity)
+        state[budget.dim] = [tokens, now]
+        if tokens < 0:
+            wait = max(wait, -tokens / budget.rate)
+    return wait
+
+
+def _sync(state: dict, budget: Budget, remaining: float, reset: float, now: float):
+    """Adopts the provider's view when it is stricter than ours"""
+    tokens, updated = state.get(budget.dim, (budget.capacity, now))
+    tokens = min(budget.capacity, tokens + (now - updated) * budget.rate)
+    state[budget.dim] = [min(tokens, remaining), now]
+    if remaining <= 0 and reset > 0:
+        state["blocked_until"] = max(state.get("blocked_until", 0.0), now + reset)
+
+
+class LimiterBackend:
+    """Where bucket state lives. Shared backends let several workers draw from one budget."""
+
+    async def reserve(self, key: str, budgets: list, costs: dict) -> float:
+        raise NotImplementedError
+
+    async def sync(self, key: str, budget: Budget, remaining: float, reset: float):
+        raise NotImplementedError
+
+    async def block(self, key: str, seconds: float):
+        raise NotImplementedError
+
+
+class MemoryBackend(LimiterBackend):
+    """Per-process state (LIMITER_BACKEND=memory)"""
+
+    def __init__(self):
+        self.states = {}
+
+    async def reserve(self, key, budgets, costs):
+        return _reserve(self.states.setdefault(key, {}), budgets, costs, time.time())
+
+    async def sync(self, key, budget, remaining, reset):
+        _sync(self.states.setdefault(key, {}), budget, remaining, reset, time.time())
+
+    async def block(self, key, seconds):
+        state = self.states.setdefault(key, {})
+        state["blocked_until"] = max(state.get("blocked_until", 0.0), time.time() + seconds)
+
+
+class SQLiteBackend(LimiterBackend):
+    """
+    State in a SQLite file, updated in IMMEDIATE transactions so every uvicorn worker
+    (or review worker) sharing the file also shares the budget.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS limiter_state (
+            key TEXT NOT NULL,
+            dim TEXT NOT NULL,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            PRIMARY KEY (key, dim)
+        );
+    """
+
+    def __init__(self, path: str):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+
+    def _transact(self, key: str, mutate):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT dim, tokens, updated FROM limiter_state WHERE key = ?", (key,)
+                ).fetchall()
+                # blocked_until is stored as a pseudo-dimension in the tokens column
+                state = {r["dim"]: (r["tokens"] if r["dim"] == "blocked_until" else [r["tokens"], r["updated"]])
+                         for r in rows}
+                result = mutate(state)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO limiter_state (key, dim, tokens, updated) VALUES (?, ?, ?, ?)",
+                    [
+                        (key, dim, value, 0.0) if dim == "blocked_until" else (key, dim, value[0], value[1])
+                        for dim, value in state.items()
+                    ]
+                )
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    async def reserve(self, key, budgets, costs):
+        return await asyncio.to_thread(
+            self._transact, key, lambda state: _reserve(state, budgets, costs, time.time())
+        )
+
+    async def sync(self, key, budget, remaining, reset):
+        await asyncio.to_thread(
+            self._transact, key, lambda state: _sync(state, budget, remaining, reset, time.time())
+        )
+
+    async def block(self, key, seconds):
+        def mutate(state):
+            state["blocked_until"] = max(state.get("blocked_until", 0.0), time.time() + seconds)
+        await asyncio.to_thread(self._transact, key, mutate)
+
+
+class RedisBackend(LimiterBackend):
+    """Redis-compatible shared state (optional, needs the `redis` package)"""
+
+    # ARGV: now, then (dim, cost, capacity, rate) per budget. Returns the wait in seconds.
+    RESERVE_SCRIPT = """
+        local now = tonumber(ARGV[1])
+        local wait = 0
+        local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until') or '0')
+        if blocked > now then wait = blocked - now end
+        for i = 2, #ARGV, 4 do
+            local dim = ARGV[i]
+            local cost = tonumber(ARGV[i + 1])
+            local cap = tonumber(ARGV[i + 2])
+            local rate = tonumber(ARGV[i + 3])
+            local tokens = tonumber(redis.call('HGET', KEYS[1], dim .. ':tokens') or cap)
+            local updated = tonumber(redis.call('HGET', KEYS[1], dim .. ':updated') or now)
+            tokens = math.min(cap, tokens + (now - updated) * rate) - math.min(cost, cap)
+            redis.call('HSET', KEYS[1], dim .. ':tokens', tokens, dim .. ':updated', now)
+            if tokens < 0 then wait = math.max(wait, -tokens / rate) end
+        end
+        redis.call('EXPIRE', KEYS[1], 3600)
+        return tostring(wait)
+    """
+
+    SYNC_SCRIPT = """
+        local now = tonumber(ARGV[1])
+        local dim = ARGV[2]
+        local cap = tonumber(ARGV[3])
+        local rate = tonumber(ARGV[4])
+        local remaining = tonumber(ARGV[5])
+        local reset = tonumber(ARGV[6])
+        local tokens = tonumber(redis.call('HGET', KEYS[1], dim .. ':tokens') or cap)
+        local updated = tonumber(redis.call('HGET', KEYS[1], dim .. ':updated') or now)
+        tokens = math.min(cap, tokens + (now - updated) * rate)
+        redis.call('HSET', KEYS[1], dim .. ':tokens', math.min(tokens, remaining), dim .. ':updated', now)
+        if remaining <= 0 and reset > 0 then
+            local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until') or '0')
+            redis.call('HSET', KEYS[1], 'blocked_until', math.max(blocked, now + reset))
+        end
+        redis.call('EXPIRE', KEYS[1], 3600)
+        return 0
+    """
+
+    # ARGV: blocked until (epoch seconds). Only ever extends the block.
+    BLOCK_SCRIPT = """
+        local deadline = tonumber(ARGV[1])
+        local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until') or '0')
+        redis.call('HSET', KEYS[1], 'blocked_until', math.max(blocked, deadline))
+        redis.call('EXPIRE', KEYS[1], 3600)
+        return 0
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.reserve_script = self.redis.register_script(self.RESERVE_SCRIPT)
+        self.sync_script = self.redis.register_script(self.SYNC_SCRIPT)
+        self.block_script = self.redis.register_script(self.BLOCK_SCRIPT)
+
+    async def reserve(self, key, budgets, costs):
+        args = [time.time()]
+        for budget in budgets:
+            args += [budget.dim, costs.get(budget.dim, 0), budget.capacity, budget.rate]
+        return float(await self.reserve_script(keys=[f"vertexrabbit:limiter:{key}"], args=args))
+
+    async def sync(self, key, budget, remaining, reset):
+        await self.sync_script(
+            keys=[f"vertexrabbit:limiter:{key}"],
+            args=[time.time(), budget.dim, budget.capacity, budget.rate, remaining, reset]
+        )
+
+    async def block(self, key, seconds):
+        # Max-and-set in one script, so concurrent workers never shorten each other's block
+        await self.block_script(keys=[f"vertexrabbit:limiter:{key}"], args=[time.time() + seconds])
+
+
+# "1s", "6m0s", "20ms", "1h2m3.5s" (OpenAI-style reset headers) or plain seconds
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: str) -> float:
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in _DURATION_PART.findall(value))
+
+
 class RateLimiter:
     """
-    Token Bucket Rate Limiter to ensure we don't exceed API limits.
-    Default: 10 RPM (Requests Per Minute)
-    """
-    def __init__(self, max_tokens: int = 10, refill_period: int = 60):
-        self.max_tokens = max_tokens
-        self.tokens = max_tokens
-        self.refill_period = refill_period # 60 seconds
-        self.last_refill = time.monotonic()
-        self.lock = asyncio.Lock()
-    
-    async def acquire(self):
+    Request- and token-per-minute limiter for one provider/model.
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, key: str, rpm: int = 10, tpm: int = 0, backend: LimiterBackend = None):
+        self.key = key
+        self.backend = backend or MemoryBackend()
+        self.budgets = {}
+        if rpm:
+            self.budgets["requests"] = Budget("requests", rpm)
+        if tpm:
+            self.budgets["tokens"] = Budget("tokens", tpm)
+
+    async def acquire(self, tokens: int = 0):
         """
-        Wait until a token is available.
+        Wait until one request carrying roughly `tokens` (prompt + completion) fits the budget.
         """
-        async with self.lock:
-            # Refill tokens based on time passed
-            now = time.monotonic()
-            elapsed = now - self.last_refill
-            
-            # Refill rate: max_tokens per refill_period
-            # Example: 10 tokens / 60s = 0.166 tokens/sec
-            refill_amount = elapsed * (self.max_tokens / self.refill_period)
-            
-            if refill_amount > 0:
-                self.tokens = min(self.max_tokens, self.tokens + refill_amount)
-                self.last_refill = now
-            
-            # If we have tokens, consume one and return
-            if self.tokens >= 1:
-                self.tokens -= 1
-                return
-            
-            # If no tokens, calculate wait time
-            # We need 1.0 token. We have self.tokens (e.g. 0.2). We need 0.8 more.
-            # Time needed = needed_tokens / (tokens_per_sec)
-            # tokens_per_sec = max / period
-            needed = 1.0 - self.tokens
-            tokens_per_sec = self.max_tokens / self.refill_period
-            wait_time = needed / tokens_per_sec
-            
-            logger.warning(f"Rate limit reached. Waiting {wait_time:.2f}s...")
-            await asyncio.sleep(wait_time)
-            
-            # After waiting, we technically have enough, but let's just reset logic
-            # simple recursion or just consume. 
-            # To be precise, we just consumed the time, so we take the token.
-            self.tokens = 0 # effectively 0 after consumption
-            self.last_refill = time.monotonic()
-
-# Global Limiter Instance
-# 10 reqs / 60 sec
-global_limiter = RateLimiter(max_tokens=10, refill_period=60)
+        if not self.budgets:
+            return
+        wait = await self.backend.reserve(
+            self.key, list(self.budgets.values()), {"requests": 1, "tokens": tokens}
+        )
+        LIMITER_WAIT_SECONDS.observe(wait, limiter=self.key)
+        if wait > 0:
+            logger.warning(f"Rate limit reached for {self.key}. Waiting {wait:.2f}s...")
+            await asyncio.sleep(wait)
+
+    async def observe_headers(self, headers):
+        """Adapts to x-ratelimit-* / retry-after headers returned by the provider"""
+        if headers is None:
+            return
+        retry_after = parse_duration(headers.get("retry-after", ""))
+        if retry_after > 0:
+            await self.backend.block(self.key, retry_after)
+
+        for dim, budget in self.budgets.items():
+            remaining = headers.get(f"x-ratelimit-remaining-{dim}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{dim}", ""))
+            await self.backend.sync(self.key, budget, remaining, reset)
+
+    async def penalize(self, seconds: float):
+        """Blocks the budget after a 429 (Retry-After)"""
+        logger.warning(f"{self.key} rate limited by provider, backing off {seconds:.1f}s")
+        await self.backend.block(self.key, seconds)
+
+
+def make_backend() -> LimiterBackend:
+    if settings.LIMITER_BACKEND == "redis":
+        try:
+            return RedisBackend(settings.REDIS_URL)
+        except ImportError:
+            logger.warning("LIMITER_BACKEND=redis but the redis package is missing, using sqlite")
+            return SQLiteBackend(settings.LIMITER_DB_PATH)
+    if settings.LIMITER_BACKEND == "sqlite":
+        return SQLiteBackend(settings.LIMITER_DB_PATH)
+    return MemoryBackend()
+
+
+class LimiterRegistry:
+    """One RateLimiter per (provider, model), all sharing one backend"""
+
+    def __init__(self, backend: LimiterBackend):
+        self.backend = backend
+        self.limiters = {}
+
+    def get(self, provider: str, model: str) -> RateLimiter:
+        key = f"{provider}:{model}"
+        if key not in self.limiters:
+            rpm, tpm = settings.provider_limits(provider)
+            self.limiters[key] = RateLimiter(key, rpm=rpm, tpm=tpm, backend=self.backend)
+        return self.limiters[key]
+
+
+# Global Limiter Registry
+limiters = LimiterRegistry(make_backend())
@@ -0,0 +1,181 @@
+import threading
+
+from app.core.tracing import baggage
+
+# Seconds; covers a fast GitHub call up to a slow clone or a long LLM review
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    One metric family in the Prometheus text format. Label values are passed as keyword
+    arguments; a `repo` label left unset is filled from the current trace's baggage.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values tuple -> value
+        self.lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if "repo" in self.labels and "repo" not in labels:
+            labels = {**labels, "repo": baggage().get("repo", "")}
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def samples(self):
+        """Yields (suffix, label values, extra label, value)"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, values, extra)} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        for values, value in items:
+            yield "", values, "", value
+
+
+class Gauge(Metric):
+    """Set directly, or computed at scrape time from a callback returning a number"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            yield "", (), "", self.function()
+            return
+        with self.lock:
+            items = list(self.values.items())
+        for values, value in items:
+            yield "", values, "", value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            # [cumulative bucket counts, sum, count]
+            series = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self.lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self.values.items()]
+        for values, (counts, total, count) in items:
+            for bound, bucket in zip(self.buckets, counts):
+                yield "_bucket", values, f'le="{_number(bound)}"', bucket
+            yield "_bucket", values, 'le="+Inf"', count
+            yield "_sum", values, "", total
+            yield "_count", values, "", count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self.metrics.values()) + "\n"
+
+
+registry = Registry()
+
+# Pipeline
+STAGE_SECONDS = registry.register(Histogram(
+    "vertexrabbit_stage_seconds", "Duration of each review pipeline stage", ("stage", "status", "repo")
+))
+JOBS = registry.register(Counter(
+    "vertexrabbit_jobs_total", "Finished background jobs", ("kind", "status")
+))
+QUEUE_DEPTH = registry.register(Gauge(
+    "vertexrabbit_queue_depth", "Review jobs waiting to run"
+))
+
+# LLM
+LLM_TTFT_SECONDS = registry.register(Histogram(
+    "vertexrabbit_llm_ttft_seconds", "Time to first streamed token", ("provider", "model", "repo")
+))
+LLM_TOKENS_PER_SECOND = registry.register(Histogram(
+    "vertexrabbit_llm_tokens_per_second", "Estimated completion tokens per second after the first token",
+    ("provider", "model", "repo"), buckets=(5, 10, 20, 50, 100, 200, 500, 1000)
+))
+LLM_REQUESTS = registry.register(Counter(
+    "vertexrabbit_llm_requests_total", "LLM review requests by outcome", ("provider", "model", "outcome", "repo")
+))
+LIMITER_WAIT_SECONDS = registry.register(Histogram(
+    "vertexrabbit_limiter_wait_seconds", "Time spent waiting for a rate limiter reservation", ("limiter", "repo")
+))
+
+# Caches
+REVIEW_CACHE_HIT_RATIO = registry.register(Gauge(
+    "vertexrabbit_review_cache_hit_ratio", "Share of hunk lookups served from the review cache"
+))
+
+# Tools
+SCANNER_SECONDS = registry.register(Histogram(
+    "vertexrabbit_scanner_seconds", "Duration of each SAST/lint scanner run", ("scanner", "repo")
+))
+
+# GitHub
+GITHUB_CALLS = registry.register(Counter(
+    "vertexrabbit_github_api_calls_total", "GitHub REST calls by method and status", ("method", "status", "repo")
+))
@@ -0,0 +1,125 @@
+"""
+Per-repository review policy, read from `.vertexrabbit.yml` at the root of the PR's base
+commit (never the head: a PR must not be able to switch off its own review):
+
+    exclude:                  # never reviewed by the AI or the scanners
+      - "docs/generated/**"
+    routes:                   # first match wins; unmatched paths use the `default` tier
+      - paths: ["**/*.md", "docs/**", "tests/**"]
+        tier: fast            # small, fast model only (AI_FAST_PROVIDER)
+      - paths: ["src/auth/**", "**/crypto/**"]
+        tier: strong          # main model, never triaged
+    triage: true              # fast model picks which `default` hunks the main model reviews
+    max_tokens: 60000         # estimated tokens per PR sent to review models (0: no limit)
+    ticket_severity: high     # lowest severity that gets an auto-issue
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import yaml
+
+from app.diff.filters import glob_to_regex
+
+logger = logging.getLogger("policy")
+
+POLICY_FILE = ".vertexrabbit.yml"
+TIERS = ("fast", "default", "strong")
+MAX_CACHED = 256
+
+# Scanner and model severities on one scale
+SEVERITY_RANK = {
+    "info": 0, "low": 1, "warning": 2, "medium": 2, "error": 3, "high": 3, "critical": 4,
+}
+
+
+def severity_rank(severity) -> int:
+    return SEVERITY_RANK.get(str(severity or "").lower(), 0)
+
+
+@dataclass
+class ReviewPolicy:
+    exclude: list = field(default_factory=list)
+    routes: list = field(default_factory=list)  # [(regexes, tier)]
+    triage: bool = False
+    max_tokens: int = 0
+    ticket_severity: str = "high"
+
+    def excluded(self, path: str) -> bool:
+        return any(regex.match(path) for regex in self.exclude)
+
+    def tier(self, path: str) -> str:
+        for regexes, tier in self.routes:
+            if any(regex.match(path) for regex in regexes):
+                return tier
+        return "default"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReviewPolicy":
+        """Builds a policy from parsed YAML; invalid entries are logged and ignored"""
+        policy = cls()
+        if not isinstance(data, dict):
+            logger.warning(f"{POLICY_FILE} is not a mapping; using the default policy")
+            return policy
+
+        def globs(value, where):
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list):
+                logger.warning(f"{POLICY_FILE}: {where} must be a list of globs")
+                return []
+            return [glob_to_regex(str(g)) for g in value if str(g).strip()]
+
+        policy.exclude = globs(data.get("exclude", []), "exclude")
+
+        for n, route in enumerate(data.get("routes") or []):
+            tier = route.get("tier") if isinstance(route, dict) else None
+            if tier not in TIERS:
+                logger.warning(f"{POLICY_FILE}: routes[{n}] needs a tier out of {', '.join(TIERS)}")
+                continue
+            policy.routes.append((globs(route.get("paths", []), f"routes[{n}].paths"), tier))
+
+        policy.triage = bool(data.get("triage", False))
+        try:
+            policy.max_tokens = max(0, int(data.get("max_tokens") or 0))
+        except (TypeError, ValueError):
+            logger.warning(f"{POLICY_FILE}: max_tokens must be a number")
+
+        severity = str(data.get("ticket_severity", policy.ticket_severity)).lower()
+        if severity in SEVERITY_RANK:
+            policy.ticket_severity = severity
+        else:
+            logger.warning(f"{POLICY_FILE}: unknown ticket_severity '{severity}'")
+        return policy
+
+
+DEFAULT_POLICY = ReviewPolicy()
+
+_cache = OrderedDict()  # content hash -> ReviewPolicy
+_cache_lock = threading.Lock()
+
+
+def parse_policy(content: str) -> ReviewPolicy:
+    """Policy from the text of a policy file ("" means none); parsed once per distinct content"""
+    if not content or not content.strip():
+        return DEFAULT_POLICY
+
+    key = hashlib.sha256(content.encode()).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    try:
+        policy = ReviewPolicy.from_dict(yaml.safe_load(content) or {})
+    except yaml.YAMLError as e:
+        logger.warning(f"Could not read {POLICY_FILE}: {e}")
+        policy = DEFAULT_POLICY
+
+    with _cache_lock:
+        _cache[key] = policy
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return policy
@@ -0,0 +1,184 @@
+import time
+import threading
+
+from app.core.config import settings
+from app.core.db import connect
+
+
+class PRStateStore:
+    """Remembers the last head SHA reviewed for each pull request"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pr_state (
+            repo TEXT NOT NULL,
+            pr_number INTEGER NOT NULL,
+            head_sha TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (repo, pr_number)
+        );
+    """
+
+    def __init__(self, path: str):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+
+    def last_reviewed_sha(self, repo: str, pr_number: int):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT head_sha FROM pr_state WHERE repo = ? AND pr_number = ?", (repo, pr_number)
+            ).fetchone()
+        return row["head_sha"] if row else None
+
+    def mark_reviewed(self, repo: str, pr_number: int, head_sha: str):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pr_state (repo, pr_number, head_sha, updated_at) VALUES (?, ?, ?, ?)",
+                (repo, pr_number, head_sha, time.time())
+            )
+
+
+class DeliveryStore:
+    """Webhook delivery IDs seen recently, so GitHub retries and replays are processed once"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS webhook_deliveries (
+            delivery_id TEXT PRIMARY KEY,
+            received_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.writes = 0
+
+    def claim(self, delivery_id: str) -> bool:
+        """Records the delivery; False if it was already seen within the TTL"""
+        now = time.time()
+        with self.lock:
+            self.writes += 1
+            if self.writes % 100 == 0:
+                self.conn.execute("DELETE FROM webhook_deliveries WHERE received_at < ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM webhook_deliveries WHERE delivery_id = ? AND received_at < ?",
+                (delivery_id, now - self.ttl)
+            )
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO webhook_deliveries (delivery_id, received_at) VALUES (?, ?)",
+                (delivery_id, now)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, delivery_id: str):
+        """Forgets a delivery that was not processed (e.g. queue full), so a redelivery is accepted"""
+        with self.lock:
+            self.conn.execute("DELETE FROM webhook_deliveries WHERE delivery_id = ?", (delivery_id,))
+
+
+class FindingStore:
+    """
+    Fingerprints (see app/core/findings.py) of findings already posted on a PR or filed
+    in an auto-bug ticket, so later pushes only surface what is new
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS findings (
+            repo TEXT NOT NULL,
+            pr_number INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            path TEXT NOT NULL,
+            posted INTEGER NOT NULL DEFAULT 0,
+            ticketed INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (repo, pr_number, fingerprint)
+        );
+        CREATE INDEX IF NOT EXISTS idx_findings_fingerprint ON findings (repo, fingerprint);
+        CREATE INDEX IF NOT EXISTS idx_findings_updated ON findings (updated_at);
+    """
+
+    # Stay under SQLite's bound-parameter limit
+    BATCH = 500
+
+    def __init__(self, path: str, ttl: float):
+        self.conn = connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.writes = 0
+
+    def seen(self, repo: str, pr_number: int, fingerprints: list):
+        """
+        Returns (posted, ticketed): the fingerprints already commented on this PR, and
+        those already in a ticket from any PR of the repo
+        """
+        posted, ticketed = set(), set()
+        fingerprints = list(set(fingerprints))
+        with self.lock:
+            for i in range(0, len(fingerprints), self.BATCH):
+                batch = fingerprints[i:i + self.BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT fingerprint, pr_number, posted, ticketed FROM findings "
+                    f"WHERE repo = ? AND fingerprint IN ({marks}) AND (posted = 1 OR ticketed = 1)",
+                    (repo, *batch)
+                ).fetchall()
+                for row in rows:
+                    if row["posted"] and row["pr_number"] == pr_number:
+                        posted.add(row["fingerprint"])
+                    if row["ticketed"]:
+                        ticketed.add(row["fingerprint"])
+        return posted, ticketed
+
+    def tracked(self, repo: str, pr_number: int) -> bool:
+        """Whether anything was recorded for the PR (False for PRs reviewed before the store existed)"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM findings WHERE repo = ? AND pr_number = ? LIMIT 1", (repo, pr_number)
+            ).fetchone()
+        return row is not None
+
+    def record(self, repo: str, pr_number: int, findings: list, posted: bool = False, ticketed: bool = False):
+        """Marks (fingerprint, path) pairs as posted and/or ticketed; flags are never cleared"""
+        if not findings:
+            return
+        now = time.time()
+        rows = [(repo, pr_number, fp, path, int(posted), int(ticketed), now) for fp, path in findings]
+        with self.lock:
+            self.writes += 1
+            if self.writes % 100 == 0:
+                self.conn.execute("DELETE FROM findings WHERE updated_at < ?", (now - self.ttl,))
+            # One transaction for the whole batch instead of one commit per row
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    """
+                    INSERT INTO findings (repo, pr_number, fingerprint, path, posted, ticketed, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (repo, pr_number, fingerprint) DO UPDATE SET
+                        posted = MAX(posted, excluded.posted),
+                        ticketed = MAX(ticketed, excluded.ticketed),
+                        updated_at = excluded.updated_at
+                    """,
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def prune(self, repo: str, pr_number: int) -> int:
+        """Forgets a closed PR's findings; returns how many were dropped"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM findings WHERE repo = ? AND pr_number = ?", (repo, pr_number)
+            )
+        return cursor.rowcount
+
+
+# Global State Instances
+pr_state = PRStateStore(settings.STATE_DB_PATH)
+deliveries = DeliveryStore(settings.STATE_DB_PATH, settings.WEBHOOK_DELIVERY_TTL)
+findings = FindingStore(settings.STATE_DB_PATH, settings.FINDINGS_TTL)
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+logger = logging.getLogger("tracing")
+
+# Context is copied into every asyncio task created inside a span, so a job's trace
+# follows it through the DAG stages, reviewer chunks, scanners and GitHub calls.
+_current_span = contextvars.ContextVar("vertexrabbit_span", default=None)
+_baggage = contextvars.ContextVar("vertexrabbit_baggage", default={})
+
+
+class Span:
+    """A timed operation, shaped like an OpenTelemetry span (trace_id, span_id, parent, attributes)"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    def export(self, span: Span):
+        raise NotImplementedError
+
+
+class ConsoleExporter(SpanExporter):
+    def export(self, span: Span):
+        logger.info(json.dumps(span.to_dict(), default=str))
+
+
+class FileExporter(SpanExporter):
+    """Appends one JSON object per finished span (JSON lines)"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+_exporter = None
+
+
+def configure(exporter: SpanExporter = None):
+    """Sets the span exporter; None turns tracing output off (spans still carry context)"""
+    global _exporter
+    _exporter = exporter
+
+
+def make_exporter(kind: str, path: str):
+    if kind == "console":
+        return ConsoleExporter()
+    if kind == "file":
+        return FileExporter(path)
+    return None
+
+
+configure(make_exporter(settings.TRACE_EXPORTER, settings.TRACE_PATH))
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def baggage() -> dict:
+    """Key/values inherited by everything running under the current trace (e.g. repo)"""
+    return _baggage.get()
+
+
+def set_baggage(**values):
+    _baggage.set({**_baggage.get(), **values})
+
+
+@contextmanager
+def span(name: str, trace_id: str = None, **attributes):
+    """
+    Times a block as a child of the current span. Pass trace_id to start a new trace
+    (the review job ID, so a job can be followed from webhook to GitHub calls).
+    """
+    parent = _current_span.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+    current = Span(name, trace_id, parent.span_id if parent and parent.trace_id == trace_id else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        current.set(error=str(e) or type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = round(time.time() - current.start, 6)
+        if _exporter is not None:
+            try:
+                _exporter.export(current)
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
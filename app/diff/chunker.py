@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+
+from app.diff.parser import FileDiff, Hunk
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for code)"""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class DiffChunk:
+    """A group of (partial) file diffs reviewed together in one LLM call"""
+    files: list = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(f.text for f in self.files)
+
+    @property
+    def tokens(self) -> int:
+        return sum(estimate_tokens(f.text) for f in self.files)
+
+
+def split_hunk(hunk: Hunk, max_tokens: int) -> list:
+    """Cuts an oversized hunk into consecutive sub-hunks with correct line numbers"""
+    pieces = []
+    old_line, new_line = hunk.old_start, hunk.new_start
+    current = None
+    budget = 0
+
+    for line in hunk.lines:
+        cost = estimate_tokens(line)
+        if current is None or (budget + cost > max_tokens and current.lines):
+            current = Hunk(old_start=old_line, old_count=0, new_start=new_line, new_count=0, section=hunk.section)
+            pieces.append(current)
+            budget = 0
+
+        current.lines.append(line)
+        budget += cost
+        marker = line[:1]
+        if marker in ("-", " ", ""):
+            current.old_count += 1
+            old_line += 1
+        if marker in ("+", " ", ""):
+            current.new_count += 1
+            new_line += 1
+
+    return pieces
+
+
+def split_file(file: FileDiff, max_tokens: int) -> list:
+    """Splits one file diff into pieces that each fit in max_tokens, cutting at hunk boundaries first"""
+    header_tokens = estimate_tokens("\n".join(file.header))
+    budget = max(max_tokens - header_tokens, 1)
+
+    hunks = []
+    for hunk in file.hunks:
+        hunks.extend(split_hunk(hunk, budget) if estimate_tokens(hunk.text) > budget else [hunk])
+
+    pieces = []
+    current, used = [], 0
+    for hunk in hunks:
+        cost = estimate_tokens(hunk.text)
+        if current and used + cost > budget:
+            pieces.append(current)
+            current, used = [], 0
+        current.append(hunk)
+        used += cost
+    if current:
+        pieces.append(current)
+
+    return [
+        FileDiff(path=file.path, old_path=file.old_path, header=file.header, hunks=piece,
+                 binary=file.binary, deleted=file.deleted)
+        for piece in pieces
+    ]
+
+
+def chunk_diff(files: list, max_tokens: int) -> list:
+    """
+    Packs file diffs into chunks of at most max_tokens (estimated).
+    Large files are split per hunk; small files are grouped so tiny PRs still make one call.
+    Binary and deleted files carry nothing reviewable and are skipped.
+    """
+    chunks = []
+    current = DiffChunk()
+
+    for file in files:
+        if file.binary or file.deleted or not file.hunks:
+            continue
+        for piece in split_file(file, max_tokens):
+            cost = estimate_tokens(piece.text)
+            if current.files and current.tokens + cost > max_tokens:
+                chunks.append(current)
+                current = DiffChunk()
+            current.files.append(piece)
+
+    if current.files:
+        chunks.append(current)
+    return chunks
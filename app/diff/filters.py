@@ -0,0 +1,127 @@
+import re
+import logging
+import posixpath
+from contextlib import aclosing
+
+from app.core.config import settings
+from app.diff.parser import aiter_file_diffs
+
+logger = logging.getLogger("diff")
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """
+    gitignore-style glob: `*` and `?` stay within a path segment, `**` spans segments.
+    A pattern without a slash matches the file name at any depth; one with a slash is
+    anchored at the repository root. A trailing slash matches everything below a directory.
+    """
+    pattern = pattern.strip()
+    directory = pattern.endswith("/")
+    # A leading or inner slash anchors ("/build", "docs/*.md"); a trailing one alone does not
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        else:
+            regex += re.escape(char)
+        i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    suffix = "/.*" if directory else "(?:/.*)?"
+    return re.compile(f"^{prefix}{regex}{suffix}$")
+
+
+class GitAttributes:
+    """The linguist-generated / linguist-vendored bits of a .gitattributes file"""
+
+    ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+    def __init__(self, text: str = ""):
+        self.rules = []  # (regex, attribute, value) in file order; later rules win
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            pattern, *attrs = line.split()
+            for attr in attrs:
+                name, _, value = attr.lstrip("-!").partition("=")
+                if name not in self.ATTRIBUTES:
+                    continue
+                enabled = not attr.startswith(("-", "!")) and value.lower() not in ("false", "0")
+                self.rules.append((glob_to_regex(pattern), name, enabled))
+
+    def matches(self, path: str):
+        """Returns the attribute that marks `path` as generated/vendored, or None"""
+        state = {}
+        for regex, name, enabled in self.rules:
+            if regex.match(path):
+                state[name] = enabled
+        for name in self.ATTRIBUTES:
+            if state.get(name):
+                return name
+        return None
+
+
+class DiffFilter:
+    """Decides which files of a PR diff are worth reviewing"""
+
+    def __init__(self, exclude: list = None, attributes: GitAttributes = None):
+        exclude = exclude if exclude is not None else settings.DIFF_EXCLUDE_LIST
+        self.exclude = [(pattern, glob_to_regex(pattern)) for pattern in exclude]
+        self.attributes = attributes or GitAttributes()
+
+    def __call__(self, path: str):
+        """Reason to skip `path`, or None to review it"""
+        path = posixpath.normpath(path)
+        for pattern, regex in self.exclude:
+            if regex.match(path):
+                return f"excluded by {pattern}"
+        attribute = self.attributes.matches(path)
+        if attribute:
+            return f".gitattributes {attribute}"
+        return None
+
+
+async def read_diff(lines, diff_filter=None, max_file_bytes: int = None, max_total_bytes: int = None):
+    """
+    Streams a diff (async iterable of lines) into the FileDiffs worth reviewing.
+    Returns (kept, skipped): skipped FileDiffs carry no hunks, only their reason.
+    Once the kept files reach `max_total_bytes` the rest of the stream is not read at all.
+    """
+    if max_file_bytes is None:
+        max_file_bytes = settings.DIFF_MAX_FILE_BYTES
+    if max_total_bytes is None:
+        max_total_bytes = settings.DIFF_MAX_TOTAL_BYTES
+
+    kept, skipped = [], []
+    total = 0
+    async with aclosing(aiter_file_diffs(lines, diff_filter or DiffFilter(), max_file_bytes)) as files:
+        async for file in files:
+            if file.skipped:
+                skipped.append(file)
+                continue
+            size = sum(len(line) + 1 for hunk in file.hunks for line in hunk.lines)
+            if max_total_bytes and total + size > max_total_bytes:
+                file.hunks = []
+                file.skipped = f"diff larger than {max_total_bytes} bytes"
+                skipped.append(file)
+                logger.warning(f"Diff exceeds {max_total_bytes} bytes; reviewing the first {len(kept)} file(s)")
+                break
+            total += size
+            kept.append(file)
+    return kept, skipped
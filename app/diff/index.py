@@ -0,0 +1,72 @@
+from bisect import bisect_right
+
+
+class DiffIndex:
+    """
+    Which (path, line) pairs GitHub will accept for an inline review comment.
+
+    Each hunk covers a contiguous run of new-file lines (added + context, the RIGHT side),
+    so a file is stored as sorted, merged [start, end] intervals and every lookup is a
+    bisect: O(log hunks) per issue.
+    """
+
+    SIDE = "RIGHT"  # Reviews comment on the new revision
+
+    def __init__(self, files: list):
+        self.intervals = {}  # path -> (starts, ends)
+        for file in files:
+            if file.binary or file.deleted:
+                continue
+            spans = sorted(
+                (h.new_start, h.new_start + h.new_count - 1) for h in file.hunks if h.new_count > 0
+            )
+            merged = []
+            for start, end in spans:
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            if merged:
+                self.intervals[file.path] = ([s for s, _ in merged], [e for _, e in merged])
+
+    def commentable(self, path: str, line: int) -> bool:
+        if path not in self.intervals or not isinstance(line, int):
+            return False
+        starts, ends = self.intervals[path]
+        i = bisect_right(starts, line) - 1
+        return i >= 0 and line <= ends[i]
+
+    def snap(self, path: str, line: int, max_distance: int = 3):
+        """Nearest commentable line within max_distance of `line`, or None"""
+        if path not in self.intervals or not isinstance(line, int):
+            return None
+        starts, ends = self.intervals[path]
+        i = bisect_right(starts, line) - 1
+        if i >= 0 and line <= ends[i]:
+            return line
+
+        # Between intervals: the candidates are the end of the one before and the start of the next
+        candidates = []
+        if i >= 0:
+            candidates.append(ends[i])
+        if i + 1 < len(starts):
+            candidates.append(starts[i + 1])
+        best = min(candidates, key=lambda n: abs(n - line), default=None)
+        if best is None or abs(best - line) > max_distance:
+            return None
+        return best
+
+    def partition(self, issues: list, max_distance: int = 3):
+        """
+        Splits issues into (inline, summary). Inline issues are copies with `line` snapped
+        onto the diff; everything else belongs in the review body instead.
+        """
+        inline = []
+        summary = []
+        for issue in issues:
+            line = self.snap(issue.get("path"), issue.get("line"), max_distance)
+            if line is None:
+                summary.append(issue)
+            else:
+                inline.append({**issue, "line": line})
+        return inline, summary
@@ -0,0 +1,189 @@
+import re
+from dataclasses import dataclass, field
+
+# @@ -old_start,old_count +new_start,new_count @@ optional section heading
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    section: str = ""
+    lines: list = field(default_factory=list)
+
+    @property
+    def header(self) -> str:
+        return f"@@ -{self.old_start},{self.old_count} +{self.new_start},{self.new_count} @@{self.section}"
+
+    @property
+    def text(self) -> str:
+        return "\n".join([self.header] + self.lines)
+
+    def new_lines(self):
+        """Yields (new_line_number, marker, content) for lines present in the new file"""
+        line_no = self.new_start
+        for line in self.lines:
+            marker = line[:1]
+            if marker in ("+", " ", ""):
+                yield line_no, marker or " ", line[1:]
+                line_no += 1
+
+    def added_lines(self) -> list:
+        return [n for n, marker, _ in self.new_lines() if marker == "+"]
+
+
+@dataclass
+class FileDiff:
+    path: str
+    old_path: str = ""
+    header: list = field(default_factory=list)
+    hunks: list = field(default_factory=list)
+    binary: bool = False
+    deleted: bool = False
+    skipped: str = ""  # Why the file was left out of the review (generated, too large, ...)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.header + [h.text for h in self.hunks])
+
+    def added_lines(self) -> list:
+        return [n for hunk in self.hunks for n in hunk.added_lines()]
+
+
+def _strip_prefix(path: str) -> str:
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+class DiffParser:
+    """
+    Line-at-a-time unified (git) diff parser: feed() returns a FileDiff whenever the
+    next file starts, so only the current file is ever held in memory.
+
+    skip: optional callable (path) -> reason or None; a skipped file keeps its header
+    but none of its lines, and comes out with `skipped` set.
+    max_file_bytes: a file whose hunks grow past this is emptied and marked skipped too.
+    """
+
+    def __init__(self, skip=None, max_file_bytes: int = 0):
+        self.skip = skip
+        self.max_file_bytes = max_file_bytes
+        self.current = None
+        self.hunk = None
+        self.size = 0
+
+    def _start(self, line: str):
+        parts = line[len("diff --git "):].split(" b/", 1)
+        new_path = parts[1] if len(parts) == 2 else _strip_prefix(parts[0])
+        self.current = FileDiff(path=new_path, old_path=_strip_prefix(parts[0]), header=[line])
+        self.hunk = None
+        self.size = 0
+        if self.skip:
+            self.current.skipped = self.skip(new_path) or ""
+
+    def feed(self, line: str):
+        line = line.rstrip("\r\n")
+        finished = None
+
+        if line.startswith("diff --git "):
+            finished = self.current
+            self._start(line)
+            return finished
+
+        current = self.current
+        if current is None:
+            return None
+
+        match = HUNK_HEADER.match(line) if line.startswith("@@") else None
+        if match:
+            if current.skipped:
+                self.hunk = False  # Swallow the rest of this file
+                return None
+            old_start, old_count, new_start, new_count, section = match.groups()
+            self.hunk = Hunk(
+                old_start=int(old_start),
+                old_count=int(old_count) if old_count is not None else 1,
+                new_start=int(new_start),
+                new_count=int(new_count) if new_count is not None else 1,
+                section=section
+            )
+            current.hunks.append(self.hunk)
+        elif self.hunk is False:
+            return None
+        elif self.hunk is not None:
+            self.size += len(line) + 1
+            if self.max_file_bytes and self.size > self.max_file_bytes:
+                current.hunks = []
+                current.skipped = f"larger than {self.max_file_bytes} bytes"
+                self.hunk = False
+                return None
+            self.hunk.lines.append(line)
+        else:
+            # File header lines (index, mode, rename, ---/+++)
+            current.header.append(line)
+            if line.startswith("--- ") and line[4:] != "/dev/null":
+                current.old_path = _strip_prefix(line[4:])
+            elif line.startswith("+++ "):
+                if line[4:] == "/dev/null":
+                    current.deleted = True
+                    current.path = current.old_path
+                else:
+                    current.path = _strip_prefix(line[4:])
+            elif line.startswith("rename to "):
+                current.path = line[len("rename to "):]
+            elif line.startswith("Binary files ") or line == "GIT binary patch":
+                current.binary = True
+                if self.skip and not current.skipped:
+                    current.skipped = "binary"
+        return None
+
+    def close(self):
+        finished, self.current, self.hunk = self.current, None, None
+        return finished
+
+
+def iter_file_diffs(lines, skip=None, max_file_bytes: int = 0):
+    """
+    Parses a unified (git) diff from an iterable of lines, yielding one FileDiff per file.
+    Only the current file is held in memory.
+    """
+    parser = DiffParser(skip, max_file_bytes)
+    for line in lines:
+        finished = parser.feed(line)
+        if finished:
+            yield finished
+    finished = parser.close()
+    if finished:
+        yield finished
+
+
+async def aiter_file_diffs(lines, skip=None, max_file_bytes: int = 0):
+    """iter_file_diffs over an async iterable of lines (e.g. a streamed HTTP response)"""
+    parser = DiffParser(skip, max_file_bytes)
+    async for line in lines:
+        finished = parser.feed(line)
+        if finished:
+            yield finished
+    finished = parser.close()
+    if finished:
+        yield finished
+
+
+def parse_diff(diff_content: str) -> list:
+    return list(iter_file_diffs(diff_content.splitlines()))
+
+
+def changed_lines(files: list) -> dict:
+    """Maps each file that still exists in the new revision to the set of line numbers it adds"""
+    scope = {}
+    for file in files:
+        if file.binary or file.deleted:
+            continue
+        lines = set(file.added_lines())
+        if lines:
+            scope.setdefault(file.path, set()).update(lines)
+    return scope
@@ -1,146 +1,318 @@
-
+import re
+import time
+import asyncio
 import logging
-from github import Github, GithubIntegration
+import importlib.util
+from datetime import datetime
+
+import httpx
 
 from app.core.config import settings
+from app.core import tracing
+from app.core.metrics import GITHUB_CALLS
+from app.github.writer import WriteScheduler, WRITE_METHODS, retry_delay
 
 logger = logging.getLogger("github_client")
 
+_REPO_PATH = re.compile(r"/repos/([^/]+/[^/]+)")
+
+# One pooled, keep-alive connection pool per process, shared by every GitHubClient
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.GITHUB_API_URL,
+            # HTTP/2 multiplexes concurrent calls over one connection (needs the `h2` extra)
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={
+                "User-Agent": "VertexRabbit/1.0",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class InstallationTokenCache:
+    """
+    Caches installation access tokens until shortly before their `expires_at`.
+    Concurrent callers for the same installation share a single refresh (single-flight).
+
+    mint: async callable (installation_id) -> (token, expires_at as epoch seconds)
+    """
+
+    def __init__(self, mint, refresh_margin: float = 300):
+        self.mint = mint
+        self.refresh_margin = refresh_margin
+        self.tokens = {}  # installation_id -> (token, expires_at)
+        self.locks = {}
+
+    def _fresh(self, installation_id: int):
+        cached = self.tokens.get(installation_id)
+        if cached and cached[1] - self.refresh_margin > time.time():
+            return cached[0]
+        return None
+
+    async def get(self, installation_id: int) -> str:
+        token = self._fresh(installation_id)
+        if token:
+            return token
+
+        lock = self.locks.setdefault(installation_id, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed while we waited for the lock
+            token = self._fresh(installation_id)
+            if token:
+                return token
+
+            token, expires_at = await self.mint(installation_id)
+            self.tokens[installation_id] = (token, expires_at)
+            logger.info(f"Minted token for installation {installation_id} "
+                        f"(expires in {int(expires_at - time.time())}s)")
+            return token
+
+    def invalidate(self, installation_id: int):
+        self.tokens.pop(installation_id, None)
+
+
 class GitHubClient:
+    """Async GitHub REST client. Authenticates as a GitHub App installation when configured."""
+
     def __init__(self):
-        # For now, using Personal Access Token or App ID
-        # Ideally we use App Integration, but starting simple
-        self.g = None
+        self.integration = None
         if settings.GITHUB_PRIVATE_KEY and settings.GITHUB_APP_ID:
-            # App Auth (Robust)
+            # App Auth (Robust). PyGithub is only needed for the App JWT, so it loads only here.
+            from github import GithubIntegration
             self.integration = GithubIntegration(
                 settings.GITHUB_APP_ID,
                 settings.GITHUB_PRIVATE_KEY
             )
-        else:
-            # Fallback (for testing)
-            self.g = Github() 
-
-    def get_token(self, installation_id: int):
-        """Get access token for a specific installation"""
-        if hasattr(self, 'integration'):
-            return self.integration.get_access_token(installation_id).token
-        return None
+        # Otherwise requests go out unauthenticated (for testing)
+        self.tokens = InstallationTokenCache(self._mint_token, settings.GITHUB_TOKEN_REFRESH_MARGIN)
+        self.writes = WriteScheduler()
 
-    def get_pr_diff(self, repo_full_name: str, pr_number: int, installation_id: int = None) -> str:
-        """Fetches the raw diff of a Pull Request"""
-        try:
-            # Authenticate
-            gh = self.g
-            if installation_id and hasattr(self, 'integration'):
-                token = self.get_token(installation_id)
-                gh = Github(login_or_token=token)
-            
-            if not gh:
-                raise ValueError("GitHub Client not configured/authenticated")
-
-            repo = gh.get_repo(repo_full_name)
-            pr = repo.get_pull(pr_number)
-            
-            # Get Diff URL content
-             # PyGithub doesn't fetch raw diff easily via get_pull, 
-             # usually requires requests with Accept header.
-             # Simplified approach: Use requests with the token
-            import requests
-            headers = {
-                "Authorization": f"token {gh.get_oauth_application_token().token}" if not installation_id else f"token {token}",
-                "Accept": "application/vnd.github.v3.diff"
+    async def _mint_token(self, installation_id: int):
+        """Exchanges the App JWT for an installation access token"""
+        response = await get_http_client().post(
+            f"/app/installations/{installation_id}/access_tokens",
+            headers={
+                "Accept": "application/vnd.github+json",
+                "Authorization": f"Bearer {self.integration.create_jwt()}",
             }
-            # Note: PyGithub objects allow getting the diff_url
-            response = requests.get(pr.diff_url, headers=headers)
+        )
+        response.raise_for_status()
+        data = response.json()
+        expires_at = datetime.fromisoformat(data["expires_at"].replace("Z", "+00:00")).timestamp()
+        return data["token"], expires_at
+
+    async def get_token(self, installation_id: int):
+        """Get access token for a specific installation (cached until shortly before expiry)"""
+        if self.integration and installation_id:
+            return await self.tokens.get(installation_id)
+        return None
+
+    async def _request(self, method: str, url: str, installation_id: int = None,
+                       accept: str = "application/vnd.github+json", stream: bool = False,
+                       **kwargs) -> httpx.Response:
+        """
+        One API call with token refresh and rate-limit retries.
+        stream=True returns before the body is read; the caller must aclose() the response.
+        """
+        client = get_http_client()
+        refreshed = False
+        retries = 0
+        while True:
+            if method.upper() in WRITE_METHODS:
+                await self.writes.wait(installation_id)
+
+            headers = {"Accept": accept}
+            token = await self.get_token(installation_id)
+            if token:
+                headers["Authorization"] = f"token {token}"
+
+            match = _REPO_PATH.search(str(url))
+            with tracing.span("github.request", method=method, url=str(url)) as call:
+                request = client.build_request(method, url, headers=headers, **kwargs)
+                response = await client.send(request, stream=stream)
+                call.set(status=response.status_code)
+            GITHUB_CALLS.inc(method=method, status=response.status_code, repo=match.group(1) if match else "")
+            if stream and response.is_error:
+                # Error bodies are small; read it so retry_delay() and raise_for_status() can use it
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+            if response.status_code == 401 and token and not refreshed:
+                # Token revoked or expired early: drop it and retry once with a fresh one
+                self.tokens.invalidate(installation_id)
+                refreshed = True
+                continue
+
+            delay = retry_delay(response)
+            if delay is not None and retries < settings.GITHUB_MAX_RETRIES:
+                retries += 1
+                logger.warning(f"GitHub rate limit on {method} {url}, retrying in {delay:.0f}s "
+                               f"({retries}/{settings.GITHUB_MAX_RETRIES})")
+                if method.upper() in WRITE_METHODS:
+                    await self.writes.backoff(installation_id, delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+
             response.raise_for_status()
-            return response.text
+            return response
 
-        except Exception as e:
-            logger.error(f"Failed to fetch PR diff: {e}")
+    async def _stream_lines(self, url: str, installation_id: int = None, accept: str = "application/vnd.github.v3.diff"):
+        """Yields the response body line by line without ever holding all of it"""
+        response = await self._request("GET", url, installation_id, accept=accept, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                yield line
+        finally:
+            await response.aclose()
+
+    def stream_pr_diff(self, repo_full_name: str, pr_number: int, installation_id: int = None):
+        """The raw diff of a Pull Request as an async iterator of lines"""
+        return self._stream_lines(f"/repos/{repo_full_name}/pulls/{pr_number}", installation_id)
+
+    def stream_compare_diff(self, repo_full_name: str, base_sha: str, head_sha: str, installation_id: int = None):
+        """The raw diff between two commits as an async iterator of lines"""
+        return self._stream_lines(f"/repos/{repo_full_name}/compare/{base_sha}...{head_sha}", installation_id)
+
+    async def get_file_content(self, repo_full_name: str, path: str, ref: str, installation_id: int = None):
+        """Raw content of one file at `ref`, or None if it does not exist"""
+        try:
+            response = await self._request(
+                "GET", f"/repos/{repo_full_name}/contents/{path}", installation_id,
+                accept="application/vnd.github.raw", params={"ref": ref}
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
             raise
-    
-    def post_comment(self, repo_full_name: str, pr_number: int, body: str, installation_id: int = None):
+        return response.text
+
+    async def list_review_comments(self, repo_full_name: str, pr_number: int, installation_id: int = None) -> list:
+        """Returns every inline review comment already on the PR"""
+        comments = []
+        url = f"/repos/{repo_full_name}/pulls/{pr_number}/comments"
+        params = {"per_page": 100}
+        while url:
+            response = await self._request("GET", url, installation_id, params=params)
+            comments.extend(response.json())
+            url = response.links.get("next", {}).get("url")
+            params = None  # The next link already carries the query string
+        return comments
+
+    async def post_comment(self, repo_full_name: str, pr_number: int, body: str, installation_id: int = None):
         """Posts a general review comment on the PR"""
         try:
-             # Authenticate
-            gh = self.g
-            if installation_id and hasattr(self, 'integration'):
-                token = self.get_token(installation_id)
-                gh = Github(login_or_token=token)
-
-            repo = gh.get_repo(repo_full_name)
-            pr = repo.get_pull(pr_number)
-            pr.create_issue_comment(body)
+            await self._request(
+                "POST", f"/repos/{repo_full_name}/issues/{pr_number}/comments", installation_id,
+                json={"body": body}
+            )
             logger.info(f"Comment posted on {repo_full_name}#{pr_number}")
 
         except Exception as e:
             logger.error(f"Failed to post comment: {e}")
             raise
 
-    def post_inline_review(self, repo_full_name: str, pr_number: int, comments: list, installation_id: int = None):
+    async def post_inline_review(self, repo_full_name: str, pr_number: int, comments: list,
+                                 installation_id: int = None, commit_id: str = None, summary: list = None):
         """
         Posts inline review comments on specific lines.
-        
+
         comments: list of dicts with keys:
             - path: file path (e.g., "src/main.py")
-            - line: line number in the diff
+            - line: line number in the new file (already validated against the diff)
             - body: comment text
+        commit_id: head SHA the review applies to (GitHub defaults to the latest commit)
+        summary: findings that cannot be anchored to the diff; listed in the review body
         """
+        body = "## 🐰 VertexRabbit Review"
+        if summary:
+            body += "\n\n### Findings outside the diff\n\n" + "".join(
+                f"- **{c.get('path')}:{c.get('line')}** - {c.get('body')}\n" for c in summary
+            )
+
         try:
-            gh = self.g
-            if installation_id and hasattr(self, 'integration'):
-                token = self.get_token(installation_id)
-                gh = Github(login_or_token=token)
-
-            repo = gh.get_repo(repo_full_name)
-            pr = repo.get_pull(pr_number)
-            
-            # Get the latest commit SHA (required for review comments)
-            commit = pr.get_commits().reversed[0]
-            
-            # Create review with inline comments
-            pr.create_review(
-                commit=commit,
-                body="## 🐰 VertexRabbit Review",
-                event="COMMENT",
-                comments=[
+            review = {
+                "body": body,
+                "event": "COMMENT",
+                "comments": [
                     {
                         "path": c.get("path"),
                         "line": c.get("line"),  # Line in the new file
+                        "side": "RIGHT",
                         "body": c.get("body")
                     }
                     for c in comments if c.get("path") and c.get("line")
                 ]
+            }
+            if commit_id:
+                review["commit_id"] = commit_id
+
+            await self._request(
+                "POST", f"/repos/{repo_full_name}/pulls/{pr_number}/reviews", installation_id,
+                json=review
             )
-            logger.info(f"Inline review posted on {repo_full_name}#{pr_number} with {len(comments)} comments")
+            logger.info(f"Inline review posted on {repo_full_name}#{pr_number} with {len(comments)} comments"
+                        f" and {len(summary or [])} summary findings")
 
         except Exception as e:
             logger.error(f"Failed to post inline review: {e}")
             # Fallback to regular comment
             fallback_body = "## 🐰 VertexRabbit Review\n\n"
-            for c in comments:
+            for c in list(comments) + list(summary or []):
                 fallback_body += f"**{c.get('path')}:{c.get('line')}** - {c.get('body')}\n\n"
-            self.post_comment(repo_full_name, pr_number, fallback_body, installation_id)
+            await self.post_comment(repo_full_name, pr_number, fallback_body, installation_id)
+
+    async def list_issues(self, repo_full_name: str, installation_id: int = None, labels: str = None,
+                          state: str = "open", max_pages: int = 5) -> list:
+        """Returns issues (not pull requests) of the repository, newest first"""
+        issues = []
+        url = f"/repos/{repo_full_name}/issues"
+        params = {"state": state, "per_page": 100}
+        if labels:
+            params["labels"] = labels
+        for _ in range(max_pages):
+            response = await self._request("GET", url, installation_id, params=params)
+            issues.extend(i for i in response.json() if "pull_request" not in i)
+            url = response.links.get("next", {}).get("url")
+            params = None
+            if not url:
+                break
+        return issues
 
-            self.post_comment(repo_full_name, pr_number, fallback_body, installation_id)
+    async def update_issue(self, repo_full_name: str, number: int, body: str, installation_id: int = None):
+        """Replaces the body of an existing issue"""
+        await self._request(
+            "PATCH", f"/repos/{repo_full_name}/issues/{number}", installation_id, json={"body": body}
+        )
+        logger.info(f"Updated Issue #{number}")
 
-    def create_issue(self, repo_full_name: str, title: str, body: str, labels: list = None, installation_id: int = None):
+    async def create_issue(self, repo_full_name: str, title: str, body: str, labels: list = None,
+                           installation_id: int = None):
         """Creates a GitHub Issue in the repository"""
         try:
-            gh = self.g
-            if installation_id and hasattr(self, 'integration'):
-                token = self.get_token(installation_id)
-                gh = Github(login_or_token=token)
-
-            repo = gh.get_repo(repo_full_name)
-            issue = repo.create_issue(
-                title=title,
-                body=body,
-                labels=labels or []
+            response = await self._request(
+                "POST", f"/repos/{repo_full_name}/issues", installation_id,
+                json={"title": title, "body": body, "labels": labels or []}
             )
-            logger.info(f"Created Issue #{issue.number}: {title}")
-            return issue.number
+            number = response.json()["number"]
+            logger.info(f"Created Issue #{number}: {title}")
+            return number
 
         except Exception as e:
             logger.error(f"Failed to create issue: {e}")
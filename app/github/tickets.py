@@ -0,0 +1,104 @@
+import re
+import logging
+
+from app.core.findings import fingerprint
+from app.core.policy import severity_rank
+
+logger = logging.getLogger("github_tickets")
+
+TITLE_PREFIX = "🐛 [Auto-Bug]"
+TICKET_LABELS = ["bug", "security"]
+# Lowest severity that gets ticketed unless the repo's policy says otherwise (error ranks with high)
+TICKET_SEVERITY = "high"
+
+# Hidden markers in the issue body: which PR an issue tracks and which findings it holds
+PR_MARKER = "<!-- vertexrabbit:pr:{} -->"
+FP_MARKER = "<!-- vertexrabbit:fp:{} -->"
+FP_PATTERN = re.compile(r"<!-- vertexrabbit:fp:([0-9a-f]{32}) -->")
+
+# GitHub rejects issue bodies over 65536 characters
+MAX_BODY = 60000
+
+
+def _entry(issue: dict, fp: str) -> str:
+    return (f"{FP_MARKER.format(fp)}\n"
+            f"- [ ] **`{issue.get('path')}:{issue.get('line')}`** ({issue.get('severity', '')})\n"
+            f"  {issue.get('body')}\n")
+
+
+def _append(body: str, entries: list) -> str:
+    """Appends entries while the body fits; overflow keeps only its markers so it stays deduped"""
+    overflow = []
+    for fp, text in entries:
+        if len(body) + len(text) < MAX_BODY:
+            body += text
+        else:
+            overflow.append(fp)
+    if overflow:
+        body += f"\n_…and {len(overflow)} more finding(s), see the PR review._\n"
+        body += "".join(FP_MARKER.format(fp) for fp in overflow)
+    return body
+
+
+def ticketable(issues: list, min_severity: str = TICKET_SEVERITY) -> list:
+    threshold = severity_rank(min_severity)
+    return [i for i in issues if severity_rank(i.get("severity")) >= threshold]
+
+
+async def file_tracking_issue(client, issues: list, payload: dict, min_severity: str = TICKET_SEVERITY) -> int:
+    """
+    Files every finding of a PR at or above min_severity into one tracking issue, skipping
+    findings already recorded in any open auto-bug issue. Costs at most one listing and
+    one create-or-update call however many findings there are.
+    Returns the number of newly ticketed findings, or None if GitHub could not be updated.
+    """
+    repo_full_name = payload["repo_full_name"]
+    pr_number = payload["pr_number"]
+    installation_id = payload.get("installation_id")
+
+    severe = {}
+    for issue in ticketable(issues, min_severity):
+        # Same line-shift-proof fingerprint as the finding store (stamped by the pipeline)
+        severe.setdefault(issue.get("fingerprint") or fingerprint(repo_full_name, issue), issue)
+    if not severe:
+        return 0
+
+    try:
+        existing = await client.list_issues(repo_full_name, installation_id, labels=TICKET_LABELS[0])
+    except Exception as e:
+        logger.error(f"Could not list open issues, skipping auto-tickets: {e}")
+        return None
+
+    known = set()
+    tracking = None
+    for item in existing:
+        if not item.get("title", "").startswith(TITLE_PREFIX):
+            continue
+        body = item.get("body") or ""
+        known.update(FP_PATTERN.findall(body))
+        if PR_MARKER.format(pr_number) in body:
+            tracking = item
+
+    new = [(fp, _entry(issue, fp)) for fp, issue in severe.items() if fp not in known]
+    if not new:
+        logger.info(f"All {len(severe)} severe finding(s) already ticketed")
+        return 0
+
+    try:
+        if tracking:
+            body = _append(tracking.get("body") or "", new)
+            await client.update_issue(repo_full_name, tracking["number"], body, installation_id)
+        else:
+            title = f"{TITLE_PREFIX} PR #{pr_number}: {len(new)} finding(s)"
+            header = (f"**Detected by VertexRabbit** in #{pr_number}\n"
+                      f"{PR_MARKER.format(pr_number)}\n\n")
+            number = await client.create_issue(
+                repo_full_name, title, _append(header, new), labels=TICKET_LABELS, installation_id=installation_id
+            )
+            if number is None:
+                return None
+    except Exception as e:
+        logger.error(f"Failed to file tracking issue: {e}")
+        return None
+
+    return len(new)
@@ -0,0 +1,69 @@
+import time
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.limiter import RateLimiter, limiters, parse_duration
+
+logger = logging.getLogger("github_writer")
+
+# Requests that create content count against GitHub's secondary rate limits
+WRITE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+def retry_delay(response) -> float:
+    """
+    Seconds to wait before retrying a rate-limited response, or None if it was not one.
+    Follows GitHub's guidance: Retry-After first, then x-ratelimit-reset when the primary
+    limit is exhausted, else at least a minute for a secondary limit.
+    """
+    if response.status_code not in (403, 429):
+        return None
+
+    retry_after = parse_duration(response.headers.get("retry-after", ""))
+    if retry_after > 0:
+        return retry_after
+
+    if response.headers.get("x-ratelimit-remaining") == "0":
+        reset = float(response.headers.get("x-ratelimit-reset", "0") or 0)
+        return max(1.0, reset - time.time())
+
+    if response.status_code == 429 or "secondary rate limit" in response.text.lower():
+        return 60.0
+    return None  # A plain permission error
+
+
+class WriteScheduler:
+    """
+    Paces content-creating requests per installation: at most GITHUB_WRITES_PER_MINUTE
+    (budget shared across workers through the limiter backend) and one at a time with
+    GITHUB_WRITE_INTERVAL seconds between them, as GitHub recommends.
+    """
+
+    def __init__(self, per_minute: int = None, interval: float = None):
+        self.per_minute = per_minute if per_minute is not None else settings.GITHUB_WRITES_PER_MINUTE
+        self.interval = interval if interval is not None else settings.GITHUB_WRITE_INTERVAL
+        self.budgets = {}  # installation -> RateLimiter
+        self.locks = {}
+        self.last_write = {}
+
+    def _limiter(self, installation_id) -> RateLimiter:
+        key = installation_id or "anonymous"
+        if key not in self.budgets:
+            self.budgets[key] = RateLimiter(f"github:writes:{key}", rpm=self.per_minute, backend=limiters.backend)
+        return self.budgets[key]
+
+    async def wait(self, installation_id):
+        """Blocks until the next write for this installation may be sent"""
+        key = installation_id or "anonymous"
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            await self._limiter(installation_id).acquire()
+            gap = self.last_write.get(key, 0.0) + self.interval - time.monotonic()
+            if gap > 0:
+                await asyncio.sleep(gap)
+            self.last_write[key] = time.monotonic()
+
+    async def backoff(self, installation_id, seconds: float):
+        """Holds back every writer for this installation after a rate-limit response"""
+        await self._limiter(installation_id).penalize(seconds)
@@ -1,10 +1,47 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.jobs import job_queue, JobStatus
+from app.core import deps
 from app.api.webhook import router as webhook_router
+from app.api.jobs import router as jobs_router
+from app.ai.cache import review_cache
+from app.core.metrics import registry
+
+logger = logging.getLogger("main")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only processes that run jobs load the pipeline (and with it the GitHub and LLM SDKs)
+    warm_up = None
+    if settings.JOB_RUN_IN_WEB:
+        from app.pipeline.review import run_review
+        job_queue.register("review", run_review)
+        await job_queue.start()
+        # Build the clients while the server is already accepting webhooks
+        warm_up = asyncio.create_task(asyncio.to_thread(deps.warm_up))
+    elif settings.JOB_STORE == "memory":
+        logger.warning("JOB_RUN_IN_WEB=false with JOB_STORE=memory: queued reviews will never run")
+    else:
+        logger.info("JOB_RUN_IN_WEB=false: reviews run in `python -m app worker` processes")
+
+    yield
 
-app = FastAPI(title="VertexRabbit", version="0.1.0")
+    if warm_up:
+        await asyncio.gather(warm_up, return_exceptions=True)
+    await job_queue.stop()
+    await deps.close()
+
+
+app = FastAPI(title="VertexRabbit", version="0.1.0", lifespan=lifespan)
 
 app.include_router(webhook_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
 
 @app.get("/")
 def read_root():
@@ -13,3 +50,18 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition (per process)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def stats():
+    # Never builds the reviewer: a web-only process has no providers to report
+    reviewer = deps.peek_reviewer()
+    return {
+        "queue": {status: job_queue.store.count(status) for status in (JobStatus.QUEUED, JobStatus.RUNNING)},
+        "review_cache": review_cache.stats() if review_cache else None,
+        "providers": reviewer.router.stats() if reviewer else None,
+    }
@@ -0,0 +1,149 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from app.core import tracing
+from app.core.metrics import STAGE_SECONDS
+
+logger = logging.getLogger("pipeline")
+
+
+@dataclass
+class Stage:
+    name: str
+    run: object  # async callable (inputs: dict of dependency results) -> result
+    deps: tuple = ()
+    optional: bool = False  # On failure the stage yields `default` instead of failing the pipeline
+    default: object = None
+    deadline: float = None  # Optional stages only: seconds to finish by, counted from...
+    deadline_after: tuple = ()  # ...when these stages are done (graph start if empty)
+
+
+class StageGraph:
+    """
+    A small DAG of async stages. Each stage starts as soon as all of its dependencies
+    have finished, so independent branches (e.g. LLM review and clone + scan) overlap.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name: str, run, deps: tuple = (), optional: bool = False, default=None,
+            deadline: float = None, deadline_after: tuple = ()):
+        """
+        deadline: an optional stage still waiting for its dependencies or still running
+        this many seconds after the stages in `deadline_after` are done (or after the graph
+        started) yields `default` instead, so stages depending on it are never held up by a
+        slow branch. Until then it gets as long as those stages take.
+        """
+        for dep in (*deps, *deadline_after):
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        if deadline is None and deadline_after:
+            raise ValueError(f"Stage '{name}' has deadline_after but no deadline")
+        if deadline is not None and not optional:
+            raise ValueError(f"Stage '{name}' has a deadline but is not optional")
+        self.stages[name] = Stage(name, run, tuple(deps), optional, default, deadline, tuple(deadline_after))
+
+    async def run(self, on_change=None):
+        """
+        Runs every stage and returns (results, timings).
+        on_change: optional callable receiving the sorted names of running stages;
+        if it raises (e.g. job cancelled) the whole graph is torn down.
+        timings: {stage: {"start": seconds since graph start, "duration": seconds, "status": ...}}
+        """
+        started = time.monotonic()
+        results = {}
+        timings = {}
+        running = set()
+        tasks = {}
+        timed_out = set()  # Stages cancelled for missing their deadline
+
+        def notify():
+            if on_change:
+                on_change(sorted(running))
+
+        async def perform(stage: Stage):
+            inputs = {}
+            try:
+                for dep in stage.deps:
+                    # Shielded: giving up on a dependency must not cancel it for other stages
+                    inputs[dep] = await asyncio.shield(tasks[dep])
+            except asyncio.CancelledError:
+                if stage.name not in timed_out:
+                    raise
+                logger.warning(f"Stage '{stage.name}' skipped: dependencies not ready within {stage.deadline}s")
+                timings[stage.name] = {"start": round(time.monotonic() - started, 3), "duration": 0.0,
+                                       "status": "timeout"}
+                STAGE_SECONDS.observe(0.0, stage=stage.name, status="timeout")
+                results[stage.name] = stage.default
+                return stage.default
+
+            running.add(stage.name)
+            notify()
+            stage_start = time.monotonic()
+            status = "ok"
+            try:
+                with tracing.span(f"stage.{stage.name}"):
+                    result = await stage.run(inputs)
+            except asyncio.CancelledError:
+                if stage.name not in timed_out:
+                    status = "cancelled"
+                    raise
+                logger.warning(f"Stage '{stage.name}' timed out after its {stage.deadline}s deadline")
+                status = "timeout"
+                result = stage.default
+            except Exception as e:
+                if not stage.optional:
+                    status = "failed"
+                    raise
+                logger.error(f"Stage '{stage.name}' failed: {e}")
+                status = "failed"
+                result = stage.default
+            finally:
+                running.discard(stage.name)
+                duration = time.monotonic() - stage_start
+                timings[stage.name] = {
+                    "start": round(stage_start - started, 3),
+                    "duration": round(duration, 3),
+                    "status": status,
+                }
+                STAGE_SECONDS.observe(duration, stage=stage.name, status=status)
+
+            results[stage.name] = result
+            return result
+
+        async def execute(stage: Stage):
+            if stage.deadline is None:
+                return await perform(stage)
+
+            work = asyncio.create_task(perform(stage))
+            try:
+                # The clock starts once the stages it is measured from are done
+                waiting = {tasks[name] for name in stage.deadline_after}
+                while waiting and not work.done():
+                    _, waiting = await asyncio.wait(waiting | {work}, return_when=asyncio.FIRST_COMPLETED)
+                    waiting.discard(work)
+                done, _ = await asyncio.wait({work}, timeout=stage.deadline)
+                if not done:
+                    timed_out.add(stage.name)
+                    work.cancel()
+                return await work
+            finally:
+                work.cancel()
+
+        # Stages are registered after their dependencies, so creation order is topological
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(execute(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        logger.info("Stage timings: " + ", ".join(f"{n}={t['duration']:.2f}s" for n, t in timings.items()))
+        return results, timings
@@ -0,0 +1,317 @@
+import asyncio
+import logging
+from dataclasses import replace
+from contextlib import asynccontextmanager, AsyncExitStack
+
+from app.github.tickets import file_tracking_issue, ticketable
+from app.ai.router import ReviewFailed
+from app.ai.context import build_context
+from app.tools.runner import ToolRunner
+from app.core.state import pr_state, findings
+from app.core.findings import stamp_fingerprints
+from app.diff.parser import parse_diff, changed_lines
+from app.diff.filters import DiffFilter, GitAttributes, read_diff
+from app.diff.index import DiffIndex
+from app.pipeline.dag import StageGraph
+from app.core import tracing
+from app.core.config import settings
+from app.core.deps import get_github_client, get_reviewer
+from app.core.policy import DEFAULT_POLICY, POLICY_FILE, parse_policy
+
+logger = logging.getLogger("pipeline")
+
+
+@asynccontextmanager
+async def _checkout(runner: ToolRunner, repo_full_name: str, fetch_url: str, ref: str):
+    """Async wrapper around the (blocking) mirror checkout; git runs in a worker thread"""
+    cm = runner.checkout(repo_full_name, fetch_url, ref)
+    temp_dir = await asyncio.to_thread(cm.__enter__)
+    try:
+        yield temp_dir
+    finally:
+        await asyncio.to_thread(cm.__exit__, None, None, None)
+
+
+def _restrict_to_pr(compare_files: list, pr_files: list) -> list:
+    """
+    Keeps only compare-diff hunks that touch lines the PR itself adds.
+    This drops changes merged in from the base branch between the two heads.
+    """
+    pr_added = {f.path: set(f.added_lines()) for f in pr_files}
+    kept = []
+    for file in compare_files:
+        added = pr_added.get(file.path)
+        if not added:
+            continue
+        hunks = [h for h in file.hunks if added.intersection(h.added_lines())]
+        if hunks:
+            kept.append(replace(file, hunks=hunks))
+    return kept
+
+
+async def _base_file(payload: dict, path: str) -> str:
+    """
+    Content of a repo file at the PR's base commit ("" if missing or unreadable). Review
+    settings come from the base so a PR cannot change how it is reviewed itself.
+    """
+    ref = payload.get("base_sha") or payload.get("base_ref")
+    if not ref:
+        return ""
+    try:
+        return await get_github_client().get_file_content(
+            payload["repo_full_name"], path, ref, payload.get("installation_id")
+        ) or ""
+    except Exception as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return ""
+
+
+async def _diff_filter(payload: dict) -> DiffFilter:
+    """Configured exclude globs plus the repo's own .gitattributes at the PR base"""
+    return DiffFilter(attributes=GitAttributes(await _base_file(payload, ".gitattributes")))
+
+
+async def _incremental_diff(payload: dict, last_sha: str, pr_files: list, diff_filter: DiffFilter):
+    """
+    Diff of what changed since the last reviewed head, limited to the PR's own changes.
+    Returns None when the old head is gone (force-push) or the compare call fails.
+    """
+    gh_client = get_github_client()
+    try:
+        compare, _ = await read_diff(
+            gh_client.stream_compare_diff(
+                payload["repo_full_name"], last_sha, payload["head_sha"], payload.get("installation_id")
+            ),
+            diff_filter
+        )
+    except Exception as e:
+        logger.warning(f"Compare {last_sha[:7]}...{payload['head_sha'][:7]} failed, reviewing full diff: {e}")
+        return None
+
+    files = _restrict_to_pr(compare, pr_files)
+    return "\n".join(f.text for f in files)
+
+
+async def _drop_already_posted(issues: list, payload: dict) -> list:
+    """Filters out findings whose comment text is already on the same file of the PR"""
+    gh_client = get_github_client()
+    try:
+        existing = await gh_client.list_review_comments(
+            payload["repo_full_name"], payload["pr_number"], payload.get("installation_id")
+        )
+    except Exception as e:
+        logger.warning(f"Could not list existing review comments: {e}")
+        return issues
+
+    posted = {(c.get("path"), (c.get("body") or "").strip()) for c in existing}
+    fresh = [i for i in issues if (i.get("path"), str(i.get("body", "")).strip()) not in posted]
+    if len(fresh) < len(issues):
+        logger.info(f"Suppressed {len(issues) - len(fresh)} finding(s) already posted on the PR")
+    return fresh
+
+
+async def run_review(job, ctx) -> dict:
+    """
+    Full review pipeline for one pull request event.
+    job.payload: repo_full_name, pr_number, installation_id, head_ref, head_sha, base_ref, base_sha
+    """
+    gh_client = get_github_client()
+    reviewer = get_reviewer()
+    payload = job.payload
+    repo_full_name = payload["repo_full_name"]
+    pr_number = payload["pr_number"]
+    installation_id = payload.get("installation_id")
+    head_sha = payload.get("head_sha")
+
+    logger.info(f"Processing PR #{pr_number} in {repo_full_name}")
+    tracing.set_baggage(repo=repo_full_name)
+    if tracing.current_span():
+        tracing.current_span().set(repo=repo_full_name, pr=pr_number, head_sha=head_sha)
+    last_sha = pr_state.last_reviewed_sha(repo_full_name, pr_number)
+    runner = ToolRunner()
+
+    # Stage DAG:
+    #   diff ───────────────────► ai_review ──┐
+    #     │    checkout ──► context ┄┄┘        ├──► post   (┄ given up REVIEW_CONTEXT_DEADLINE after diff + policy)
+    #     └───────┴──────────► sast ───────────┘
+    #   policy (base ref, over the API) ──► ai_review, sast, post
+    graph = StageGraph()
+
+    async def fetch_diff(_):
+        # Streamed and filtered file by file: lockfiles, vendored/generated code, binaries
+        # and oversized files never reach memory in full, let alone the prompt
+        diff_filter = await _diff_filter(payload)
+        pr_files, skipped = await read_diff(
+            gh_client.stream_pr_diff(repo_full_name, pr_number, installation_id), diff_filter
+        )
+        if skipped:
+            logger.info(f"Skipped {len(skipped)} file(s): " + ", ".join(
+                f"{f.path} ({f.skipped})" for f in skipped[:10]) + (" ..." if len(skipped) > 10 else ""))
+        diff_content = "\n".join(f.text for f in pr_files)
+        result = {"text": diff_content, "incremental": False, "pr": pr_files, "skipped": len(skipped)}
+
+        # Only what changed since the last reviewed head, when we have one
+        if last_sha and head_sha and last_sha != head_sha:
+            review_diff = await _incremental_diff(payload, last_sha, pr_files, diff_filter)
+            if review_diff is not None:
+                logger.info(f"Incremental review {last_sha[:7]}..{head_sha[:7]} "
+                            f"({len(review_diff)} of {len(diff_content)} chars)")
+                result.update(text=review_diff, incremental=True)
+        return result
+
+    async def checkout(_):
+        # Starts right away, in parallel with the diff fetch and the LLM call
+        token = await gh_client.get_token(installation_id)
+        clone_url = f"{settings.GITHUB_GIT_URL}/{repo_full_name}.git"
+        if token:
+            scheme, rest = clone_url.split("://", 1)
+            clone_url = f"{scheme}://x-access-token:{token}@{rest}"
+        # The pull ref also works for PRs opened from forks
+        ref = f"refs/pull/{pr_number}/head"
+        return await stack.enter_async_context(_checkout(runner, repo_full_name, clone_url, ref))
+
+    async def context(inputs):
+        # Symbol index over the checkout, so prompts can carry the definitions the diff calls
+        return await build_context(repo_full_name, inputs["checkout"])
+
+    async def policy(_):
+        # The repo's .vertexrabbit.yml at the PR base, straight from the API (no checkout wait)
+        return parse_policy(await _base_file(payload, POLICY_FILE))
+
+    async def ai_review(inputs):
+        # Findings arrive chunk by chunk while the rest of the diff is still being reviewed
+        issues = []
+        report = {}
+        try:
+            # ctx.check between chunks: a superseded job stops spending LLM calls
+            async for issue in reviewer.stream_issues(
+                inputs["diff"]["text"], inputs["context"], inputs["policy"], report, checkpoint=ctx.check
+            ):
+                issues.append(issue)
+            return {"issues": issues, "complete": True, **report}
+        except ReviewFailed as e:
+            # Keep whatever was found, but never let a failure pass for a clean review
+            logger.error(f"AI review incomplete for PR #{pr_number}: {e}")
+            return {"issues": issues, "complete": False, **report}
+
+    async def sast(inputs):
+        # Bandit, Semgrep, Ruff, ESLint, Gitleaks on the files and lines under review
+        scope = changed_lines(parse_diff(inputs["diff"]["text"]))
+        scope = {path: lines for path, lines in scope.items() if not inputs["policy"].excluded(path)}
+        if not scope:
+            return []
+        return await runner.run_sast(inputs["checkout"], scope)
+
+    async def post(inputs):
+        # Merge Issues, then drop those already posted on this PR or already ticketed:
+        # fingerprints ignore line numbers, so findings shifted by later pushes still match
+        issues = stamp_fingerprints(
+            repo_full_name, inputs["ai_review"]["issues"] + (inputs["sast"] or []), inputs["diff"]["pr"]
+        )
+        posted, ticketed = findings.seen(repo_full_name, pr_number, [i["fingerprint"] for i in issues])
+        fresh = [i for i in issues if i["fingerprint"] not in posted]
+        if len(fresh) < len(issues):
+            logger.info(f"Suppressed {len(issues) - len(fresh)} finding(s) already posted on the PR")
+        if last_sha and fresh and not findings.tracked(repo_full_name, pr_number):
+            # Reviewed before fingerprints were kept: compare against the PR's comments instead
+            fresh = await _drop_already_posted(fresh, payload)
+        # Comments must land on lines of the PR diff itself, whatever diff was reviewed
+        index = DiffIndex(inputs["diff"]["pr"])
+        return await _post_results(
+            fresh, payload, index, followup=bool(last_sha), ai_complete=inputs["ai_review"]["complete"],
+            ticket_severity=inputs["policy"].ticket_severity,
+            unticketed=[i for i in issues if i["fingerprint"] not in ticketed]
+        )
+
+    graph.add("diff", fetch_diff)
+    graph.add("checkout", checkout, optional=True)
+    graph.add("policy", policy, optional=True, default=DEFAULT_POLICY)
+    # Best effort: once the AI review has everything else, it waits only so long for the
+    # context before going ahead without it rather than on a slow clone
+    graph.add("context", context, deps=("checkout",), optional=True,
+              deadline=settings.REVIEW_CONTEXT_DEADLINE, deadline_after=("diff", "policy"))
+    graph.add("ai_review", ai_review, deps=("diff", "context", "policy"))
+    graph.add("sast", sast, deps=("diff", "checkout", "policy"), optional=True, default=[])
+    graph.add("post", post, deps=("diff", "ai_review", "sast", "policy"))
+
+    def on_change(running):
+        if running:
+            ctx.progress(", ".join(running))
+
+    async with AsyncExitStack() as stack:
+        results, timings = await graph.run(on_change)
+
+    complete = results["ai_review"]["complete"]
+    # An incomplete review leaves the head unreviewed, so the next push covers it again
+    if head_sha and complete:
+        pr_state.mark_reviewed(repo_full_name, pr_number, head_sha)
+
+    review = results["ai_review"]
+    return {**results["post"], "incremental": results["diff"]["incremental"],
+            "skipped_files": results["diff"]["skipped"], "triaged_out": review.get("triaged_out", 0),
+            "over_budget": review.get("over_budget", 0), "complete": complete, "timings": timings}
+
+
+def _fingerprinted(issues: list) -> list:
+    return [(i["fingerprint"], i.get("path") or "") for i in issues if i.get("fingerprint")]
+
+
+async def _post_results(issues: list, payload: dict, index: DiffIndex, followup: bool,
+                        ai_complete: bool = True, ticket_severity: str = DEFAULT_POLICY.ticket_severity,
+                        unticketed: list = None) -> dict:
+    """
+    Posts the inline review and auto-tickets (or an LGTM comment), recording what was
+    posted and ticketed in the finding store.
+    unticketed: findings to consider for tickets (default: issues); may include findings
+    posted by an earlier review whose ticket is still missing
+    """
+    gh_client = get_github_client()
+    repo_full_name = payload["repo_full_name"]
+    pr_number = payload["pr_number"]
+    installation_id = payload.get("installation_id")
+
+    if issues:
+        # Snap each finding onto a commentable line; the rest go in the review body,
+        # so a single bad line can no longer make GitHub reject the whole review
+        inline, summary = index.partition(issues)
+        if summary:
+            logger.info(f"{len(summary)} finding(s) outside the diff moved to the review summary")
+
+        # Post Inline Review
+        await gh_client.post_inline_review(
+            repo_full_name, pr_number, inline, installation_id,
+            commit_id=payload.get("head_sha"), summary=summary
+        )
+        findings.record(repo_full_name, pr_number, _fingerprinted(issues), posted=True)
+
+    # Auto-Ticket Critical Bugs (one tracking issue per PR, deduped against open tickets)
+    ticket_count = 0
+    severe = ticketable(issues if unticketed is None else unticketed, ticket_severity)
+    if severe:
+        ticket_count = await file_tracking_issue(gh_client, severe, payload, ticket_severity)
+        if ticket_count is None:
+            ticket_count = 0
+        else:
+            findings.record(repo_full_name, pr_number, _fingerprinted(severe), ticketed=True)
+
+    if issues:
+        action_msg = f"Posted {len(issues)} comments & ticketed {ticket_count} findings"
+    elif not ai_complete:
+        action_msg = ""
+    elif followup:
+        # Follow-up push with nothing new: the earlier review still stands
+        action_msg = "No new findings since last review"
+    else:
+        # If no issues, post a "Looks Good" comment
+        msg = "## 🐰 VertexRabbit Review\n\n✅ **LGTM!** No issues found."
+        await gh_client.post_comment(repo_full_name, pr_number, msg, installation_id)
+        action_msg = "Posted LGTM comment"
+
+    if not ai_complete:
+        # Every provider failed for part of the diff: say so instead of claiming LGTM
+        msg = ("## 🐰 VertexRabbit Review\n\n⚠️ **AI review could not be completed.** "
+               "Some changes were not reviewed; push again to retry.")
+        await gh_client.post_comment(repo_full_name, pr_number, msg, installation_id)
+        action_msg = f"{action_msg} (AI review incomplete)" if action_msg else "Posted incomplete-review notice"
+
+    return {"msg": action_msg, "issues": len(issues)}
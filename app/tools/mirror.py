@@ -0,0 +1,190 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: mirrors are only locked within one process
+    fcntl = None
+
+from app.core.config import settings
+
+logger = logging.getLogger("mirror")
+
+
+def _git(*args, cwd: str = None, timeout: int = 600) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True, timeout=timeout)
+    return result.stdout
+
+
+def _open_lock(path: str, exclusive: bool = True, blocking: bool = True):
+    """
+    Opens `path` and takes an flock on it; closing the returned fd releases the lock, as
+    does the process dying. Returns None if non-blocking and another holder conflicts.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl:
+        mode = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(fd, mode)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+    return fd
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    """
+    Local cache of bare repositories, one per GitHub repo.
+    - Each checkout fetches only the requested ref into the existing mirror (incremental).
+    - Files are materialized with `git worktree add`, which is cheap and leaves the mirror untouched.
+    - Mirrors beyond `max_bytes` are evicted least-recently-used first.
+    Credentials are passed per fetch and never written to the mirror's config.
+
+    Worker processes sharing DATA_DIR coordinate through lock files next to each mirror:
+    `<mirror>.lock` (exclusive) serializes fetches, worktree changes and eviction, and every
+    live worktree holds a shared lock on `<mirror>.use`, so a mirror in use by any process
+    is never evicted. The kernel drops both locks if a worker dies.
+    """
+
+    LAST_USED_MARKER = "vertexrabbit-last-used"
+
+    def __init__(self, root: str, max_bytes: int, fetch_depth: int = 1):
+        self.root = root
+        self.mirrors_dir = os.path.join(root, "mirrors")
+        self.worktrees_dir = os.path.join(root, "worktrees")
+        self.max_bytes = max_bytes
+        self.fetch_depth = fetch_depth
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+        self.active = {}  # repo dir -> number of live worktrees
+        self.sizes = {}   # repo dir -> bytes, measured after each fetch
+
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+        os.makedirs(self.worktrees_dir, exist_ok=True)
+
+    def _repo_dir(self, repo_full_name: str) -> str:
+        return os.path.join(self.mirrors_dir, repo_full_name.replace("/", "__") + ".git")
+
+    def _lock(self, repo_dir: str) -> threading.Lock:
+        with self.locks_guard:
+            return self.locks.setdefault(repo_dir, threading.Lock())
+
+    @contextmanager
+    def _locked(self, repo_dir: str):
+        """Exclusive access to one mirror: first among this process's threads, then across processes"""
+        with self._lock(repo_dir):
+            fd = _open_lock(repo_dir + ".lock")
+            try:
+                yield
+            finally:
+                os.close(fd)
+
+    def _fetch(self, repo_dir: str, fetch_url: str, ref: str, local_ref: str):
+        if not os.path.exists(os.path.join(repo_dir, "HEAD")):
+            _git("init", "--bare", "--quiet", repo_dir)
+            logger.info(f"Created mirror {repo_dir}")
+
+        args = ["fetch", "--quiet", "--no-tags", "--force"]
+        if self.fetch_depth:
+            args += ["--depth", str(self.fetch_depth)]
+        _git(*args, fetch_url, f"+{ref}:{local_ref}", cwd=repo_dir)
+
+        # Housekeeping is cheap when there is nothing to do
+        _git("worktree", "prune", cwd=repo_dir)
+        _git("gc", "--auto", "--quiet", cwd=repo_dir)
+
+        with open(os.path.join(repo_dir, self.LAST_USED_MARKER), "w") as f:
+            f.write(str(time.time()))
+        self.sizes[repo_dir] = _dir_size(repo_dir)
+
+    @contextmanager
+    def checkout(self, repo_full_name: str, fetch_url: str, ref: str):
+        """
+        Yields a directory with `ref` (e.g. refs/pull/12/head) checked out.
+        The worktree is removed on exit; the mirror is kept for the next push.
+        """
+        repo_dir = self._repo_dir(repo_full_name)
+        local_ref = "refs/vertexrabbit/" + ref.removeprefix("refs/")
+        worktree = tempfile.mkdtemp(prefix="vertex_sast_", dir=self.worktrees_dir)
+
+        with self._locked(repo_dir):
+            started = time.monotonic()
+            try:
+                self._fetch(repo_dir, fetch_url, ref, local_ref)
+                _git("worktree", "add", "--detach", "--force", worktree, local_ref, cwd=repo_dir)
+            except Exception:
+                shutil.rmtree(worktree, ignore_errors=True)
+                raise
+            # Taken before the mirror lock is released, so no eviction can slip in between
+            in_use = _open_lock(repo_dir + ".use", exclusive=False)
+            self.active[repo_dir] = self.active.get(repo_dir, 0) + 1
+            logger.info(f"Checked out {repo_full_name}@{ref} in {time.monotonic() - started:.1f}s")
+
+        try:
+            yield worktree
+        finally:
+            with self._locked(repo_dir):
+                self.active[repo_dir] -= 1
+                try:
+                    _git("worktree", "remove", "--force", worktree, cwd=repo_dir)
+                except subprocess.CalledProcessError as e:
+                    logger.warning(f"git worktree remove failed: {e.stderr}")
+                shutil.rmtree(worktree, ignore_errors=True)
+                os.close(in_use)
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used mirrors until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.mirrors_dir):
+            repo_dir = os.path.join(self.mirrors_dir, name)
+            if not os.path.isdir(repo_dir):
+                continue  # Lock files
+            if repo_dir not in self.sizes:
+                self.sizes[repo_dir] = _dir_size(repo_dir)
+            marker = os.path.join(repo_dir, self.LAST_USED_MARKER)
+            last_used = os.path.getmtime(marker) if os.path.exists(marker) else 0
+            entries.append((last_used, repo_dir))
+
+        total = sum(self.sizes[d] for _, d in entries)
+        for _, repo_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with self._locked(repo_dir):
+                if self.active.get(repo_dir):
+                    continue
+                # Any process with a live worktree holds a shared lock on the usage file
+                unused = _open_lock(repo_dir + ".use", blocking=False)
+                if unused is None:
+                    continue
+                try:
+                    shutil.rmtree(repo_dir, ignore_errors=True)
+                finally:
+                    os.close(unused)
+                total -= self.sizes.pop(repo_dir, 0)
+                logger.info(f"Evicted mirror {repo_dir}")
+
+
+# Global Mirror Cache Instance
+mirror_cache = MirrorCache(
+    settings.DATA_DIR,
+    max_bytes=settings.MIRROR_MAX_BYTES,
+    fetch_depth=settings.MIRROR_FETCH_DEPTH
+)
@@ -0,0 +1,283 @@
+import os
+import sys
+import time
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import importlib.util
+
+from app.core.config import settings
+from app.core import tracing
+from app.core.metrics import SCANNER_SECONDS
+
+logger = logging.getLogger("scanners")
+
+
+class Scanner:
+    """
+    Base class for SAST/lint adapters. Subclasses describe how to invoke a tool and
+    normalize its output to the issue shape: {path, line, severity, body, rule}, where
+    rule ("<scanner>:<rule id>") lets a finding be recognized across pushes.
+    """
+
+    name = ""
+    executable = ""
+    extensions = ()  # File suffixes the tool understands; empty means every file
+    uses_report_file = False  # Tool writes JSON to a file instead of stdout
+    scans_directory = False  # Tool takes one directory, not files: it gets a copy of just the selected files
+
+    def available(self) -> bool:
+        return shutil.which(self.executable) is not None
+
+    def select(self, files: list) -> list:
+        if not self.extensions:
+            return files
+        return [f for f in files if f.endswith(self.extensions)]
+
+    def command(self, target_dir: str, files: list, report_path: str = None) -> list:
+        raise NotImplementedError
+
+    def parse(self, output: str, target_dir: str) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def relpath(path: str, target_dir: str) -> str:
+        # Tools report absolute or ./-relative paths; GitHub wants repo-relative with forward slashes
+        return os.path.relpath(os.path.join(target_dir, path), target_dir).replace("\\", "/")
+
+
+class BanditScanner(Scanner):
+    name = "bandit"
+    extensions = (".py",)
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("bandit") is not None
+
+    def command(self, target_dir, files, report_path=None):
+        # Use sys.executable to ensure we use the same python environment
+        return [sys.executable, "-m", "bandit", "-f", "json", "-q", *files]
+
+    def parse(self, output, target_dir):
+        # Bandit format: { 'filename': '...', 'line_number': 123, 'issue_text': '...', 'issue_severity': 'HIGH' }
+        return [
+            {
+                "path": self.relpath(item["filename"], target_dir),
+                "line": item["line_number"],
+                "body": f"🛡️ **Security Alert (Bandit)**: {item['issue_text']} ({item['issue_severity']} Severity)",
+                "severity": item["issue_severity"].lower(),
+                "rule": f"bandit:{item['test_id']}"
+            }
+            for item in json.loads(output).get("results", [])
+        ]
+
+
+class SemgrepScanner(Scanner):
+    """Runs only local rules (SEMGREP_CONFIG); never downloads rules from the registry"""
+
+    name = "semgrep"
+    executable = "semgrep"
+
+    SEVERITIES = {"ERROR": "error", "WARNING": "warning", "INFO": "info"}
+
+    def available(self) -> bool:
+        return super().available() and bool(settings.SEMGREP_CONFIG) and os.path.exists(settings.SEMGREP_CONFIG)
+
+    def command(self, target_dir, files, report_path=None):
+        return ["semgrep", "scan", "--json", "--quiet", "--metrics=off",
+                "--config", os.path.abspath(settings.SEMGREP_CONFIG), *files]
+
+    def parse(self, output, target_dir):
+        return [
+            {
+                "path": self.relpath(item["path"], target_dir),
+                "line": item["start"]["line"],
+                "body": f"🛡️ **Security Alert (Semgrep)**: {item['extra'].get('message', '')} (`{item['check_id']}`)",
+                "severity": self.SEVERITIES.get(item["extra"].get("severity", ""), "warning"),
+                "rule": f"semgrep:{item['check_id']}"
+            }
+            for item in json.loads(output).get("results", [])
+        ]
+
+
+class RuffScanner(Scanner):
+    name = "ruff"
+    executable = "ruff"
+    extensions = (".py", ".pyi")
+
+    def command(self, target_dir, files, report_path=None):
+        return ["ruff", "check", "--output-format", "json", "--exit-zero", "--no-cache", *files]
+
+    def parse(self, output, target_dir):
+        return [
+            {
+                "path": self.relpath(item["filename"], target_dir),
+                "line": item["location"]["row"],
+                "body": f"🔍 **Lint (Ruff)**: {item['message']} (`{item['code']}`)",
+                "severity": "warning",
+                "rule": f"ruff:{item['code']}"
+            }
+            for item in json.loads(output)
+        ]
+
+
+class ESLintScanner(Scanner):
+    name = "eslint"
+    executable = "eslint"
+    extensions = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+
+    def command(self, target_dir, files, report_path=None):
+        return ["eslint", "--format", "json", "--no-error-on-unmatched-pattern", *files]
+
+    def parse(self, output, target_dir):
+        issues = []
+        for file in json.loads(output):
+            for message in file.get("messages", []):
+                if not message.get("line"):
+                    continue
+                rule = f" (`{message['ruleId']}`)" if message.get("ruleId") else ""
+                issues.append({
+                    "path": self.relpath(file["filePath"], target_dir),
+                    "line": message["line"],
+                    "body": f"🔍 **Lint (ESLint)**: {message['message']}{rule}",
+                    "severity": "warning" if message.get("severity") == 2 else "info",
+                    "rule": f"eslint:{message['ruleId']}" if message.get("ruleId") else None
+                })
+        return issues
+
+
+class GitleaksScanner(Scanner):
+    """Scans the changed files of the checkout (not git history)"""
+
+    name = "gitleaks"
+    executable = "gitleaks"
+    uses_report_file = True
+    scans_directory = True
+
+    def command(self, target_dir, files, report_path=None):
+        return ["gitleaks", "detect", "--no-git", "--no-banner", "--exit-code", "0",
+                "--source", target_dir, "--report-format", "json", "--report-path", report_path]
+
+    def parse(self, output, target_dir):
+        return [
+            {
+                "path": self.relpath(item["File"], target_dir),
+                "line": item["StartLine"],
+                "body": f"🛡️ **Secret Detected (Gitleaks)**: {item.get('Description', item['RuleID'])}",
+                "severity": "critical",
+                "rule": f"gitleaks:{item['RuleID']}"
+            }
+            for item in json.loads(output or "[]")
+        ]
+
+
+SCANNERS = {
+    scanner.name: scanner
+    for scanner in (BanditScanner(), SemgrepScanner(), RuffScanner(), ESLintScanner(), GitleaksScanner())
+}
+
+# Caps concurrently running scanner processes across all reviews in this process
+cpu_slots = asyncio.Semaphore(settings.SAST_CPU_SLOTS)
+
+
+def _stage_files(target_dir: str, files: list) -> str:
+    """Hard-links (or copies) files into a new directory with the same repo-relative layout"""
+    staging = tempfile.mkdtemp(prefix="vertex_scan_", dir=os.path.dirname(os.path.abspath(target_dir)))
+    for path in files:
+        dest = os.path.join(staging, path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.link(os.path.join(target_dir, path), dest)
+        except OSError:
+            shutil.copy2(os.path.join(target_dir, path), dest)
+    return staging
+
+
+class ScannerEngine:
+    """Runs every enabled, installed scanner concurrently as asyncio subprocesses"""
+
+    def __init__(self, names: list = None, timeout: int = None):
+        names = names if names is not None else settings.SAST_SCANNER_LIST
+        self.scanners = [SCANNERS[n] for n in names if n in SCANNERS]
+        self.timeout = timeout or settings.SAST_TIMEOUT
+
+    async def run(self, target_dir: str, changed_lines: dict) -> list:
+        """
+        changed_lines: {path: set(line numbers)}; only those files are scanned and only
+        findings on those lines are returned.
+        """
+        files = [p for p in sorted(changed_lines) if os.path.isfile(os.path.join(target_dir, p))]
+        jobs = []
+        for scanner in self.scanners:
+            selected = scanner.select(files)
+            if not selected:
+                continue
+            if not scanner.available():
+                logger.debug(f"{scanner.name} is not installed, skipping")
+                continue
+            jobs.append(self._run_one(scanner, target_dir, selected))
+
+        results = await asyncio.gather(*jobs)
+        issues = [
+            issue for result in results for issue in result
+            if issue["line"] in changed_lines.get(issue["path"], ())
+        ]
+        logger.info(f"SAST found {len(issues)} issues on changed lines ({len(jobs)} scanners)")
+        return issues
+
+    async def _run_one(self, scanner: Scanner, target_dir: str, files: list) -> list:
+        report_path = None
+        if scanner.uses_report_file:
+            fd, report_path = tempfile.mkstemp(prefix=f"vertex_{scanner.name}_", suffix=".json")
+            os.close(fd)
+
+        scan_dir = target_dir
+        try:
+            if scanner.scans_directory:
+                scan_dir = _stage_files(target_dir, files)
+            async with cpu_slots:
+                logger.info(f"Running {scanner.name} on {len(files)} files")
+                started = time.monotonic()
+                with tracing.span(f"scanner.{scanner.name}", files=len(files)):
+                    process = await asyncio.create_subprocess_exec(
+                        *scanner.command(scan_dir, files, report_path),
+                        cwd=scan_dir,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                    try:
+                        stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+                    except asyncio.TimeoutError:
+                        process.kill()
+                        await process.wait()
+                        logger.error(f"{scanner.name} timed out after {self.timeout}s")
+                        return []
+                    finally:
+                        SCANNER_SECONDS.observe(time.monotonic() - started, scanner=scanner.name)
+
+            if report_path:
+                with open(report_path) as f:
+                    output = f.read()
+            else:
+                output = stdout.decode(errors="replace")
+
+            if not output.strip():
+                logger.warning(f"{scanner.name} produced no output: {stderr.decode(errors='replace')[:500]}")
+                return []
+
+            issues = scanner.parse(output, scan_dir)
+            logger.info(f"{scanner.name} found {len(issues)} issues")
+            return issues
+
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse {scanner.name} JSON output")
+            return []
+        except Exception as e:
+            logger.error(f"{scanner.name} scan failed: {e}")
+            return []
+        finally:
+            if report_path and os.path.exists(report_path):
+                os.remove(report_path)
+            if scan_dir != target_dir:
+                shutil.rmtree(scan_dir, ignore_errors=True)
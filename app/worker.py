@@ -0,0 +1,44 @@
+"""
+Review worker process: pulls jobs from the shared job store and runs them.
+
+    python -m app worker --concurrency 4
+
+Run as many as the host can take, next to web processes started with JOB_RUN_IN_WEB=false.
+All of them share one local DATA_DIR: SQLite WAL does not work over network filesystems,
+so workers on other hosts cannot share the job store.
+"""
+import signal
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.jobs import job_queue
+from app.core import deps
+
+logger = logging.getLogger("worker")
+
+
+async def run(grace: float):
+    from app.pipeline.review import run_review
+
+    if settings.JOB_STORE == "memory":
+        logger.warning("JOB_STORE=memory: this worker only sees jobs it queues itself")
+
+    job_queue.register("review", run_review)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await job_queue.start()
+    await stop.wait()
+    logger.info(f"Stopping; running jobs get {grace:.0f}s to finish before they are handed back")
+    await job_queue.stop(grace)
+    await deps.close()
+
+
+def main(args):
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.concurrency:
+        job_queue.workers = args.concurrency
+    asyncio.run(run(args.grace))
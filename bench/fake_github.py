@@ -0,0 +1,103 @@
+"""
+GitHub REST stand-in for benchmarks.
+
+Serves PR and compare diffs from a fixtures directory (`<owner>__<repo>.diff`) and
+accepts every write the review pipeline makes (reviews, comments, issues), after an
+optional per-call latency.
+
+    python -m bench.fake_github --port 8902 --fixtures /tmp/bench/fixtures --latency 0.05
+"""
+import os
+import asyncio
+import argparse
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+app = FastAPI()
+app.state.fixtures = "."
+app.state.latency = 0.0
+app.state.calls = Counter()
+app.state.next_issue = 1
+
+
+@app.middleware("http")
+async def count_and_delay(request: Request, call_next):
+    if not request.url.path.startswith("/_"):
+        app.state.calls[request.method] += 1
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency)
+    return await call_next(request)
+
+
+def _diff(owner: str, repo: str):
+    path = os.path.join(app.state.fixtures, f"{owner}__{repo}.diff")
+    if not os.path.exists(path):
+        return PlainTextResponse("Not Found", status_code=404)
+    with open(path, encoding="utf-8") as f:
+        return PlainTextResponse(f.read(), media_type="text/plain")
+
+
+@app.get("/repos/{owner}/{repo}/pulls/{number}")
+def pull_diff(owner: str, repo: str, number: int):
+    return _diff(owner, repo)
+
+
+@app.get("/repos/{owner}/{repo}/compare/{spec}")
+def compare_diff(owner: str, repo: str, spec: str):
+    return _diff(owner, repo)
+
+
+@app.get("/repos/{owner}/{repo}/pulls/{number}/comments")
+def review_comments(owner: str, repo: str, number: int):
+    return []
+
+
+@app.post("/repos/{owner}/{repo}/pulls/{number}/reviews")
+def create_review(owner: str, repo: str, number: int):
+    return {"id": 1}
+
+
+@app.post("/repos/{owner}/{repo}/issues/{number}/comments")
+def create_comment(owner: str, repo: str, number: int):
+    return JSONResponse({"id": 1}, status_code=201)
+
+
+@app.get("/repos/{owner}/{repo}/issues")
+def list_issues(owner: str, repo: str):
+    return []
+
+
+@app.post("/repos/{owner}/{repo}/issues")
+def create_issue(owner: str, repo: str):
+    number = app.state.next_issue
+    app.state.next_issue += 1
+    return JSONResponse({"number": number}, status_code=201)
+
+
+@app.patch("/repos/{owner}/{repo}/issues/{number}")
+def update_issue(owner: str, repo: str, number: int):
+    return {"number": number}
+
+
+@app.get("/_stats")
+def stats():
+    return dict(app.state.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8902)
+    parser.add_argument("--fixtures", required=True, help="Directory of <owner>__<repo>.diff files")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API call")
+    args = parser.parse_args()
+
+    app.state.fixtures = args.fixtures
+    app.state.latency = args.latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
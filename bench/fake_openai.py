@@ -0,0 +1,94 @@
+"""
+OpenAI-compatible streaming stand-in for benchmarks.
+
+Answers every chat completion with one finding per file in the reviewed diff, streamed
+as SSE after a configurable time-to-first-token and at a configurable tokens/second.
+
+    python -m bench.fake_openai --port 8901 --ttft 0.5 --tps 80
+"""
+import re
+import json
+import time
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# Matches both the raw diff and the JSON-escaped one the reviewer used to send
+FILE_HEADER = re.compile(r"\+\+\+ b/(.+?)(?:\\n|\n)")
+HUNK_HEADER = re.compile(r"@@ -\d+(?:,\d+)? \+(\d+)")
+
+app = FastAPI()
+app.state.ttft = 0.5
+app.state.tps = 80.0
+app.state.requests = 0
+
+
+def _findings(prompt: str) -> list:
+    issues = []
+    for match in FILE_HEADER.finditer(prompt):
+        hunk = HUNK_HEADER.search(prompt, match.end())
+        if hunk:
+            issues.append({
+                "path": match.group(1),
+                "line": int(hunk.group(1)),
+                "severity": "warning",
+                "body": f"Benchmark finding in {match.group(1)}",
+            })
+    return issues
+
+
+def _chunk(model: str, content: str = None, finish: str = None) -> str:
+    delta = {"content": content} if content is not None else {}
+    return "data: " + json.dumps({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }) + "\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user")
+    answer = json.dumps(_findings(prompt), indent=1)
+    model = body.get("model", "bench")
+
+    async def stream():
+        await asyncio.sleep(app.state.ttft)
+        # ~4 characters per token, like the reviewer's estimate
+        pieces = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+        for piece in pieces:
+            yield _chunk(model, piece)
+            if app.state.tps:
+                await asyncio.sleep(1 / app.state.tps)
+        yield _chunk(model, finish="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/_stats")
+def stats():
+    return {"requests": app.state.requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--ttft", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--tps", type=float, default=80, help="Streamed tokens per second (0 = no delay)")
+    args = parser.parse_args()
+
+    app.state.ttft = args.ttft
+    app.state.tps = args.tps
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
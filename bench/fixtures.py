@@ -0,0 +1,100 @@
+"""
+Synthetic benchmark fixtures: local bare repos with pull refs, their PR diffs and the
+matching `pull_request` webhook payloads.
+"""
+import os
+import json
+import subprocess
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@localhost",
+    "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@localhost",
+}
+
+
+def _git(*args, cwd: str, stdin: str = None) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, input=stdin, capture_output=True, text=True, check=True,
+        env={**os.environ, **GIT_ENV}
+    ).stdout
+
+
+def _module(index: int, functions: int, changed: bool) -> str:
+    lines = ["import os", "import subprocess", ""]
+    for n in range(functions):
+        lines += [f"def handler_{index}_{n}(data, path):", f"    value = len(data) + {n}"]
+        if changed and n % 3 == 0:
+            # Typical review bait: the added lines every scanner and the LLM should see
+            lines += ["    result = eval(data)", "    subprocess.call(path, shell=True)"]
+        lines += ["    return os.path.join(path, str(value))", ""]
+    return "\n".join(lines)
+
+
+def make_repo(root: str, full_name: str, files: int = 5, functions: int = 12, pulls: int = 1) -> dict:
+    """
+    Creates `<root>/repos/<full_name>.git` with refs/pull/1..pulls/head all pointing at one
+    PR commit, writes `<root>/fixtures/<owner>__<repo>.diff` and returns {"head_sha", "diff"}.
+    """
+    work = os.path.join(root, "work", full_name)
+    os.makedirs(os.path.join(work, "src"), exist_ok=True)
+    _git("init", "-q", "-b", "main", cwd=work)
+
+    for i in range(files):
+        with open(os.path.join(work, "src", f"mod_{i}.py"), "w") as f:
+            f.write(_module(i, functions, changed=False))
+    _git("add", "-A", cwd=work)
+    _git("commit", "-q", "-m", "base", cwd=work)
+
+    _git("checkout", "-q", "-b", "pr", cwd=work)
+    for i in range(0, files, 2):
+        with open(os.path.join(work, "src", f"mod_{i}.py"), "w") as f:
+            f.write(_module(i, functions, changed=True))
+    _git("commit", "-q", "-am", "pr changes", cwd=work)
+    head_sha = _git("rev-parse", "HEAD", cwd=work).strip()
+    diff = _git("diff", "main", "pr", cwd=work)
+
+    bare = os.path.join(root, "repos", f"{full_name}.git")
+    os.makedirs(os.path.dirname(bare), exist_ok=True)
+    _git("clone", "-q", "--bare", work, bare, cwd=root)
+    _git("update-ref", "--stdin", cwd=bare,
+         stdin="".join(f"create refs/pull/{n}/head {head_sha}\n" for n in range(1, pulls + 1)))
+
+    fixtures = os.path.join(root, "fixtures")
+    os.makedirs(fixtures, exist_ok=True)
+    with open(os.path.join(fixtures, full_name.replace("/", "__") + ".diff"), "w") as f:
+        f.write(diff)
+    return {"head_sha": head_sha, "diff": diff}
+
+
+def payload(full_name: str, pr_number: int, head_sha: str, action: str = "opened") -> dict:
+    return {
+        "action": action,
+        "pull_request": {"number": pr_number, "head": {"ref": "pr", "sha": head_sha}, "base": {"ref": "main"}},
+        "repository": {"full_name": full_name},
+        "installation": None,
+    }
+
+
+def make_fixtures(root: str, repos: int, reviews: int, files: int = 5, functions: int = 12) -> list:
+    """Builds `repos` repositories and returns `reviews` webhook payloads spread across them"""
+    pulls = -(-reviews // repos)  # Every review gets its own PR so none coalesce
+    heads = {}
+    for r in range(repos):
+        name = f"bench/repo{r}"
+        heads[name] = make_repo(root, name, files, functions, pulls)["head_sha"]
+
+    names = sorted(heads)
+    return [
+        payload(names[i % repos], i // repos + 1, heads[names[i % repos]])
+        for i in range(reviews)
+    ]
+
+
+def load_payloads(directory: str) -> list:
+    """Recorded `pull_request` webhook payloads (*.json) from a directory"""
+    payloads = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                payloads.append(json.load(f))
+    return payloads
@@ -0,0 +1,212 @@
+"""
+Offline replay benchmark for the review pipeline.
+
+Replays `pull_request` webhooks through the real app (webhook -> job queue -> diff ->
+LLM review -> checkout + SAST -> GitHub writes) against local stand-ins: a fake
+OpenAI-compatible streaming server, a fake GitHub REST server and local git repos.
+Reports p50/p95/p99 latency, reviews per minute and peak RSS.
+
+    python -m bench.run --reviews 40 --concurrency 4 --ttft 0.5 --tps 80
+    python -m bench.run --payloads recorded/ --max-p95 20   # exit 1 if p95 > 20s
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get_json(url: str):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _start(module: str, port: int, *args) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, "-m", module, "--port", str(port), *args], cwd=ROOT)
+    for _ in range(100):
+        try:
+            _get_json(f"http://127.0.0.1:{port}/_stats")
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{module} did not start on port {port}")
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = q * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _configure(args, workdir: str, fixtures: str, llm_port: int, github_port: int):
+    """App settings are read at import time, so this must run before importing `app`"""
+    os.environ.update({
+        "AI_PROVIDER": "a4f",
+        "A4F_API_KEY": "bench",
+        "A4F_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "A4F_RPM": "0",
+        "AI_FALLBACK_PROVIDERS": "a4f",
+        "GITHUB_API_URL": f"http://127.0.0.1:{github_port}",
+        "GITHUB_GIT_URL": "file://" + os.path.join(workdir, "repos"),
+        "GITHUB_APP_ID": "",
+        "GITHUB_WRITE_INTERVAL": "0",
+        "GITHUB_WRITES_PER_MINUTE": "0",
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "JOB_STORE": "memory",
+        "JOB_WORKERS": str(args.concurrency),
+        "JOB_MAX_PENDING": str(args.reviews + 10),
+        "REVIEW_QUIET_WINDOW": "0",
+        "REVIEW_CACHE_ENABLED": "true" if args.cache else "false",
+        "LIMITER_BACKEND": "memory",
+        "SAST_SCANNERS": args.scanners,
+    })
+
+
+async def _replay(payloads: list) -> list:
+    import httpx
+    from app.main import app
+    from app.core.jobs import job_queue, JobStatus
+    from app.pipeline.review import run_review
+    from app.github.client import close_http_client
+
+    job_queue.register("review", run_review)
+    await job_queue.start()
+
+    job_ids = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for body in payloads:
+            response = await client.post(
+                "/api/v1/webhook", json=body, headers={"X-GitHub-Event": "pull_request"}
+            )
+            if response.status_code != 202:
+                raise RuntimeError(f"Webhook returned {response.status_code}: {response.text}")
+            job_ids.append(response.json()["job_id"])
+
+    finished = (JobStatus.DONE, JobStatus.FAILED, JobStatus.SUPERSEDED)
+    while not all(job_queue.get(j).status in finished for j in job_ids):
+        await asyncio.sleep(0.05)
+
+    await job_queue.stop()
+    await close_http_client()
+    return [job_queue.get(j) for j in job_ids]
+
+
+def _report(jobs: list, wall: float, llm_stats: dict, github_stats: dict) -> dict:
+    done = [j for j in jobs if j.status == "done"]
+    latencies = [j.updated_at - j.created_at for j in done]
+
+    stages = {}
+    for job in done:
+        for name, timing in job.result.get("timings", {}).items():
+            stages.setdefault(name, []).append(timing["duration"])
+
+    return {
+        "reviews": len(jobs),
+        "succeeded": len(done),
+        "failed": [{"id": j.id, "error": j.error} for j in jobs if j.status != "done"],
+        "wall_seconds": round(wall, 3),
+        "reviews_per_minute": round(len(done) / wall * 60, 2) if wall else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+        },
+        "stage_p50_seconds": {name: round(percentile(v, 0.5), 3) for name, v in stages.items()},
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "llm_requests": llm_stats.get("requests", 0),
+        "github_calls": github_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=20, help="Synthetic reviews to replay")
+    parser.add_argument("--repos", type=int, default=2, help="Synthetic repositories")
+    parser.add_argument("--files", type=int, default=5, help="Python files per synthetic repository")
+    parser.add_argument("--concurrency", type=int, default=4, help="Job workers")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tps", type=float, default=80, help="Fake LLM tokens per second")
+    parser.add_argument("--github-latency", type=float, default=0.05, help="Fake GitHub latency per call (s)")
+    parser.add_argument("--scanners", default="bandit,ruff", help="SAST_SCANNERS for the run")
+    parser.add_argument("--cache", action="store_true", help="Enable the per-hunk review cache")
+    parser.add_argument("--payloads", help="Replay recorded payloads (*.json) and <owner>__<repo>.diff "
+                                           "files from this directory instead of synthetic ones")
+    parser.add_argument("--workdir", help="Keep fixtures and data here instead of a temp directory")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    parser.add_argument("--max-p95", type=float, help="Exit with status 1 if p95 latency exceeds this")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="vertexrabbit_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    sys.path.insert(0, ROOT)
+    from bench.fixtures import make_fixtures, load_payloads
+
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+        fixtures = args.payloads
+        # Recorded repos, if any, live next to the payloads as <owner>/<repo>.git
+        os.symlink(os.path.abspath(args.payloads), os.path.join(workdir, "repos"))
+    else:
+        payloads = make_fixtures(workdir, args.repos, args.reviews, files=args.files)
+        fixtures = os.path.join(workdir, "fixtures")
+    args.reviews = len(payloads)
+
+    llm_port, github_port = _free_port(), _free_port()
+    servers = [
+        _start("bench.fake_openai", llm_port, "--ttft", str(args.ttft), "--tps", str(args.tps)),
+        _start("bench.fake_github", github_port, "--fixtures", fixtures,
+               "--latency", str(args.github_latency)),
+    ]
+    try:
+        _configure(args, workdir, fixtures, llm_port, github_port)
+        started = time.monotonic()
+        jobs = asyncio.run(_replay(payloads))
+        wall = time.monotonic() - started
+        report = _report(
+            jobs, wall,
+            _get_json(f"http://127.0.0.1:{llm_port}/_stats"),
+            _get_json(f"http://127.0.0.1:{github_port}/_stats"),
+        )
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_p95 is not None and report["latency_seconds"]["p95"] > args.max_p95:
+        print(f"p95 latency {report['latency_seconds']['p95']}s exceeds {args.max_p95}s", file=sys.stderr)
+        sys.exit(1)
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
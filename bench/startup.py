@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark and import-time budget.
+
+Measures, in fresh interpreters, how long `import app.main` takes and how long a web
+process takes to answer /health, and checks that heavy SDKs stay off the import path.
+Exits with status 1 when a budget is exceeded, so CI can catch startup regressions.
+The default budgets (800ms import, 2500ms to /health) leave headroom over a typical
+laptop (~470ms / ~600ms) for slower CI machines; 0 turns a budget off.
+
+    python -m bench.startup --runs 5
+    python -m bench.startup --max-import-ms 600 --max-ready-ms 0
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+import urllib.request
+
+from bench.run import ROOT, _free_port, percentile
+
+# Only processes that run jobs may load these (see app/core/deps.py)
+LAZY_MODULES = ("openai", "github", "httpx")
+
+IMPORT_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _env(workdir: str, run_jobs: bool) -> dict:
+    return {
+        **os.environ,
+        "A4F_API_KEY": os.environ.get("A4F_API_KEY", "bench"),
+        "DATA_DIR": workdir,
+        "JOB_RUN_IN_WEB": "true" if run_jobs else "false",
+    }
+
+
+def measure_import(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % (LAZY_MODULES,)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_ready(env: dict, timeout: float = 30) -> float:
+    """Seconds from spawning uvicorn until /health answers"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer /health within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--run-jobs", action="store_true", help="Measure with JOB_RUN_IN_WEB=true")
+    parser.add_argument("--max-import-ms", type=float, default=800,
+                        help="Exit 1 if median `import app.main` exceeds this (0: no limit)")
+    parser.add_argument("--max-ready-ms", type=float, default=2500,
+                        help="Exit 1 if median time to /health exceeds this (0: no limit)")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vertexrabbit_startup_")
+    try:
+        env = _env(workdir, args.run_jobs)
+        # One warm-up import so every measured run sees compiled bytecode
+        measure_import(env)
+        imports = [measure_import(env) for _ in range(args.runs)]
+        ready = [measure_ready(env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import_ms = [i["seconds"] * 1000 for i in imports]
+    ready_ms = [r * 1000 for r in ready]
+    loaded = sorted({m for i in imports for m in i["loaded"]})
+    report = {
+        "runs": args.runs,
+        "run_jobs": args.run_jobs,
+        "import_ms": {"p50": round(statistics.median(import_ms), 1), "max": round(max(import_ms), 1)},
+        "ready_ms": {"p50": round(statistics.median(ready_ms), 1), "p95": round(percentile(ready_ms, 0.95), 1)},
+        "eagerly_loaded": loaded,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if loaded:
+        failures.append(f"`import app.main` loads {', '.join(loaded)}; these must stay lazy")
+    if args.max_import_ms and report["import_ms"]["p50"] > args.max_import_ms:
+        failures.append(f"import p50 {report['import_ms']['p50']}ms exceeds {args.max_import_ms}ms")
+    if args.max_ready_ms and report["ready_ms"]["p50"] > args.max_ready_ms:
+        failures.append(f"ready p50 {report['ready_ms']['p50']}ms exceeds {args.max_ready_ms}ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
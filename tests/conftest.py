@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Module-level stores open their SQLite files under DATA_DIR on import; keep them out of the repo
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="vertexrabbit_tests_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,37 @@
+import subprocess
+
+from app.ai.context import SymbolIndex, SymbolStore
+
+
+def _worktree(path, source: str) -> str:
+    path.mkdir()
+    (path / "mod.py").write_text(source)
+    subprocess.run(["git", "init", "-q"], cwd=path, check=True)
+    subprocess.run(["git", "add", "mod.py"], cwd=path, check=True)
+    return str(path)
+
+
+def test_snapshot_is_not_changed_by_a_later_update(tmp_path):
+    store = SymbolStore(str(tmp_path / "symbols.db"))
+    index = SymbolIndex()
+    first = _worktree(tmp_path / "a", "def helper():\n    return 1\n")
+    second = _worktree(tmp_path / "b", "\n\n\ndef helper():\n    return 2\n\ndef other():\n    pass\n")
+
+    snapshot, parsed = index.update(first, store)
+    assert parsed == 1
+    assert snapshot.lookup("helper") == [("mod.py", "function", 1, 2)]
+
+    newer, _ = index.update(second, store)
+    assert newer.lookup("helper") == [("mod.py", "function", 4, 5)]
+    # A review still rendering from the first worktree keeps that worktree's line ranges
+    assert snapshot.lookup("helper") == [("mod.py", "function", 1, 2)]
+    assert snapshot.lookup("other") == []
+
+
+def test_unchanged_worktree_reuses_the_snapshot(tmp_path):
+    store = SymbolStore(str(tmp_path / "symbols.db"))
+    index = SymbolIndex()
+    root = _worktree(tmp_path / "a", "class Thing:\n    pass\n")
+    snapshot, _ = index.update(root, store)
+    again, parsed = index.update(root, store)
+    assert again is snapshot and parsed == 0
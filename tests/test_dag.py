@@ -0,0 +1,103 @@
+import time
+import asyncio
+
+import pytest
+
+from app.pipeline.dag import StageGraph
+
+
+def _run(graph: StageGraph):
+    return asyncio.run(graph.run())
+
+
+def test_deadline_stage_yields_default_without_cancelling_its_dependency():
+    graph = StageGraph()
+
+    async def checkout(_):
+        await asyncio.sleep(0.3)
+        return "worktree"
+
+    async def context(inputs):
+        return f"context of {inputs['checkout']}"
+
+    async def review(inputs):
+        return inputs["context"], time.monotonic()
+
+    async def scan(inputs):
+        return f"scanned {inputs['checkout']}"
+
+    graph.add("checkout", checkout, optional=True)
+    graph.add("context", context, deps=("checkout",), optional=True, deadline=0.05)
+    graph.add("review", review, deps=("context",))
+    graph.add("scan", scan, deps=("checkout",))
+
+    started = time.monotonic()
+    results, timings = _run(graph)
+    context_result, reviewed_at = results["review"]
+    assert context_result is None
+    assert reviewed_at - started < 0.25
+    assert results["scan"] == "scanned worktree"
+    assert timings["context"]["status"] == "timeout"
+
+
+def test_running_stage_past_its_deadline_yields_default():
+    graph = StageGraph()
+
+    async def slow(_):
+        await asyncio.sleep(1)
+        return "late"
+
+    graph.add("context", slow, optional=True, default="none", deadline=0.05)
+    results, timings = _run(graph)
+    assert results["context"] == "none"
+    assert timings["context"]["status"] == "timeout"
+
+
+def test_deadline_requires_optional_stage():
+    graph = StageGraph()
+
+    async def stage(_):
+        return None
+
+    with pytest.raises(ValueError):
+        graph.add("context", stage, deadline=1)
+
+
+def _review_graph(checkout_seconds: float, deadline: float) -> StageGraph:
+    graph = StageGraph()
+
+    async def diff(_):
+        await asyncio.sleep(0.2)
+        return "diff"
+
+    async def checkout(_):
+        await asyncio.sleep(checkout_seconds)
+        return "worktree"
+
+    async def context(inputs):
+        return f"context of {inputs['checkout']}"
+
+    async def review(inputs):
+        return inputs["context"], time.monotonic()
+
+    graph.add("diff", diff)
+    graph.add("checkout", checkout, optional=True)
+    graph.add("context", context, deps=("checkout",), optional=True, deadline=deadline, deadline_after=("diff",))
+    graph.add("review", review, deps=("diff", "context"))
+    return graph
+
+
+def test_deadline_counts_from_the_stages_it_follows():
+    # The checkout outlasts the deadline counted from graph start, but not from the diff being ready
+    results, timings = _run(_review_graph(checkout_seconds=0.3, deadline=0.2))
+    assert results["review"][0] == "context of worktree"
+    assert timings["context"]["status"] == "ok"
+
+
+def test_deadline_still_applies_after_the_stages_it_follows():
+    started = time.monotonic()
+    results, timings = _run(_review_graph(checkout_seconds=1, deadline=0.1))
+    context, reviewed_at = results["review"]
+    assert context is None
+    assert timings["context"]["status"] == "timeout"
+    assert reviewed_at - started < 0.6
@@ -0,0 +1,84 @@
+from app.diff.parser import FileDiff, Hunk, parse_diff
+from app.diff.index import DiffIndex
+
+DIFF = """\
+diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -10,3 +10,4 @@ def main():
+ a
++b
+ c
+ d
+@@ -14,2 +15,2 @@
+ e
+-f
++g
+@@ -40,2 +41,3 @@
+ x
++y
+ z
+diff --git a/gone.py b/gone.py
+deleted file mode 100644
+--- a/gone.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-one
+-two
+"""
+
+
+def _index() -> DiffIndex:
+    return DiffIndex(parse_diff(DIFF))
+
+
+def test_hunks_become_sorted_intervals_of_new_lines():
+    index = _index()
+    starts, ends = index.intervals["app.py"]
+    assert list(zip(starts, ends)) == [(10, 13), (15, 16), (41, 43)]
+    assert "gone.py" not in index.intervals
+
+
+def test_touching_and_overlapping_hunks_merge():
+    file = FileDiff(path="a.py", hunks=[Hunk(1, 1, 20, 5), Hunk(1, 1, 1, 3), Hunk(1, 1, 4, 2), Hunk(1, 1, 22, 1)])
+    assert DiffIndex([file]).intervals["a.py"] == ([1, 20], [5, 24])
+
+
+def test_commentable_only_inside_hunks():
+    index = _index()
+    assert index.commentable("app.py", 10)
+    assert index.commentable("app.py", 16)
+    assert index.commentable("app.py", 43)
+    assert not index.commentable("app.py", 14)
+    assert not index.commentable("app.py", 9)
+    assert not index.commentable("app.py", 44)
+    assert not index.commentable("gone.py", 1)
+    assert not index.commentable("other.py", 10)
+    assert not index.commentable("app.py", None)
+
+
+def test_snap_picks_the_nearest_edge_within_range():
+    index = _index()
+    assert index.snap("app.py", 12) == 12
+    assert index.snap("app.py", 7) == 10
+    assert index.snap("app.py", 6) is None
+    assert index.snap("app.py", 19) == 16
+    assert index.snap("app.py", 38) == 41
+    assert index.snap("app.py", 28) is None
+    assert index.snap("app.py", 47, max_distance=4) == 43
+    assert index.snap("app.py", "12") is None
+
+
+def test_partition_snaps_inline_issues_and_leaves_the_input_alone():
+    index = _index()
+    issues = [
+        {"path": "app.py", "line": 11, "body": "inside"},
+        {"path": "app.py", "line": 18, "body": "near"},
+        {"path": "app.py", "line": 28, "body": "far"},
+        {"path": "README.md", "line": 1, "body": "not in the diff"},
+        {"path": "app.py", "body": "no line"},
+    ]
+    inline, summary = index.partition(issues)
+    assert [(i["body"], i["line"]) for i in inline] == [("inside", 11), ("near", 16)]
+    assert [i["body"] for i in summary] == ["far", "not in the diff", "no line"]
+    assert issues[1]["line"] == 18
@@ -0,0 +1,66 @@
+import pytest
+
+from app.diff.filters import DiffFilter, GitAttributes, glob_to_regex
+
+
+@pytest.mark.parametrize("pattern, path, matches", [
+    # No slash: the name matches at any depth, and so does everything below it
+    ("*.lock", "poetry.lock", True),
+    ("*.lock", "web/yarn.lock", True),
+    ("*.lock", "lockfile", False),
+    ("node_modules", "a/node_modules/x/index.js", True),
+    # `*` and `?` stay within one segment
+    ("src/*.py", "src/app.py", True),
+    ("src/*.py", "src/pkg/app.py", False),
+    ("file?.txt", "file1.txt", True),
+    ("file?.txt", "file/.txt", False),
+    # A slash anchors the pattern at the root
+    ("docs/*.md", "docs/index.md", True),
+    ("docs/*.md", "site/docs/index.md", False),
+    ("/build", "build/out.js", True),
+    ("/build", "src/build", False),
+    # `**` spans segments
+    ("**/migrations/*.sql", "migrations/001.sql", True),
+    ("**/migrations/*.sql", "db/app/migrations/001.sql", True),
+    ("docs/**", "docs/a/b/c.md", True),
+    ("a/**/b", "a/b", True),
+    ("a/**/b", "a/x/y/b", True),
+    # A trailing slash only matches below a directory
+    ("vendor/", "vendor/lib/x.go", True),
+    ("vendor/", "pkg/vendor/x.go", True),
+    ("vendor/", "vendor", False),
+    # Regex metacharacters are literal
+    ("a+b.txt", "a+b.txt", True),
+    ("a+b.txt", "aab.txt", False),
+])
+def test_glob_to_regex(pattern, path, matches):
+    assert bool(glob_to_regex(pattern).match(path)) is matches
+
+
+def test_later_gitattributes_rules_win():
+    attributes = GitAttributes(
+        "# generated code\n"
+        "gen/** linguist-generated\n"
+        "gen/keep.py -linguist-generated\n"
+        "third_party/** linguist-vendored=true text eol=lf\n"
+    )
+    assert attributes.matches("gen/api.py") == "linguist-generated"
+    assert attributes.matches("gen/keep.py") is None
+    assert attributes.matches("third_party/lib.c") == "linguist-vendored"
+    assert attributes.matches("src/main.py") is None
+
+
+def test_diff_filter_gives_the_reason():
+    diff_filter = DiffFilter(["*.min.js"], GitAttributes("api/*_pb2.py linguist-generated"))
+    assert diff_filter("static/./app.min.js") == "excluded by *.min.js"
+    assert diff_filter("api/user_pb2.py") == ".gitattributes linguist-generated"
+    assert diff_filter("api/user.py") is None
+
+
+def test_default_excludes_skip_root_build_dirs_but_not_nested_source():
+    diff_filter = DiffFilter(attributes=GitAttributes())
+    assert diff_filter("dist/app.js") == "excluded by /dist/"
+    assert diff_filter("vendor/lib/x.go") == "excluded by /vendor/"
+    assert diff_filter("web/node_modules/react/index.js") == "excluded by node_modules/"
+    for path in ("src/build/steps.py", "pkg/dist/release.go", "app/vendor/client.py", "lib/third_party/shim.c"):
+        assert diff_filter(path) is None
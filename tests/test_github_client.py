@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.github import client as github_client
+from app.github.client import GitHubClient
+
+
+async def _body(text: str):
+    yield text.encode()
+
+
+def _response(status: int, text: str = "", headers: dict = None) -> httpx.Response:
+    # An async body stays unread until someone reads it, as with a real streamed response
+    return httpx.Response(status, headers=headers, content=_body(text))
+
+
+def _stream_diff(responses: list):
+    """Streams the PR diff against a fake API answering with `responses` (factories) in order"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]()
+
+    async def run():
+        github_client._http_client = httpx.AsyncClient(
+            base_url="https://api.github.test", transport=httpx.MockTransport(handler)
+        )
+        try:
+            return [line async for line in GitHubClient().stream_pr_diff("o/r", 1)]
+        finally:
+            await github_client.close_http_client()
+
+    return asyncio.run(run()), calls
+
+
+def test_streamed_403_raises_a_status_error():
+    with pytest.raises(httpx.HTTPStatusError) as e:
+        _stream_diff([lambda: _response(403, '{"message": "Resource not accessible by integration"}')])
+    assert e.value.response.status_code == 403
+    assert "not accessible" in e.value.response.text
+
+
+def test_streamed_rate_limits_are_retried(monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds, *args):
+        delays.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(github_client.asyncio, "sleep", sleep)
+    lines, calls = _stream_diff([
+        lambda: _response(403, '{"message": "You have exceeded a secondary rate limit"}'),
+        lambda: _response(429),
+        lambda: _response(200, "diff --git a/x b/x\n"),
+    ])
+    assert lines == ["diff --git a/x b/x"]
+    assert len(calls) == 3
+    assert delays == [60.0, 60.0]
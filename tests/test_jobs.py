@@ -0,0 +1,174 @@
+import time
+import asyncio
+
+import pytest
+
+from app.core.jobs import Job, JobQueue, JobStatus, MemoryJobStore, QueueFull, SQLiteJobStore
+
+
+def _queue(store=None, **kwargs) -> JobQueue:
+    # workers=0: enqueue only, as on a stateless web tier
+    return JobQueue(store or MemoryJobStore(), **{"workers": 0, **kwargs})
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """Two stores on one database file, standing in for two worker processes"""
+    path = str(tmp_path / "jobs.db")
+    return SQLiteJobStore(path), SQLiteJobStore(path)
+
+
+def test_same_version_coalesces_into_the_active_job():
+    queue = _queue()
+    first = queue.enqueue("review", {}, key="o/r#1", version="A")
+    assert queue.enqueue("review", {}, key="o/r#1", version="A").id == first.id
+
+
+def test_push_back_to_a_cancelled_head_queues_a_new_job():
+    queue = _queue()
+    first = queue.enqueue("review", {}, key="o/r#1", version="A")
+    assert queue.store.claim("worker", ["review"], 60, 3).id == first.id
+
+    second = queue.enqueue("review", {}, key="o/r#1", version="B")
+    assert queue.store.get(first.id).cancel_requested
+
+    # Pushing A again must not coalesce into the job that is already being cancelled
+    third = queue.enqueue("review", {}, key="o/r#1", version="A")
+    assert third.id not in (first.id, second.id)
+    assert queue.store.get(second.id).status == JobStatus.SUPERSEDED
+    assert queue.store.get(third.id).status == JobStatus.QUEUED
+
+
+def test_full_queue_still_takes_a_push_that_replaces_a_queued_job():
+    queue = _queue(max_pending=2)
+    first = queue.enqueue("review", {}, key="o/r#1", version="A")
+    queue.enqueue("review", {}, key="o/r#2", version="A")
+
+    second = queue.enqueue("review", {}, key="o/r#1", version="B")
+    assert queue.store.get(first.id).status == JobStatus.SUPERSEDED
+    assert queue.store.count(JobStatus.QUEUED) == 2
+    with pytest.raises(QueueFull):
+        queue.enqueue("review", {}, key="o/r#3", version="A")
+    assert queue.store.get(second.id).status == JobStatus.QUEUED
+
+
+def test_claim_takes_the_oldest_due_job_once(stores):
+    first, second = stores
+    old = Job(kind="review", payload={"n": 1})
+    later = Job(kind="review", payload={"n": 2}, created_at=old.created_at + 1, run_after=time.time() + 60)
+    other_kind = Job(kind="index", payload={})
+    for job in (old, later, other_kind):
+        first.add(job)
+
+    job = first.claim("a", ["review"], lease=60, max_attempts=3)
+    assert job.id == old.id
+    assert (job.status, job.lease_owner, job.attempts) == (JobStatus.RUNNING, "a", 1)
+    assert second.get(old.id).attempts == 1
+    # Leased by "a"; the other review is not due yet and the third job is another kind
+    assert second.claim("b", ["review"], lease=60, max_attempts=3) is None
+
+
+def test_heartbeat_extends_the_lease_and_reports_cancellation(stores):
+    first, second = stores
+    first.add(Job(kind="review", payload={}, key="o/r#1", version="A"))
+    job = first.claim("a", ["review"], lease=60, max_attempts=3)
+    expires = first.get(job.id).lease_expires
+
+    time.sleep(0.01)
+    assert first.heartbeat(job.id, "a", lease=60) is False
+    assert first.get(job.id).lease_expires > expires
+
+    second.request_cancel("o/r#1", "B")
+    assert first.heartbeat(job.id, "a", lease=60) is True
+    assert first.heartbeat(job.id, "someone-else", lease=60) is None
+
+
+def test_expired_lease_is_redelivered_and_the_old_owner_loses_it(stores):
+    first, second = stores
+    first.add(Job(kind="review", payload={}))
+    job = first.claim("a", ["review"], lease=0.05, max_attempts=3)
+    assert second.claim("b", ["review"], lease=60, max_attempts=3) is None
+
+    time.sleep(0.1)  # Worker "a" died without heartbeating
+    taken = second.claim("b", ["review"], lease=60, max_attempts=3)
+    assert (taken.id, taken.lease_owner, taken.attempts) == (job.id, "b", 2)
+
+    assert first.heartbeat(job.id, "a", lease=60) is None
+    assert first.finish(job.id, "a", status=JobStatus.DONE) is False
+    assert second.finish(job.id, "b", status=JobStatus.DONE) is True
+    assert first.get(job.id).status == JobStatus.DONE
+
+
+def test_job_abandoned_max_attempts_times_fails(stores):
+    first, _ = stores
+    job = Job(kind="review", payload={})
+    first.add(job)
+    for attempt in range(2):
+        assert first.claim(f"w{attempt}", ["review"], lease=0.01, max_attempts=2) is not None
+        time.sleep(0.03)
+
+    assert first.claim("w2", ["review"], lease=60, max_attempts=2) is None
+    failed = first.get(job.id)
+    assert failed.status == JobStatus.FAILED
+    assert "2 attempts" in failed.error
+
+
+def test_release_hands_the_job_back(stores):
+    first, second = stores
+    first.add(Job(kind="review", payload={}))
+    job = first.claim("a", ["review"], lease=60, max_attempts=3)
+    first.release(job.id, "a")
+    assert second.claim("b", ["review"], lease=60, max_attempts=3).id == job.id
+
+
+def test_queue_runs_a_job_to_completion(tmp_path):
+    async def run():
+        queue = JobQueue(SQLiteJobStore(str(tmp_path / "jobs.db")), workers=1, poll_interval=0.05)
+
+        async def handler(job, ctx):
+            ctx.progress("working")
+            return {"echo": job.payload["n"]}
+
+        queue.register("review", handler)
+        await queue.start()
+        try:
+            job = queue.enqueue("review", {"n": 7})
+            for _ in range(100):
+                if queue.get(job.id).status == JobStatus.DONE:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+        return queue.get(job.id)
+
+    job = asyncio.run(run())
+    assert job.status == JobStatus.DONE
+    assert job.result == {"echo": 7}
+
+
+def test_a_locked_database_does_not_block_the_worker_loop(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    other_process = SQLiteJobStore(path).conn
+
+    async def run():
+        queue = JobQueue(store, workers=1, poll_interval=0.01)
+
+        async def handler(job, ctx):
+            return {}
+
+        queue.register("review", handler)
+        other_process.execute("BEGIN IMMEDIATE")  # Holds the write lock while the worker tries to claim
+        await queue.start()
+        longest, last = 0.0, time.monotonic()
+        try:
+            for _ in range(30):
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                longest, last = max(longest, now - last), now
+        finally:
+            other_process.execute("ROLLBACK")
+            await queue.stop()
+        return longest
+
+    assert asyncio.run(run()) < 0.2
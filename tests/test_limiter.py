@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.core.limiter import Budget, SQLiteBackend, _reserve, _sync
+
+
+def test_reserve_within_capacity_does_not_wait():
+    state = {}
+    requests = Budget("requests", 10, period=60)
+    assert _reserve(state, [requests], {"requests": 4}, now=100.0) == 0
+    assert _reserve(state, [requests], {"requests": 6}, now=100.0) == 0
+    assert state["requests"] == [0, 100.0]
+
+
+def test_reservations_queue_up_in_arrival_order():
+    state = {}
+    requests = Budget("requests", 10, period=60)  # 1 token every 6 seconds
+    _reserve(state, [requests], {"requests": 10}, now=0.0)
+    assert _reserve(state, [requests], {"requests": 1}, now=0.0) == pytest.approx(6)
+    assert _reserve(state, [requests], {"requests": 1}, now=0.0) == pytest.approx(12)
+    # Refill is credited before the next reservation is deducted
+    assert _reserve(state, [requests], {"requests": 1}, now=12.0) == pytest.approx(6)
+
+
+def test_the_slowest_budget_sets_the_wait():
+    state = {}
+    budgets = [Budget("requests", 100, period=60), Budget("tokens", 1000, period=60)]
+    assert _reserve(state, budgets, {"requests": 1, "tokens": 1000}, now=0.0) == 0
+    assert _reserve(state, budgets, {"requests": 1, "tokens": 500}, now=0.0) == pytest.approx(30)
+
+
+def test_oversized_request_is_capped_at_the_capacity():
+    state = {}
+    tokens = Budget("tokens", 1000, period=60)
+    assert _reserve(state, [tokens], {"tokens": 5000}, now=0.0) == 0
+    assert _reserve(state, [tokens], {"tokens": 5000}, now=0.0) == pytest.approx(60)
+
+
+def test_blocked_until_holds_everyone_back():
+    state = {"blocked_until": 50.0}
+    requests = Budget("requests", 10, period=60)
+    assert _reserve(state, [requests], {"requests": 1}, now=20.0) == pytest.approx(30)
+    assert _reserve(state, [requests], {"requests": 1}, now=60.0) == 0
+
+
+def test_sync_adopts_a_stricter_provider_view():
+    state = {}
+    requests = Budget("requests", 10, period=60)
+    _sync(state, requests, remaining=3, reset=0, now=0.0)
+    assert state["requests"] == [3, 0.0]
+    _sync(state, requests, remaining=0, reset=20, now=0.0)
+    assert state["blocked_until"] == 20.0
+    assert _reserve(state, [requests], {"requests": 1}, now=5.0) == pytest.approx(15)
+
+
+def test_sqlite_backend_shares_the_budget_between_instances(tmp_path):
+    async def run():
+        path = str(tmp_path / "limiter.db")
+        first, second = SQLiteBackend(path), SQLiteBackend(path)
+        requests = [Budget("requests", 2, period=60)]
+        waits = [await backend.reserve("openai", requests, {"requests": 1}) for backend in (first, second, first)]
+        await second.block("anthropic", 30)
+        blocked = await first.reserve("anthropic", requests, {"requests": 1})
+        return waits, blocked
+
+    waits, blocked = asyncio.run(run())
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(30, abs=1)
+    assert blocked == pytest.approx(30, abs=1)
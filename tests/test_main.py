@@ -0,0 +1,26 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATS_PROBE = """
+import sys, json
+from fastapi.testclient import TestClient
+from app.main import app
+response = TestClient(app).get("/stats")
+print(json.dumps({"stats": response.json(), "openai": "openai" in sys.modules}))
+"""
+
+
+def test_stats_does_not_build_the_reviewer_on_a_web_only_process(tmp_path):
+    # A fresh interpreter: other tests may already have imported the SDKs in this one
+    env = {**os.environ, "DATA_DIR": str(tmp_path), "JOB_RUN_IN_WEB": "false", "A4F_API_KEY": "test"}
+    output = subprocess.run(
+        [sys.executable, "-c", STATS_PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    assert report["openai"] is False
+    assert report["stats"]["providers"] is None
+    assert report["stats"]["queue"] == {"queued": 0, "running": 0}
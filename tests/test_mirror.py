@@ -0,0 +1,47 @@
+import os
+import subprocess
+
+import pytest
+
+from app.tools import mirror
+from app.tools.mirror import MirrorCache
+
+pytestmark = pytest.mark.skipif(mirror.fcntl is None, reason="mirror locks need fcntl")
+
+
+@pytest.fixture
+def source(tmp_path):
+    repo = tmp_path / "src"
+    repo.mkdir()
+    (repo / "a.txt").write_text("hello\n")
+    git = ["git", "-c", "user.email=bench@example.com", "-c", "user.name=bench"]
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=repo, check=True)
+    subprocess.run(["git", "add", "a.txt"], cwd=repo, check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "init"], cwd=repo, check=True)
+    return f"file://{repo}"
+
+
+def test_checkout_and_evict(tmp_path, source):
+    cache = MirrorCache(str(tmp_path / "data"), max_bytes=0)
+    with cache.checkout("o/r", source, "refs/heads/main") as worktree:
+        assert open(os.path.join(worktree, "a.txt")).read() == "hello\n"
+    # Over budget and unused once the worktree is gone
+    assert not os.path.exists(cache._repo_dir("o/r"))
+
+
+def test_mirror_in_use_by_another_process_is_not_evicted(tmp_path, source):
+    data = str(tmp_path / "data")
+    with MirrorCache(data, max_bytes=1 << 40).checkout("o/r", source, "refs/heads/main"):
+        pass
+
+    # A fresh cache has no in-process usage counts, like a second worker process would
+    other = MirrorCache(data, max_bytes=0)
+    repo_dir = other._repo_dir("o/r")
+    held = mirror._open_lock(repo_dir + ".use", exclusive=False)
+    try:
+        other.evict()
+        assert os.path.isdir(repo_dir)
+    finally:
+        os.close(held)
+    other.evict()
+    assert not os.path.exists(repo_dir)
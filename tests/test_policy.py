@@ -0,0 +1,41 @@
+from app.core.policy import DEFAULT_POLICY, parse_policy
+
+POLICY = """
+exclude: "docs/generated/**"
+routes:
+  - paths: ["**/*.md", "tests/**"]
+    tier: fast
+  - paths: ["src/auth/**"]
+    tier: strong
+  - paths: ["anything/**"]
+    tier: turbo
+triage: true
+max_tokens: 60000
+ticket_severity: critical
+"""
+
+
+def test_parse_policy():
+    policy = parse_policy(POLICY)
+    assert policy.excluded("docs/generated/api.md")
+    assert not policy.excluded("docs/api.md")
+    assert policy.tier("README.md") == "fast"
+    assert policy.tier("tests/test_app.py") == "fast"
+    assert policy.tier("src/auth/login.py") == "strong"
+    # The route with an unknown tier is dropped
+    assert policy.tier("anything/x.py") == "default"
+    assert (policy.triage, policy.max_tokens, policy.ticket_severity) == (True, 60000, "critical")
+
+
+def test_parse_policy_is_cached_by_content():
+    assert parse_policy(POLICY) is parse_policy(POLICY)
+    assert parse_policy(POLICY + "\n# comment") is not parse_policy(POLICY)
+
+
+def test_missing_or_broken_policy_falls_back_to_the_default():
+    assert parse_policy("") is DEFAULT_POLICY
+    assert parse_policy("routes: [unclosed") is DEFAULT_POLICY
+    assert parse_policy("- just\n- a list\n").routes == []
+
+    policy = parse_policy("max_tokens: lots\nticket_severity: apocalyptic\n")
+    assert (policy.max_tokens, policy.ticket_severity) == (0, "high")
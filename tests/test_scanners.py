@@ -0,0 +1,39 @@
+import sys
+import json
+import asyncio
+
+from app.tools.scanners import Scanner, ScannerEngine
+
+# Reports one finding on line 1 of every file under the directory it is given
+LIST_FILES = (
+    "import os, json, sys; root = sys.argv[1]; "
+    "print(json.dumps([os.path.relpath(os.path.join(d, f), root) for d, _, fs in os.walk(root) for f in fs]))"
+)
+
+
+class DirectoryScanner(Scanner):
+    name = "dirscan"
+    scans_directory = True
+
+    def available(self):
+        return True
+
+    def command(self, target_dir, files, report_path=None):
+        return [sys.executable, "-c", LIST_FILES, target_dir]
+
+    def parse(self, output, target_dir):
+        return [{"path": self.relpath(p, target_dir), "line": 1, "severity": "critical", "body": "secret",
+                 "rule": "dirscan:x"} for p in json.loads(output)]
+
+
+def test_directory_scanner_only_sees_changed_files(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "changed.py").write_text("key = 1\n")
+    (tmp_path / "old.py").write_text("legacy_key = 2\n")
+
+    # Unfiltered scanner output: files outside the diff are never even scanned
+    issues = asyncio.run(ScannerEngine(names=[])._run_one(DirectoryScanner(), str(tmp_path), ["src/changed.py"]))
+
+    assert [i["path"] for i in issues] == ["src/changed.py"]
+    # The staging directory is cleaned up next to the worktree
+    assert sorted(p.name for p in tmp_path.parent.iterdir() if p.name.startswith("vertex_scan_")) == []
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.ai.router import ReviewFailed
+from app.ai.stream_parser import IssueStreamParser, iter_issues
+
+
+async def _deltas(text: str, size: int = 7):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+def _collect(text: str) -> list:
+    async def run():
+        return [issue async for issue in iter_issues(_deltas(text))]
+    return asyncio.run(run())
+
+
+def test_valid_stream_yields_every_issue():
+    text = ('```json\n[{"path": "a.py", "line": 3, "severity": "high", "body": "uses {braces} and \\"quotes\\""},'
+            ' {"path": "b.py", "line": 9, "severity": "low", "body": "ok"}]\n```')
+    issues = _collect(text)
+    assert [i["path"] for i in issues] == ["a.py", "b.py"]
+    assert issues[0]["body"] == 'uses {braces} and "quotes"'
+
+
+def test_empty_array_is_a_clean_review():
+    assert _collect("[]") == []
+
+
+def test_refusal_raises():
+    with pytest.raises(ReviewFailed) as failed:
+        _collect("Sorry, I cannot review this diff.")
+    assert failed.value.issues == []
+
+
+def test_truncated_array_raises_with_parsed_issues():
+    text = '[{"path": "a.py", "line": 1, "body": "first"}, {"path": "b.py", "line": 2, "bo'
+    with pytest.raises(ReviewFailed) as failed:
+        _collect(text)
+    assert [i["path"] for i in failed.value.issues] == ["a.py"]
+
+
+def test_array_cut_between_objects_raises():
+    with pytest.raises(ReviewFailed) as failed:
+        _collect('[{"path": "a.py", "line": 1, "body": "first"},')
+    assert len(failed.value.issues) == 1
+
+
+def test_malformed_object_only_loses_itself():
+    parser = IssueStreamParser()
+    issues = parser.feed('[{"path": "a.py", "line": }, {"path": "b.py", "line": 2}]')
+    assert [i["path"] for i in issues] == ["b.py"]
+    assert parser.skipped == 1
+    assert parser.close()
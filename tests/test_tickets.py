@@ -0,0 +1,54 @@
+import asyncio
+
+from app.diff.parser import parse_diff
+from app.core.findings import stamp_fingerprints
+from app.github.tickets import file_tracking_issue
+
+PAYLOAD = {"repo_full_name": "o/r", "pr_number": 7}
+
+
+class FakeClient:
+    def __init__(self):
+        self.issues = []
+
+    async def list_issues(self, repo, installation_id, labels=None):
+        return self.issues
+
+    async def create_issue(self, repo, title, body, labels=None, installation_id=None):
+        self.issues.append({"number": len(self.issues) + 1, "title": title, "body": body})
+        return len(self.issues)
+
+    async def update_issue(self, repo, number, body, installation_id=None):
+        self.issues[number - 1]["body"] = body
+
+
+def _diff(prefix_lines: int) -> list:
+    added = "".join("+import os\n" for _ in range(prefix_lines))
+    return parse_diff(
+        "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n"
+        f"@@ -1,1 +1,{prefix_lines + 2} @@\n x = 1\n{added}+eval(data)\n"
+    )
+
+
+def _finding(line: int) -> dict:
+    return {"path": "app.py", "line": line, "severity": "high", "rule": "bandit:B307",
+            "body": f"Use of eval on line {line}"}
+
+
+def test_shifted_finding_is_not_ticketed_twice():
+    client = FakeClient()
+    first = stamp_fingerprints("o/r", [_finding(2)], _diff(0))
+    assert asyncio.run(file_tracking_issue(client, first, PAYLOAD)) == 1
+
+    # Two lines added above it: same code, same rule, new line number
+    moved = stamp_fingerprints("o/r", [_finding(4)], _diff(2))
+    assert moved[0]["fingerprint"] == first[0]["fingerprint"]
+    assert asyncio.run(file_tracking_issue(client, moved, PAYLOAD)) == 0
+    assert len(client.issues) == 1
+
+
+def test_findings_below_the_threshold_are_not_ticketed():
+    client = FakeClient()
+    low = stamp_fingerprints("o/r", [{**_finding(2), "severity": "low"}], _diff(0))
+    assert asyncio.run(file_tracking_issue(client, low, PAYLOAD)) == 0
+    assert client.issues == []